@@ -1,17 +1,27 @@
 from fastapi import FastAPI, Query
 from fastapi.responses import JSONResponse
 from typing import Optional, Literal
+from contextlib import asynccontextmanager
 from datetime import datetime
-import httpx
 import random
 
 from app.adapters.tradingview import crypto, indices, forex, futures, stocks
-from app.adapters.tradingview.common import list_refs_for_category
-from app.adapters.base import InstrumentRef
+from app.adapters.tradingview.common import CategoryWalk, iter_category_pages
+from app.http_client import close_clients
+from app.pagination import InvalidCursor
+from app.deadline import Deadline, deadline_scope, REQUEST_DEADLINE, DEADLINE_SAFETY_MARGIN
+from app.projection import fields_scope, parse_fields, wants
 from app.schemas import InstrumentSnapshot, ApiMeta, Price24hResponse
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Cerrar el pool de conexiones compartido al apagar el worker
+    await close_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 async def compute_price24(snapshot: InstrumentSnapshot) -> InstrumentSnapshot:
@@ -40,11 +50,19 @@ async def price24h(
     limit_per_page: int = Query(200, ge=1, le=500),
     cursor: Optional[str] = None,
     format: Literal["json", "jsonl"] = "json",
+    fields: Optional[str] = Query(None, description="Campos separados por coma, p.ej. symbol,price"),
 ):
     start_ts = datetime.utcnow()
+    try:
+        projection = parse_fields(fields, InstrumentSnapshot.model_fields)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    # Deadline suave para el crawl: deja margen para armar la respuesta
+    deadline = Deadline.after(REQUEST_DEADLINE).child(("tradingview", category), margin=DEADLINE_SAFETY_MARGIN)
     try:
         module = CATEGORY_MAP[category]
-        refs, next_cursor, expected_rows = await module.list_refs(None, cursor, limit_per_page)
+        with deadline_scope(deadline), fields_scope(projection):
+            refs, next_cursor, expected_rows = await module.list_refs(None, cursor, limit_per_page)
         # Construir snapshots directamente
         data = []
         for ref in refs:
@@ -58,9 +76,10 @@ async def price24h(
                 price_24h=None,
                 ts=datetime.utcnow(),
             )
-            snap = await compute_price24(snap)
+            if wants(projection, "price_24h"):
+                snap = await compute_price24(snap)
             data.append(snap)
-        status = "ok" if len(data) > 0 else "degraded"
+        status = "ok" if len(data) > 0 and not deadline.partial else "degraded"
         meta = ApiMeta(
             ts=start_ts,
             provider="tradingview",
@@ -68,8 +87,15 @@ async def price24h(
             limit_per_page=limit_per_page,
             next_cursor=next_cursor,
             status=status,  # type: ignore
+            partial=deadline.partial,
         )
-        return JSONResponse(Price24hResponse(meta=meta, data=data).model_dump())
+        response = Price24hResponse(meta=meta, data=data)
+        if projection is None:
+            return JSONResponse(response.model_dump())
+        # Serializar solo los campos pedidos, igual que los extrajo el parser
+        return JSONResponse(response.model_dump(include={"meta": True, "data": {"__all__": set(projection)}}))
+    except InvalidCursor as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         meta = ApiMeta(
             ts=start_ts,
@@ -87,15 +113,13 @@ async def verify():
     report = {"tradingview": {}}
     for category in ["indices", "crypto", "forex", "futures", "stocks"]:
         try:
-            # Contar expected recorriendo páginas hasta que no haya más
-            refs, cursor, expected_rows = await list_refs_for_category(category, None, 200)
-            all_refs = list(refs)
-            cur = cursor
-            while cur:
-                batch, cur, _ = await list_refs_for_category(category, cur, 200)
-                all_refs.extend(batch)
-                if len(all_refs) > 5000:
-                    break
+            # Un solo recorrido de las páginas fuente: expected son las filas de la tabla
+            all_refs = []
+            expected_rows = 0
+            walk = CategoryWalk()
+            async for page in iter_category_pages(category, walk=walk):
+                expected_rows += page.rows
+                all_refs.extend(page.items)
             scraped_count = len(all_refs)
             # Muestra de 3 elementos con change_24h_pct para validar cálculo
             candidates = [r for r in all_refs if r.change_24h_pct is not None][:50]
@@ -119,13 +143,18 @@ async def verify():
                     "change_24h_pct": change,
                     "ok": ok,
                 })
-            status = "ok" if expected_rows == scraped_count and all(c.get("ok", True) for c in checks) else ("degraded" if scraped_count > 0 else "fail")
+            # Recorrido cortado (página fallida, tope o deadline): no cuenta como completo
+            ok = walk.complete and expected_rows == scraped_count and all(c.get("ok", True) for c in checks)
+            status = "ok" if ok else ("degraded" if scraped_count > 0 else "fail")
             report["tradingview"][category] = {
                 "expected_count": expected_rows,
                 "scraped_count": scraped_count,
                 "sample_price_checks": checks,
                 "status": status,
+                "complete": walk.complete,
             }
+            if not walk.complete:
+                report["tradingview"][category]["resume_page"] = walk.next_page
         except Exception as e:
             report["tradingview"][category] = {"status": "fail", "error": str(e)}
     return JSONResponse(report)
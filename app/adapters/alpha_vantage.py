@@ -4,26 +4,29 @@ Adaptador para Alpha Vantage API (datos financieros oficiales)
 """
 import asyncio
 import httpx
-import json
 import os
 from typing import List, Optional, Tuple, Dict, Any
 from datetime import datetime
 from app.adapters.base import ProviderAdapter, InstrumentRef
 from app.models import InstrumentSnapshot
-from app.anti_detection import RateLimiter
+from app.anti_detection import HostBudget, host_limiters
 from app.validation import validator, cleaner
 from app.cache import cache_manager
+from app.http_client import get_client, limited_get
+from app.pagination import Cursor, cursor_codec
 
 class AlphaVantageAdapter(ProviderAdapter):
     """Adaptador para Alpha Vantage API"""
     
     name = "alpha_vantage"
+    # 5 requests per minute (free tier)
+    host_budget = HostBudget(requests_per_second=5/60, burst=1)
     
     def __init__(self, api_key: Optional[str] = None, timeout: int = 15):
         self.api_key = api_key or os.getenv('ALPHA_VANTAGE_API_KEY')
         self.timeout = timeout
         self.base_url = "https://www.alphavantage.co/query"
-        self.rate_limiter = RateLimiter(requests_per_second=5/60)  # 5 requests per minute (free tier)
+        self.rate_limiter = host_limiters.register(self.base_url, self.host_budget)
         
         if not self.api_key:
             print("⚠️ Alpha Vantage API key not provided. Using demo key (limited functionality)")
@@ -46,13 +49,8 @@ class AlphaVantageAdapter(ProviderAdapter):
             return [], None
         
         # Aplicar paginación
-        start_idx = 0
-        if cursor:
-            try:
-                cursor_data = json.loads(cursor)
-                start_idx = cursor_data.get("offset", 0)
-            except:
-                pass
+        position = cursor_codec.decode(cursor, self.name, category) or Cursor(self.name, category)
+        start_idx = position.offset
         
         end_idx = min(start_idx + page_size, len(symbols))
         current_symbols = symbols[start_idx:end_idx]
@@ -69,7 +67,7 @@ class AlphaVantageAdapter(ProviderAdapter):
         
         next_cursor = None
         if end_idx < len(symbols):
-            next_cursor = json.dumps({"offset": end_idx})
+            next_cursor = cursor_codec.encode(position.advance(end_idx - start_idx))
         
         return refs, next_cursor
     
@@ -108,16 +106,11 @@ class AlphaVantageAdapter(ProviderAdapter):
                     )
                 else:
                     print(f"⚠️ Alpha Vantage data validation failed for {ref.symbol}")
-            
-            # Rate limiting entre requests
-            await asyncio.sleep(0.5)  # Esperar entre requests
         
         return snapshots
     
     async def _fetch_single_snapshot(self, ref: InstrumentRef, hours_window: int) -> Optional[Dict[str, Any]]:
         """Obtener snapshot de un solo instrumento"""
-        await self.rate_limiter.wait()
-        
         try:
             if ref.category == "stocks":
                 return await self._fetch_stock_data(ref)
@@ -141,47 +134,47 @@ class AlphaVantageAdapter(ProviderAdapter):
             "apikey": self.api_key
         }
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "Global Quote" not in data:
-                print(f"⚠️ No Global Quote data for {ref.symbol}")
-                return None
-            
-            quote = data["Global Quote"]
-            
-            # Parsear datos
-            current_price = float(quote.get("05. price", 0))
-            if current_price <= 0:
-                return None
-            
-            change_pct_str = quote.get("10. change percent", "0%")
-            change_24h_pct = validator.sanitize_percentage(change_pct_str)
-            
-            return {
-                "provider": self.name,
-                "category": ref.category,
-                "symbol": ref.symbol,
-                "name": quote.get("01. symbol"),
-                "exchange": None,
-                "currency": "USD",
-                "price": current_price,
-                "change_24h_pct": change_24h_pct,
-                "change_24h_pct": None,  # No disponible en esta API
-                "change_1h_pct": None,   # No disponible en esta API
-                "ts": datetime.now(),
-                "meta": {
-                    "volume": int(quote.get("06. volume", 0)),
-                    "high": float(quote.get("03. high", 0)),
-                    "low": float(quote.get("04. low", 0)),
-                    "open": float(quote.get("02. open", 0)),
-                    "previous_close": float(quote.get("08. previous close", 0)),
-                    "data_source": "alpha_vantage_global_quote"
-                }
+        client = get_client(self.base_url)
+        response = await limited_get(client, self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        
+        if "Global Quote" not in data:
+            print(f"⚠️ No Global Quote data for {ref.symbol}")
+            return None
+        
+        quote = data["Global Quote"]
+        
+        # Parsear datos
+        current_price = float(quote.get("05. price", 0))
+        if current_price <= 0:
+            return None
+        
+        change_pct_str = quote.get("10. change percent", "0%")
+        change_24h_pct = validator.sanitize_percentage(change_pct_str)
+        
+        return {
+            "provider": self.name,
+            "category": ref.category,
+            "symbol": ref.symbol,
+            "name": quote.get("01. symbol"),
+            "exchange": None,
+            "currency": "USD",
+            "price": current_price,
+            "change_24h_pct": change_24h_pct,
+            "change_24h_pct": None,  # No disponible en esta API
+            "change_1h_pct": None,   # No disponible en esta API
+            "ts": datetime.now(),
+            "meta": {
+                "volume": int(quote.get("06. volume", 0)),
+                "high": float(quote.get("03. high", 0)),
+                "low": float(quote.get("04. low", 0)),
+                "open": float(quote.get("02. open", 0)),
+                "previous_close": float(quote.get("08. previous close", 0)),
+                "data_source": "alpha_vantage_global_quote"
             }
-    
+        }
+
     async def _fetch_forex_data(self, ref: InstrumentRef) -> Optional[Dict[str, Any]]:
         """Obtener datos de forex"""
         # Para forex, el símbolo debe ser como "EURUSD"
@@ -198,40 +191,40 @@ class AlphaVantageAdapter(ProviderAdapter):
             "apikey": self.api_key
         }
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "Realtime Currency Exchange Rate" not in data:
-                print(f"⚠️ No forex data for {ref.symbol}")
-                return None
-            
-            rate_data = data["Realtime Currency Exchange Rate"]
-            
-            current_price = float(rate_data.get("5. Exchange Rate", 0))
-            if current_price <= 0:
-                return None
-            
-            return {
-                "provider": self.name,
-                "category": ref.category,
-                "symbol": f"{from_currency}{to_currency}=X",  # Formato Yahoo
-                "name": f"{from_currency}/{to_currency}",
-                "exchange": "FOREX",
-                "currency": to_currency,
-                "price": current_price,
-                "change_24h_pct": None,  # No disponible en tiempo real
-                "change_1h_pct": None,
-                "ts": datetime.now(),
-                "meta": {
-                    "from_currency": from_currency,
-                    "to_currency": to_currency,
-                    "last_refreshed": rate_data.get("6. Last Refreshed"),
-                    "data_source": "alpha_vantage_forex"
-                }
+        client = get_client(self.base_url)
+        response = await limited_get(client, self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        
+        if "Realtime Currency Exchange Rate" not in data:
+            print(f"⚠️ No forex data for {ref.symbol}")
+            return None
+        
+        rate_data = data["Realtime Currency Exchange Rate"]
+        
+        current_price = float(rate_data.get("5. Exchange Rate", 0))
+        if current_price <= 0:
+            return None
+        
+        return {
+            "provider": self.name,
+            "category": ref.category,
+            "symbol": f"{from_currency}{to_currency}=X",  # Formato Yahoo
+            "name": f"{from_currency}/{to_currency}",
+            "exchange": "FOREX",
+            "currency": to_currency,
+            "price": current_price,
+            "change_24h_pct": None,  # No disponible en tiempo real
+            "change_1h_pct": None,
+            "ts": datetime.now(),
+            "meta": {
+                "from_currency": from_currency,
+                "to_currency": to_currency,
+                "last_refreshed": rate_data.get("6. Last Refreshed"),
+                "data_source": "alpha_vantage_forex"
             }
-    
+        }
+
     async def _fetch_crypto_data(self, ref: InstrumentRef) -> Optional[Dict[str, Any]]:
         """Obtener datos de criptomonedas"""
         params = {
@@ -241,36 +234,36 @@ class AlphaVantageAdapter(ProviderAdapter):
             "apikey": self.api_key
         }
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "Realtime Currency Exchange Rate" not in data:
-                print(f"⚠️ No crypto data for {ref.symbol}")
-                return None
-            
-            rate_data = data["Realtime Currency Exchange Rate"]
-            
-            current_price = float(rate_data.get("5. Exchange Rate", 0))
-            if current_price <= 0:
-                return None
-            
-            return {
-                "provider": self.name,
-                "category": ref.category,
-                "symbol": f"{ref.symbol}-USD",
-                "name": ref.symbol,
-                "exchange": "CRYPTO",
-                "currency": "USD",
-                "price": current_price,
-                "change_24h_pct": None,  # No disponible en tiempo real
-                "change_1h_pct": None,
-                "ts": datetime.now(),
-                "meta": {
-                    "from_currency": ref.symbol,
-                    "to_currency": "USD",
-                    "last_refreshed": rate_data.get("6. Last Refreshed"),
-                    "data_source": "alpha_vantage_crypto"
-                }
+        client = get_client(self.base_url)
+        response = await limited_get(client, self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        
+        if "Realtime Currency Exchange Rate" not in data:
+            print(f"⚠️ No crypto data for {ref.symbol}")
+            return None
+        
+        rate_data = data["Realtime Currency Exchange Rate"]
+        
+        current_price = float(rate_data.get("5. Exchange Rate", 0))
+        if current_price <= 0:
+            return None
+        
+        return {
+            "provider": self.name,
+            "category": ref.category,
+            "symbol": f"{ref.symbol}-USD",
+            "name": ref.symbol,
+            "exchange": "CRYPTO",
+            "currency": "USD",
+            "price": current_price,
+            "change_24h_pct": None,  # No disponible en tiempo real
+            "change_1h_pct": None,
+            "ts": datetime.now(),
+            "meta": {
+                "from_currency": ref.symbol,
+                "to_currency": "USD",
+                "last_refreshed": rate_data.get("6. Last Refreshed"),
+                "data_source": "alpha_vantage_crypto"
             }
+        }
@@ -1,20 +1,42 @@
 import asyncio
+import csv
+import functools
 import httpx
-import json
+import io
+import os
 import re
-from typing import List, Optional, Tuple
+from collections import Counter
+from typing import Any, Callable, List, Optional, Tuple
 from datetime import datetime
 from bs4 import BeautifulSoup
 from app.adapters.base import ProviderAdapter, InstrumentRef
 from app.models import InstrumentSnapshot
-from app.utils import get_headers, parse_number, safe_float, pct_change
+from app.utils import get_headers, parse_number
+from app.numeric import cell_change, cell_price, parse_numeric
+from app.http_client import get_client, fetch_parsed, limited_get
+from app.anti_detection import HostBudget, host_limiters
+from app.deadline import DeadlineExceeded, sleep_within_deadline
+from app.layout_cache import TableLayout, layout_cache, layout_fingerprint
+from app.projection import Fields, current_fields, parser_fields, projected_key, wants
+from app.pagination import Cursor, cursor_codec
 
 class FinvizAdapter(ProviderAdapter):
     name = "finviz"
+    # Presupuesto del host (el limitador adaptativo lo baja ante 429/5xx)
+    host_budget = HostBudget(requests_per_second=2.0, burst=2)
     
-    def __init__(self, timeout: int = 8):
+    # Encabezados del export CSV que corresponden a cada campo
+    CSV_COLUMNS = {
+        "symbol": ("Ticker",),
+        "name": ("Company", "Name"),
+        "price": ("Price",),
+        "change": ("Change",),
+    }
+    
+    def __init__(self, timeout: int = 8, use_csv: Optional[bool] = None):
         self.timeout = timeout
         self.base_url = "https://finviz.com"
+        host_limiters.register(self.base_url, self.host_budget)
         # URLs específicas actualizadas según los requerimientos
         self.screeners = {
             "forex": "https://finviz.com/forex.ashx",
@@ -23,9 +45,31 @@ class FinvizAdapter(ProviderAdapter):
             "indices": "https://finviz.com/groups.ashx?g=sector&v=110&o=name",  # Corregir URL
             "commodities": "https://finviz.com/futures.ashx"
         }
+        # Export CSV del screener (solo existe para acciones); el HTML queda como respaldo
+        if use_csv is None:
+            use_csv = os.getenv("FINVIZ_CSV", "false").lower() in ("1", "true", "yes")
+        self.use_csv = use_csv
+        auth = os.getenv("FINVIZ_AUTH_TOKEN")
+        self.exports = {
+            "stocks": "https://finviz.com/export.ashx?v=111&s=ta_mostactive" + (f"&auth={auth}" if auth else ""),
+        }
+    
+    def _looks_like_html(self, content: str) -> bool:
+        """Verificar que el contenido sea HTML válido"""
+        if '<html' not in content.lower() and '<!doctype' not in content.lower():
+            print(f"   ⚠️ Contenido no parece ser HTML válido")
+            print(f"   📄 Primeros 200 caracteres: {content[:200]}")
+            return False
+        return True
     
-    async def _make_request(self, client: httpx.AsyncClient, url: str) -> Optional[str]:
-        """Hacer petición HTTP con retry simple"""
+    def _parse_if_html(self, parse: Callable[[str], Any], html: str) -> Any:
+        return parse(html) if self._looks_like_html(html) else None
+    
+    async def _make_request(self, client: httpx.AsyncClient, url: str, parse: Optional[Callable[[str], Any]] = None, parse_key: Optional[str] = None) -> Any:
+        """Hacer petición HTTP con retry simple.
+        
+        Con `parse`, la petición es condicional y devuelve las filas parseadas.
+        """
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -43,7 +87,19 @@ class FinvizAdapter(ProviderAdapter):
         
         for attempt in range(3):  # Máximo 3 intentos
             try:
-                response = await client.get(
+                if parse is not None:
+                    return await fetch_parsed(
+                        client,
+                        url,
+                        functools.partial(self._parse_if_html, parse),
+                        parse_key or self.name,
+                        headers=headers,
+                        timeout=self.timeout,
+                        follow_redirects=True
+                    )
+                
+                response = await limited_get(
+                    client,
                     url, 
                     headers=headers, 
                     timeout=self.timeout,
@@ -54,18 +110,40 @@ class FinvizAdapter(ProviderAdapter):
                 # Usar response.text que maneja la descompresión automáticamente
                 content = response.text
                 
-                # Verificar que el contenido sea HTML válido
-                if '<html' not in content.lower() and '<!doctype' not in content.lower():
-                    print(f"   ⚠️ Contenido no parece ser HTML válido")
-                    print(f"   📄 Primeros 200 caracteres: {content[:200]}")
+                if not self._looks_like_html(content):
                     return None
                 
                 return content
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 print(f"Finviz request failed (attempt {attempt + 1}): {e}")
                 if attempt == 2:  # Último intento
                     raise
-                await asyncio.sleep(2)  # Esperar 2 segundos antes del retry
+                await sleep_within_deadline(2)  # Esperar 2 segundos antes del retry
+    
+    async def _fetch_export(self, client: httpx.AsyncClient, category: str, fields: Fields) -> Optional[List[InstrumentRef]]:
+        """Filas desde el export CSV; None si hay que volver al HTML (sin reintentos)"""
+        url = self.exports[category]
+        try:
+            refs = await fetch_parsed(
+                client,
+                url,
+                functools.partial(self._parse_finviz_csv, category=category, fields=fields),
+                projected_key(f"{self.name}-csv", fields),
+                headers=get_headers(),
+                timeout=self.timeout,
+                follow_redirects=True,
+            )
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"⚠️ Export CSV de Finviz falló para {category}, usando HTML: {e}")
+            return None
+        if not refs:
+            print(f"⚠️ Export CSV de Finviz sin filas para {category}, usando HTML")
+            return None
+        return refs
     
     async def _scrape_finviz_page(self, client: httpx.AsyncClient, category: str) -> List[InstrumentRef]:
         """Scrapear página de Finviz para obtener instrumentos reales"""
@@ -74,182 +152,295 @@ class FinvizAdapter(ProviderAdapter):
             print(f"⚠️ URL no encontrada para categoría: {category}")
             return []
         
+        fields = parser_fields(current_fields())
+        if self.use_csv and category in self.exports:
+            refs = await self._fetch_export(client, category, fields)
+            if refs is not None:
+                return refs
+        
         print(f"🎯 Objetivo: extraer símbolos de {category} desde {url}")
         
         try:
-            html_content = await self._make_request(client, url)
-            if not html_content:
+            refs = await self._make_request(
+                client,
+                url,
+                parse=functools.partial(self._parse_finviz_html, category=category, fields=fields),
+                parse_key=projected_key(self.name, fields),
+            )
+            if refs is None:
                 print(f"⚠️ No se pudo obtener contenido de {url}")
                 return []
+            return refs
             
-            print(f"   📄 Contenido HTML obtenido: {len(html_content)} caracteres")
-            print(f"   📄 Primeros 500 caracteres: {html_content[:500]}")
-            
-            soup = BeautifulSoup(html_content, 'html.parser')
-            refs = []
-            
-            # Buscar tabla con múltiples selectores
-            table = None
-            table_selectors = [
-                'table.table-light',
-                'table.table-light-cp',
-                'table.table-light-wl',
-                'table.table-light-row-cp',
-                'table.table-light-row-wl',
-                'table.table-light-row',
-                'table.screener-table',
-                'table.quotes-table',
-                '#screener-content table',
-                '.screener-content table',
-                '.screener table',
-                'table[class*="table"]',
-                'table[class*="screener"]',
-                'table[class*="quotes"]',
-                'table'
-            ]
-            
-            for selector in table_selectors:
-                tables = soup.select(selector)
-                print(f"   🔍 Selector '{selector}': {len(tables)} tablas encontradas")
-                
-                for i, t in enumerate(tables):
-                    rows = t.select('tr')
-                    cells_in_first_row = len(rows[0].select('td')) if rows else 0
-                    print(f"      Tabla {i+1}: {len(rows)} filas, {cells_in_first_row} celdas en primera fila")
-                    
-                    # Buscar una tabla con múltiples celdas en la primera fila (datos reales)
-                    if cells_in_first_row >= 5:
-                        table = t
-                        print(f"   ✅ Tabla encontrada con selector: {selector} (tabla {i+1})")
-                        break
+        except Exception as e:
+            print(f"❌ Error scraping Finviz {category}: {e}")
+            return []
+    
+    # Selectores de tabla y de filas en orden de preferencia
+    TABLE_SELECTORS = (
+        'table.table-light',
+        'table.table-light-cp',
+        'table.table-light-wl',
+        'table.table-light-row-cp',
+        'table.table-light-row-wl',
+        'table.table-light-row',
+        'table.screener-table',
+        'table.quotes-table',
+        '#screener-content table',
+        '.screener-content table',
+        '.screener table',
+        'table[class*="table"]',
+        'table[class*="screener"]',
+        'table[class*="quotes"]',
+        'table'
+    )
+    ROW_SELECTORS = (
+        'tr.table-light-row-cp',
+        'tr.table-light-row-wl',
+        'tr.table-light-row',
+        'tr'
+    )
+    
+    def _fingerprint(self, table, rows) -> str:
+        """Huella de la tabla: clase, textos de la fila de header y celdas por fila"""
+        header_row = table.select_one('tr')
+        header = [cell.get_text(strip=True) for cell in header_row.select('td')] if header_row else []
+        cells_per_row = len(rows[1].select('td')) if len(rows) > 1 else 0
+        return layout_fingerprint(table.get('class'), header, cells_per_row)
+    
+    def _table_from_layout(self, soup: BeautifulSoup, category: str, layout: TableLayout):
+        """Ir directo a la tabla conocida; None si la página cambió de estructura"""
+        tables = soup.select(layout.selector)
+        if layout.index < len(tables):
+            table = tables[layout.index]
+            rows = table.select(layout.row_selector)
+            if len(rows) > 1 and self._fingerprint(table, rows) == layout.fingerprint:
+                layout_cache.record_hit()
+                return table, rows
+        print(f"   🔄 Layout de Finviz {category} cambió, redescubriendo tabla")
+        layout_cache.invalidate(self.name, category)
+        return None, None
+    
+    def _discover_table(self, soup: BeautifulSoup, category: str):
+        """Probar todos los selectores hasta dar con la tabla de datos"""
+        table = None
+        table_selector, table_index = None, 0
+        for selector in self.TABLE_SELECTORS:
+            tables = soup.select(selector)
+            for i, t in enumerate(tables):
+                rows = t.select('tr')
+                cells_in_first_row = len(rows[0].select('td')) if rows else 0
                 
-                if table:
+                # Buscar una tabla con múltiples celdas en la primera fila (datos reales)
+                if cells_in_first_row >= 5:
+                    table = t
+                    table_selector, table_index = selector, i
+                    print(f"   ✅ Tabla encontrada con selector: {selector} (tabla {i+1})")
                     break
             
-            if not table:
-                print(f"   ❌ No se encontró tabla con datos en {category}")
+            if table:
+                break
+        
+        if not table:
+            print(f"   ❌ No se encontró tabla con datos en {category}")
+            return None, [], None
+        
+        # Buscar filas con múltiples selectores
+        rows = []
+        row_selector = None
+        for selector in self.ROW_SELECTORS:
+            rows = table.select(selector)
+            if len(rows) > 1:  # Más de 1 para excluir solo el header
+                row_selector = selector
+                print(f"   ✅ Encontradas {len(rows)} filas con selector: {selector}")
+                break
+        
+        if row_selector is None:
+            return table, rows, None
+        layout = TableLayout(
+            selector=table_selector,
+            index=table_index,
+            row_selector=row_selector,
+            fingerprint=self._fingerprint(table, rows),
+        )
+        return table, rows, layout
+    
+    def _scan_price(self, cells) -> Tuple[float, Optional[int]]:
+        """Primer valor numérico válido en las celdas 2-6"""
+        for j in range(2, min(len(cells), 7)):
+            price = cell_price(cells[j].get_text(strip=True))
+            if price:
+                return price, j
+        return 0.0, None
+    
+    def _scan_change(self, cells) -> Tuple[Optional[float], Optional[int]]:
+        """Primer cambio porcentual en las celdas 3-7"""
+        for j in range(3, min(len(cells), 8)):
+            change_pct = cell_change(cells[j].get_text(strip=True))
+            if change_pct is not None:
+                return change_pct, j
+        return None, None
+    
+    def _parse_finviz_html(self, html_content: str, category: str, fields: Fields = None) -> List[InstrumentRef]:
+        """Extraer instrumentos del HTML de un screener de Finviz.
+        
+        Con un layout en caché se va directo a la tabla, filas y columnas
+        conocidas; la búsqueda completa solo corre la primera vez o cuando la
+        huella de la tabla deja de coincidir. Con `fields`, el nombre y el
+        cambio solo se leen y convierten si se pidieron.
+        """
+        soup = BeautifulSoup(html_content, 'html.parser')
+        refs = []
+        
+        layout = layout_cache.get(self.name, category)
+        table, rows = (None, None) if layout is None else self._table_from_layout(soup, category, layout)
+        discovered = table is None
+        if discovered:
+            table, rows, layout = self._discover_table(soup, category)
+            if table is None:
                 return []
+        
+        if len(rows) <= 1:
+            print(f"   ❌ No se encontraron filas de datos en {category}")
+            return []
+        
+        # Saltar header
+        data_rows = rows[1:] if len(rows) > 1 else rows
+        
+        price_col = None if discovered else layout.columns.get("price")
+        change_col = None if discovered else layout.columns.get("change")
+        price_cols, change_cols = Counter(), Counter()
+        want_name = wants(fields, "name")
+        want_change = wants(fields, "change_24h_pct")
+        
+        for row in data_rows:
+            cells = row.select('td')
+            if len(cells) < 3:
+                continue
             
-            # Buscar filas con múltiples selectores
-            rows = []
-            row_selectors = [
-                'tr.table-light-row-cp',
-                'tr.table-light-row-wl',
-                'tr.table-light-row',
-                'tr'
-            ]
-            
-            for selector in row_selectors:
-                rows = table.select(selector)
-                if len(rows) > 1:  # Más de 1 para excluir solo el header
-                    print(f"   ✅ Encontradas {len(rows)} filas con selector: {selector}")
-                    break
-            
-            if len(rows) <= 1:
-                print(f"   ❌ No se encontraron filas de datos en {category}")
-                return []
+            # Extraer símbolo (posición varía según categoría)
+            symbol = None
+            name = None
             
-            # Debug: mostrar estructura de las primeras filas
-            print(f"   📊 Estructura de las primeras 3 filas:")
-            for i, row in enumerate(rows[:3]):
-                cells = row.select('td')
-                cell_texts = [cell.get_text(strip=True)[:30] for cell in cells]
-                print(f"      Fila {i+1}: {len(cells)} celdas - {cell_texts}")
+            if category == "stocks":
+                symbol = cells[1].get_text(strip=True) if len(cells) > 1 else cells[0].get_text(strip=True)
+                name_idx = 2
+            elif category in ("forex", "crypto", "indices", "commodities"):
+                symbol = cells[0].get_text(strip=True) if len(cells) > 0 else None
+                name_idx = 1
+            if symbol and want_name and len(cells) > name_idx:
+                name = cells[name_idx].get_text(strip=True)
             
-            # Saltar header
-            data_rows = rows[1:] if len(rows) > 1 else rows
-            print(f"   📊 Procesando {len(data_rows)} filas de datos")
+            if not symbol or len(symbol) < 1:
+                continue
             
-            for i, row in enumerate(data_rows):
-                cells = row.select('td')
-                if len(cells) < 3:
-                    print(f"      ⚠️ Fila {i+1}: solo {len(cells)} celdas, saltando")
-                    continue
-                
-                # Extraer símbolo (posición varía según categoría)
-                symbol = None
-                name = None
-                
-                if category == "forex":
-                    symbol = cells[0].get_text(strip=True) if len(cells) > 0 else None
-                    name = cells[1].get_text(strip=True) if len(cells) > 1 else None
-                elif category == "crypto":
-                    symbol = cells[0].get_text(strip=True) if len(cells) > 0 else None
-                    name = cells[1].get_text(strip=True) if len(cells) > 1 else None
-                elif category == "stocks":
-                    symbol = cells[1].get_text(strip=True) if len(cells) > 1 else cells[0].get_text(strip=True)
-                    name = cells[2].get_text(strip=True) if len(cells) > 2 else None
-                elif category == "indices":
-                    symbol = cells[0].get_text(strip=True) if len(cells) > 0 else None
-                    name = cells[1].get_text(strip=True) if len(cells) > 1 else None
-                elif category == "commodities":
-                    symbol = cells[0].get_text(strip=True) if len(cells) > 0 else None
-                    name = cells[1].get_text(strip=True) if len(cells) > 1 else None
-                
-                if not symbol or len(symbol) < 1:
-                    print(f"      ⚠️ Fila {i+1}: símbolo inválido '{symbol}'")
-                    continue
-                
-                # Debug para los primeros elementos
-                if i < 5:
-                    print(f"      DEBUG Fila {i+1}: {symbol} - Celdas: {[cell.get_text(strip=True)[:20] for cell in cells[:5]]}")
-                
-                # Buscar precio en las celdas
-                price = 0.0
-                change_pct = None
-                
-                # Buscar precio en las celdas 2-6
-                for j in range(2, min(len(cells), 7)):
-                    cell_text = cells[j].get_text(strip=True)
-                    
-                    if not price:
-                        # Intentar extraer precio
-                        try:
-                            clean_text = cell_text.replace(',', '').replace('$', '').replace('%', '').strip()
-                            potential_price = safe_float(clean_text)
-                            if potential_price and potential_price > 0 and potential_price < 1000000:
-                                price = potential_price
-                                if i < 5:
-                                    print(f"      ✅ Precio encontrado: {price} en celda {j}")
-                                break
-                        except:
-                            pass
-                
-                # Buscar cambio porcentual en las celdas siguientes
-                for j in range(3, min(len(cells), 8)):
-                    cell_text = cells[j].get_text(strip=True)
-                    if '%' in cell_text or '+' in cell_text or '-' in cell_text:
-                        change_pct = pct_change(cell_text)
-                        if change_pct is not None:
-                            if i < 5:
-                                print(f"      ✅ Cambio encontrado: {change_pct}% en celda {j}")
-                            break
-                
-                # Agregar referencia si tenemos símbolo y precio
-                if symbol and price > 0:
-                    refs.append(InstrumentRef(
-                        symbol=symbol,
-                        name=name if name and name != symbol else None,
-                        exchange=None,
-                        currency="USD" if category in ["stocks", "crypto"] else None,
-                        category=category,
-                        price=price,
-                        change_24h_pct=change_pct,
-                        change_1h_pct=None  # No disponible en Finviz por defecto
-                    ))
-                    
-                    if i < 5:
-                        print(f"      📊 Agregando: {symbol} - Precio: {price}, Cambio: {change_pct}")
-                else:
-                    if i < 5:
-                        print(f"      ❌ No se agregó: {symbol} - Precio: {price}")
+            # Columnas conocidas primero; si la celda no sirve, buscar en la fila
+            price, j = 0.0, None
+            if price_col is not None and price_col < len(cells):
+                price, j = cell_price(cells[price_col].get_text(strip=True)), price_col
+            if not price:
+                price, j = self._scan_price(cells)
+            if price:
+                price_cols[j] += 1
             
-            print(f"✅ Finviz {category}: extraídos={len(refs)} ✅")
-            return refs
+            change_pct, j = None, None
+            if want_change and change_col is not None and change_col < len(cells):
+                change_pct, j = cell_change(cells[change_col].get_text(strip=True)), change_col
+            if want_change and change_pct is None:
+                change_pct, j = self._scan_change(cells)
+            if change_pct is not None:
+                change_cols[j] += 1
             
-        except Exception as e:
-            print(f"❌ Error scraping Finviz {category}: {e}")
-            return []
+            # Agregar referencia si tenemos símbolo y precio
+            if symbol and price > 0:
+                refs.append(InstrumentRef(
+                    symbol=symbol,
+                    name=name if name and name != symbol else None,
+                    exchange=None,
+                    currency="USD" if category in ["stocks", "crypto"] else None,
+                    category=category,
+                    price=price,
+                    change_24h_pct=change_pct,
+                    change_1h_pct=None  # No disponible en Finviz por defecto
+                ))
+        
+        # Guardar la columna que ganó en la mayoría de las filas (al descubrir
+        # la tabla, o si una petición proyectada no la había leído)
+        learned = [
+            (field_name, counter)
+            for field_name, counter in (("price", price_cols), ("change", change_cols))
+            if counter and (discovered or field_name not in layout.columns)
+        ]
+        if layout is not None and refs and learned:
+            header_row = table.select_one('tr')
+            header = [cell.get_text(strip=True) for cell in header_row.select('td')] if header_row else []
+            for field_name, counter in learned:
+                col = counter.most_common(1)[0][0]
+                layout.columns[field_name] = col
+                layout.headers[field_name] = header[col] if col < len(header) else ""
+            if discovered:
+                layout_cache.put(self.name, category, layout)
+        
+        print(f"✅ Finviz {category}: {len(data_rows)} filas, extraídos={len(refs)} ✅")
+        return refs
+    
+    @staticmethod
+    def _csv_number(text: str) -> Optional[float]:
+        try:
+            return float(text)
+        except ValueError:
+            return parse_numeric(text, suffixes=False)  # "1.23%", "1,234.5", ""
+    
+    def _parse_finviz_csv(self, text: str, category: str, fields: Fields = None) -> Optional[List[InstrumentRef]]:
+        """Extraer instrumentos del export CSV de un screener de Finviz.
+        
+        Las columnas se ubican por nombre en el header (CSV_COLUMNS) y las
+        filas se leen con csv.reader sin armar ningún árbol. None si el
+        contenido no es el CSV esperado (p.ej. la página de login).
+        """
+        if text.lstrip()[:1] == "<":
+            print(f"   ⚠️ Export de Finviz {category} devolvió HTML en lugar de CSV")
+            return None
+        reader = csv.reader(io.StringIO(text))
+        header = next(reader, None)
+        if not header:
+            return None
+        positions = {name.strip().lstrip("\ufeff"): i for i, name in enumerate(header)}
+        
+        def column(field_name: str) -> Optional[int]:
+            return next((positions[name] for name in self.CSV_COLUMNS[field_name] if name in positions), None)
+        
+        symbol_at, price_at = column("symbol"), column("price")
+        if symbol_at is None or price_at is None:
+            print(f"   ⚠️ CSV de Finviz {category} sin columnas Ticker/Price: {header[:12]}")
+            return None
+        name_at = column("name") if wants(fields, "name") else None
+        change_at = column("change") if wants(fields, "change_24h_pct") else None
+        width = max(i for i in (symbol_at, price_at, name_at, change_at) if i is not None) + 1
+        currency = "USD" if category in ["stocks", "crypto"] else None
+        
+        refs = []
+        for row in reader:
+            if len(row) < width:
+                continue
+            symbol = row[symbol_at].strip()
+            price = self._csv_number(row[price_at])
+            if not symbol or not price or price <= 0:
+                continue
+            name = row[name_at].strip() if name_at is not None else None
+            refs.append(InstrumentRef(
+                symbol=symbol,
+                name=name if name and name != symbol else None,
+                exchange=None,
+                currency=currency,
+                category=category,
+                price=price,
+                change_24h_pct=self._csv_number(row[change_at]) if change_at is not None else None,
+                change_1h_pct=None
+            ))
+        
+        print(f"✅ Finviz {category} (CSV): extraídos={len(refs)} ✅")
+        return refs
     
     async def list_refs(self, category: str, cursor: Optional[str], page_size: int) -> Tuple[List[InstrumentRef], Optional[str]]:
         """Listar referencias de instrumentos con scraping real"""
@@ -257,17 +448,12 @@ class FinvizAdapter(ProviderAdapter):
             return [], None
         
         # Usar scraping real en lugar de símbolos predefinidos
-        async with httpx.AsyncClient() as client:
-            refs = await self._scrape_finviz_page(client, category)
+        client = get_client(self.base_url)
+        refs = await self._scrape_finviz_page(client, category)
         
         # Aplicar paginación
-        start_idx = 0
-        if cursor:
-            try:
-                cursor_data = json.loads(cursor)
-                start_idx = cursor_data.get("offset", 0)
-            except:
-                pass
+        position = cursor_codec.decode(cursor, self.name, category) or Cursor(self.name, category)
+        start_idx = position.offset
         
         end_idx = start_idx + page_size
         paginated_refs = refs[start_idx:end_idx]
@@ -275,7 +461,7 @@ class FinvizAdapter(ProviderAdapter):
         # Generar siguiente cursor
         next_cursor = None
         if end_idx < len(refs):
-            next_cursor = json.dumps({"offset": end_idx})
+            next_cursor = cursor_codec.encode(position.advance(end_idx - start_idx))
         
         return paginated_refs, next_cursor
     
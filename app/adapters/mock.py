@@ -1,9 +1,9 @@
 import asyncio
-import json
 from typing import List, Optional, Tuple
 from datetime import datetime
 from app.adapters.base import ProviderAdapter, InstrumentRef
 from app.models import InstrumentSnapshot
+from app.pagination import Cursor, cursor_codec
 
 class MockAdapter(ProviderAdapter):
     name = "mock"
@@ -63,13 +63,8 @@ class MockAdapter(ProviderAdapter):
             return [], None
         
         # Aplicar paginación
-        start_idx = 0
-        if cursor:
-            try:
-                cursor_data = json.loads(cursor)
-                start_idx = cursor_data.get("offset", 0)
-            except:
-                pass
+        position = cursor_codec.decode(cursor, self.name, category) or Cursor(self.name, category)
+        start_idx = position.offset
         
         end_idx = min(start_idx + page_size, len(symbols))
         current_symbols = symbols[start_idx:end_idx]
@@ -85,7 +80,7 @@ class MockAdapter(ProviderAdapter):
         
         next_cursor = None
         if end_idx < len(symbols):
-            next_cursor = json.dumps({"offset": end_idx})
+            next_cursor = cursor_codec.encode(position.advance(end_idx - start_idx))
         
         return refs, next_cursor
     
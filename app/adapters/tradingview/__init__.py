@@ -1,4 +1,5 @@
 from . import indices, crypto, forex, futures, stocks
+from .adapter import TradingViewAdapter
 
 __all__ = [
     "indices",
@@ -6,6 +7,7 @@ __all__ = [
     "forex",
     "futures",
     "stocks",
+    "TradingViewAdapter",
 ]
 
 
@@ -1,11 +1,22 @@
-import asyncio
+import functools
+import os
 import httpx
-from typing import Optional, Tuple, List
-from selectolax.parser import HTMLParser
-from bs4 import BeautifulSoup  # Fallback
-import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Optional, List
+from selectolax.lexbor import LexborHTMLParser
 from app.adapters.base import InstrumentRef
-from app.utils import get_headers, parse_number
+from app.utils import get_headers
+from app.numeric import parse_numeric
+from app.http_client import get_client, fetch_parsed, fetch_streamed, limited_get
+from app.stream_parser import TableRowStreamer
+from app.single_flight import normalize_url, single_flight
+from app.page_fetcher import fetch_pages, PageResult
+from app.anti_detection import HostBudget, host_limiters
+from app.deadline import deadline_expired, mark_partial
+from app.projection import Fields, current_fields, parser_fields, projected_key, wants
+from app.snapshots import snapshot_store
+from app.crawl_planner import crawl_planner, fetch_rows
+from app.pagination import Cursor, cursor_codec
 
 
 TV_URLS = {
@@ -16,62 +27,74 @@ TV_URLS = {
     "stocks": "https://www.tradingview.com/markets/stocks-usa/market-movers-large-cap/",
 }
 
+MAX_PAGES = 10
+# Tope de páginas de un recorrido completo (iter_category)
+FULL_CRAWL_MAX_PAGES = 100
+# Páginas en vuelo a la vez
+PAGE_WINDOW = int(os.getenv("TV_PAGE_WINDOW", "6"))
+
+# Parsear las páginas mientras se descargan (ver app/stream_parser.py). Es
+# html.parser puro en el event loop: por defecto se parsea con lexbor en el
+# pool de procesos (fetch_parsed)
+STREAM_PARSE = os.getenv("TV_STREAM_PARSE", "false").lower() == "true"
+
+# Mismo presupuesto de host que TradingViewAdapter
+host_limiters.register(
+    "https://www.tradingview.com",
+    HostBudget(
+        requests_per_second=float(os.getenv("TV_MAX_RPS", "5")),
+        burst=PAGE_WINDOW,
+    ),
+)
+
+
 
 def normalize_number(text: str) -> Optional[float]:
-    if not text:
-        return None
-    t = (text.replace("\xa0", " ")
-              .replace("USD", "")
-              .replace("$", "")
-              .replace(",", "")
-              .replace("%", "")
-              .strip())
-    t = re.sub(r"\s+", " ", t)
-    if t == "" or t in {"-", "N/A"}:
-        return None
-    try:
-        return float(t)
-    except ValueError:
-        # Intentar coma como decimal
-        try:
-            return float(t.replace(" ", "").replace(",", "."))
-        except ValueError:
-            return None
+    # La celda entera debe ser el número (más un código de moneda)
+    return parse_numeric(text, strict=True)
 
 
 async def fetch_html(client: httpx.AsyncClient, url: str, timeout: int = 8) -> Optional[str]:
     headers = get_headers()
     headers["Accept-Language"] = "es-CO,es;q=0.9,en;q=0.8"
-    try:
-        resp = await client.get(url, headers=headers, timeout=timeout)
+    async def download() -> str:
+        resp = await limited_get(client, url, headers=headers, timeout=timeout)
         resp.raise_for_status()
         return resp.text
+
+    try:
+        return await single_flight.do((normalize_url(url), "html"), download)
     except Exception as e:
         print(f"❌ fetch_html error: {e}")
         return None
 
 
-def extract_rows_selectolax(html: str) -> list:
-    tree = HTMLParser(html)
+def extract_rows_selectolax(html) -> list:
+    tree = html if isinstance(html, LexborHTMLParser) else LexborHTMLParser(html)
     # Intentar varias tablas/cuerpos
     rows = tree.css("table tbody tr")
-    if rows:
+    # Un tbody vacío es una página sin filas (pasada la última), no otro marcado:
+    # el fallback contaría la fila del thead
+    if rows or tree.css_first("table tbody") is not None:
         return rows
     # Fallback: cualquier tr
     rows = tree.css("tr")
     return rows
 
 
-def find_header_positions(html: str) -> dict:
-    # Usar BeautifulSoup para leer headers por texto
-    soup = BeautifulSoup(html, "html.parser")
-    thead = soup.find("thead")
+def find_header_positions(html) -> dict:
+    # Headers por texto, desde el mismo árbol lexbor que las filas
+    tree = html if isinstance(html, LexborHTMLParser) else LexborHTMLParser(html)
+    thead = tree.css_first("thead")
+    if thead is None:
+        return {}
+    return header_positions([th.text(strip=True) for th in thead.css("th")])
+
+
+def header_positions(header_texts: List[str]) -> dict:
     positions = {}
-    if not thead:
-        return positions
-    headers = thead.find_all("th")
-    for idx, th in enumerate(headers):
-        txt = th.get_text(strip=True).lower()
+    for idx, text in enumerate(header_texts):
+        txt = text.lower()
         if "price" in txt or "last" in txt:
             positions["price"] = idx
         if "24" in txt and "%" in txt:
@@ -79,6 +102,21 @@ def find_header_positions(html: str) -> dict:
     return positions
 
 
+# Celdas donde se busca el precio si el header no lo ubica
+PRICE_FALLBACK_CELLS = range(1, 5)
+
+
+def wanted_cells(header_pos: dict, fields: Fields = None) -> frozenset:
+    """Índices de celda que usa build_ref (se resuelve una vez por página);
+    la columna de cambio solo si la proyección la pide"""
+    wanted = {0, *PRICE_FALLBACK_CELLS}
+    if "price" in header_pos:
+        wanted.add(header_pos["price"])
+    if "change24" in header_pos and wants(fields, "change_24h_pct"):
+        wanted.add(header_pos["change24"])
+    return frozenset(wanted)
+
+
 def parse_row(row, category: str, header_pos: dict) -> Optional[InstrumentRef]:
     # Intentar Selectolax API si el row es Node, sino fallback a bs4 Tag
     def cell_texts():
@@ -89,31 +127,55 @@ def parse_row(row, category: str, header_pos: dict) -> Optional[InstrumentRef]:
             tds = row.find_all("td") if hasattr(row, "find_all") else []
             return [td.get_text(strip=True) for td in tds]
 
-    cells = cell_texts()
-    if len(cells) < 2:
+    return parse_cells(cell_texts(), category, header_pos)
+
+
+def parse_row_node(row, category: str, header_pos: dict, wanted: frozenset, fields: Fields = None) -> Optional[InstrumentRef]:
+    """Como parse_row para un Node de selectolax, leyendo solo el texto de
+    las celdas en `wanted` (las demás se cuentan pero no se extraen)"""
+    texts = {}
+    count = 0
+    for td in row.iter():
+        if td.tag != "td":
+            continue
+        if count in wanted:
+            texts[count] = td.text(strip=True)
+        count += 1
+    return build_ref(texts.__getitem__, count, category, header_pos, fields)
+
+
+def parse_cells(cells: List[str], category: str, header_pos: dict, fields: Fields = None) -> Optional[InstrumentRef]:
+    return build_ref(cells.__getitem__, len(cells), category, header_pos, fields)
+
+
+def build_ref(cell: Callable[[int], str], count: int, category: str, header_pos: dict, fields: Fields = None) -> Optional[InstrumentRef]:
+    if count < 2:
         return None
 
     # Símbolo suele ir en la primera celda como enlace/texto
-    symbol = cells[0].split()[0] if cells[0] else None
+    first = cell(0)
+    symbol = first.split()[0] if first else None
     if not symbol or len(symbol) > 20:
         return None
 
     # Precio
     price = None
-    if "price" in header_pos and header_pos["price"] < len(cells):
-        price = normalize_number(cells[header_pos["price"]])
+    if "price" in header_pos and header_pos["price"] < count:
+        price = normalize_number(cell(header_pos["price"]))
     if price is None:
         # Fallback: buscar en primeras 4 celdas numérico
-        for i in range(1, min(5, len(cells))):
-            val = normalize_number(cells[i])
+        for i in PRICE_FALLBACK_CELLS:
+            if i >= count:
+                break
+            val = normalize_number(cell(i))
             if val is not None:
                 price = val
                 break
 
-    # Cambio 24h si existe
+    # Cambio 24h si existe (y si se pidió)
     change_24h = None
-    if "change24" in header_pos and header_pos["change24"] < len(cells):
-        change_24h = normalize_number(cells[header_pos["change24"]])
+    if "change24" in header_pos and header_pos["change24"] < count and wants(fields, "change_24h_pct"):
+        change_24h = normalize_number(cell(header_pos["change24"]))
 
     if price is None or price <= 0:
         return None
@@ -130,42 +192,221 @@ def parse_row(row, category: str, header_pos: dict) -> Optional[InstrumentRef]:
     )
 
 
-async def list_refs_for_category(category: str, cursor: Optional[str], page_size: int) -> tuple[list[InstrumentRef], Optional[str], int]:
+def parse_page_html(html: str, category: str, fields: Fields = None) -> tuple[int, list[InstrumentRef]]:
+    # Un solo parseo: headers y filas salen del mismo árbol
+    tree = LexborHTMLParser(html)
+    header_pos = find_header_positions(tree)
+    wanted = wanted_cells(header_pos, fields)
+    rows = extract_rows_selectolax(tree)
+    refs: list[InstrumentRef] = []
+    for node in rows:
+        ref = parse_row_node(node, category, header_pos, wanted, fields)
+        if ref:
+            refs.append(ref)
+    return len(rows), refs
+
+
+def parse_page_result(html: str, category: str, page: int, fields: Fields = None) -> PageResult:
+    # Función de módulo: se puede enviar al pool de parseo
+    rows, refs = parse_page_html(html, category, fields)
+    return PageResult(page=page, rows=rows, items=refs)
+
+
+class StreamingPage(TableRowStreamer):
+    """Parser incremental de una página: cada fila se convierte en
+    InstrumentRef en cuanto se cierra su <tr>"""
+
+    def __init__(self, category: str, fields: Fields = None):
+        super().__init__(on_row=self._add_row)
+        self.category = category
+        self.fields = fields
+        self.refs: list[InstrumentRef] = []
+        self._header_pos: Optional[dict] = None
+
+    def handle_endtag(self, tag):
+        super().handle_endtag(tag)
+        if tag == "thead" and self._header_pos is None and self.headers is not None:
+            # Con los headers ya se sabe qué celdas hacen falta; las demás no se leen
+            self._header_pos = header_positions(self.headers)
+            if self.fields is not None:
+                self.wanted = wanted_cells(self._header_pos, self.fields)
+
+    def _add_row(self, cells: List[str]) -> None:
+        if self._header_pos is None and self.headers is not None:
+            self._header_pos = header_positions(self.headers)
+        ref = parse_cells(cells, self.category, self._header_pos or {}, self.fields)
+        if ref:
+            self.refs.append(ref)
+
+
+async def fetch_page(client: httpx.AsyncClient, category: str, page: int) -> Optional[PageResult]:
     url = TV_URLS[category]
-    start_offset = 0
-    if cursor:
-        try:
-            import base64, json
-            start_offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode()).decode()).get("offset", 0))
-        except Exception:
-            start_offset = 0
+    page_url = url if page == 1 else f"{url}?page={page}"
+    headers = get_headers()
+    headers["Accept-Language"] = "es-CO,es;q=0.9,en;q=0.8"
+    fields = parser_fields(current_fields())
+    parse_key = projected_key("tv_common", fields)
+
+    # Se parsea apenas llega, mientras las demás páginas siguen descargándose.
+    # Un 304 reutiliza las filas del último parseo de esta URL.
+    try:
+        if STREAM_PARSE:
+            return await fetch_streamed(
+                client, page_url,
+                lambda: StreamingPage(category, fields),
+                lambda parser: PageResult(page=page, rows=parser.rows, items=parser.refs),
+                parse_key, headers=headers, timeout=8,
+            )
+        parse = functools.partial(parse_page_result, category=category, page=page, fields=fields)
+        return await fetch_parsed(client, page_url, parse, parse_key, headers=headers, timeout=8)
+    except Exception as e:
+        print(f"❌ fetch_html error: {e}")
+        return None
+
+
+@dataclass
+class CategoryWalk:
+    """Cómo terminó un recorrido de iter_category_pages: `complete` si llegó
+    al final de la categoría; si no, `next_page` es la primera que falta"""
+    complete: bool = False
+    next_page: int = 1
+
+
+async def iter_category_pages(category: str, max_pages: int = FULL_CRAWL_MAX_PAGES, walk: Optional[CategoryWalk] = None) -> AsyncIterator[PageResult]:
+    """Cada página de la categoría una sola vez, en orden, hasta la página corta.
 
+    Sin modelo la primera tanda es la página 1 (enseña filas/página); si el
+    planificador ya conoce el número de páginas se piden justo esas, y si no,
+    tandas de PAGE_WINDOW. fetch_pages omite las páginas fallidas: el
+    recorrido se corta en el primer hueco. Si termina antes del final (hueco,
+    `max_pages` o deadline) marca mark_partial y `walk` dice dónde reanudar.
+    """
+    walk = walk if walk is not None else CategoryWalk()
+    url = TV_URLS[category]
+    client = get_client(url)
+    next_page = 1
+    while next_page <= max_pages and not deadline_expired():
+        model = crawl_planner.model(url)
+        if model is None:
+            batch = 1
+        elif model.pages and model.pages >= next_page:
+            batch = model.pages - next_page + 1
+        else:
+            batch = PAGE_WINDOW
+        batch = min(batch, max_pages - next_page + 1)
+        results = await fetch_pages(
+            lambda page: fetch_page(client, category, page),
+            max_pages=batch,
+            window=min(batch, PAGE_WINDOW),
+            page_size_hint=model.rows_per_page if model else None,
+            start_page=next_page,
+        )
+        crawl_planner.observe(url, results)
+        full_size = crawl_planner.rows_per_page(url) or 0
+        gap = False
+        for result in results:
+            if result.page != next_page:
+                gap = True  # Página fallida en el medio
+                break
+            yield result
+            next_page = walk.next_page = result.page + 1
+            # Fin de la categoría: página vacía o corta
+            if result.rows == 0 or result.rows < full_size:
+                walk.complete = True
+                return
+        if gap or len(results) < batch:
+            break  # Hueco o páginas fallidas al final de la tanda
+        # La última página conocida vino igual que antes: no hace falta confirmar con otra
+        model = crawl_planner.model(url)
+        if model and model.pages is not None and next_page > model.pages:
+            walk.complete = True
+            return
+    print(f"⚠️ {category}: recorrido cortado antes del final, sigue en la página {walk.next_page}")
+    mark_partial()
+
+
+async def iter_category(category: str, max_pages: int = FULL_CRAWL_MAX_PAGES) -> AsyncIterator[List[InstrumentRef]]:
+    """Filas de la categoría por página fuente, sin volver a la página 1"""
+    async for result in iter_category_pages(category, max_pages):
+        if result.items:
+            yield result.items
+
+
+async def crawl_category(category: str) -> tuple[list[InstrumentRef], int, bool, tuple[int, ...]]:
+    """Todas las páginas de la categoría (hasta MAX_PAGES):
+    (filas, filas fuente, completo, offset donde empieza cada página)"""
     refs: list[InstrumentRef] = []
+    # page_starts[página - 1]: el recorrido va de la página 1 sin huecos
+    page_starts: list[int] = []
     expected_rows = 0
-    async with httpx.AsyncClient(http2=True, timeout=8) as client:
-        page = 1
-        while len(refs) < start_offset + page_size and page <= 10:
-            page_url = url if page == 1 else f"{url}?page={page}"
-            html = await fetch_html(client, page_url, timeout=8)
-            if not html:
-                break
-            header_pos = find_header_positions(html)
-            rows = extract_rows_selectolax(html)
-            expected_rows += len(rows) if rows else 0
-            for node in rows:
-                ref = parse_row(node, category, header_pos)
-                if ref:
-                    refs.append(ref)
-            if not rows:
-                break
-            page += 1
+    walk = CategoryWalk()
+    async for result in iter_category_pages(category, MAX_PAGES, walk):
+        expected_rows += result.rows
+        page_starts.append(len(refs))
+        refs.extend(result.items)
+    # Incompleto si se cortó en un hueco, en MAX_PAGES o por el deadline
+    return refs, expected_rows, walk.complete, tuple(page_starts)
 
-    total = len(refs)
-    sliced = refs[start_offset:start_offset + page_size]
+
+async def fetch_from(position: Cursor, page_size: int) -> tuple[list[InstrumentRef], Optional[str], int]:
+    """`page_size` filas desde la página/fila del cursor, sin las páginas anteriores"""
+    url = TV_URLS[position.category]
+    client = get_client(url)
+    window = await fetch_rows(
+        url,
+        lambda page: fetch_page(client, position.category, page),
+        position.page,
+        position.row or 0,
+        page_size,
+        window=PAGE_WINDOW,
+    )
     next_cursor = None
-    if start_offset + page_size < total:
-        import base64, json
-        next_cursor = base64.urlsafe_b64encode(json.dumps({"offset": start_offset + page_size}).encode()).decode()
-    return sliced, next_cursor, expected_rows
+    if window.items and not window.exhausted:
+        next_cursor = cursor_codec.encode(position.advance(len(window.items), window.page, window.row))
+    total = crawl_planner.total_rows(url)
+    print(f"🧭 {position.category}: página {position.page} fila {position.row} -> {len(window.items)} filas")
+    return window.items, next_cursor, total if total is not None else position.offset + len(window.items)
+
+
+async def list_refs_for_category(category: str, cursor: Optional[str], page_size: int) -> tuple[list[InstrumentRef], Optional[str], int]:
+    """Página `cursor` de la categoría.
+
+    Con un snapshot vigente (la época del cursor o el último completo) solo
+    se corta el snapshot. Si no, el cursor dice en qué página fuente y fila
+    sigue la lista y se descargan solo las páginas desde ahí; una primera
+    página usa el modelo del planificador, y sin modelo todavía se lee desde
+    la página 1 solo lo necesario. Si el pedido cubre la categoría entera se
+    crawlea todo en un snapshot nuevo.
+    """
+    url = TV_URLS[category]
+    position = cursor_codec.decode(cursor, "tradingview", category) or Cursor("tradingview", category)
 
+    key = ("tradingview", category, current_fields(), None)
+    snapshot = snapshot_store.get(position.epoch, key) if position.epoch is not None else snapshot_store.current(key)
+    if snapshot is None or (not snapshot.complete and position.offset + page_size > len(snapshot.refs)):
+        if position.page is None:
+            pages = crawl_planner.plan(url, position.offset, page_size)
+            model = crawl_planner.model(url)
+            if pages is None:
+                # Sin modelo (o con filas descartadas por el parser): desde la página 1
+                # y solo hasta reunir offset + page_size filas
+                position = Cursor("tradingview", category, position.offset, 1, position.offset)
+            elif not pages:
+                return [], None, model.total_rows  # Más allá del final de la categoría
+            elif not (model.pages and pages.start == 1 and len(pages) >= model.pages):
+                row = position.offset - (pages.start - 1) * model.rows_per_page
+                position = Cursor("tradingview", category, position.offset, pages.start, row)
+        if position.page is not None:
+            return await fetch_from(position, page_size)
+        snapshot = await snapshot_store.materialize(key, lambda: crawl_category(category))
 
+    sliced = snapshot.page(position.offset, page_size)
+    end = position.offset + len(sliced)
+    next_cursor = None
+    if end < len(snapshot.refs) or not snapshot.complete:
+        if not snapshot.complete and end >= len(snapshot.refs):
+            # Crawl cortado por el deadline: el cursor reanuda donde se quedó
+            mark_partial()
+        page, row = snapshot.position(end)
+        next_cursor = cursor_codec.encode(Cursor("tradingview", category, end, page, row, snapshot.epoch))
+    return sliced, next_cursor, snapshot.expected_rows
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Screener de TradingView: endpoint JSON de scan (POST /<mercado>/scan)
+
+Una petición trae miles de filas ya tipadas (sin HTML ni DOM que recorrer);
+el adaptador lo usa con TV_SCANNER=1 y vuelve a las páginas HTML si falla.
+"""
+import os
+import json
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from app.adapters.base import InstrumentRef
+from app.deadline import DeadlineExceeded, deadline_expired, mark_partial
+from app.http_client import limited_post
+from app.projection import Fields, wants
+from app.single_flight import normalize_url, single_flight
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+SCANNER_URL = os.getenv("TV_SCANNER_URL", "https://scanner.tradingview.com")
+# Filas por petición de scan
+SCAN_RANGE = int(os.getenv("TV_SCAN_RANGE", "1000"))
+
+# Mercado del screener y filtro por categoría del adaptador
+SCANNER_MARKETS: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {
+    "indices": ("global", [{"left": "type", "operation": "equal", "right": "index"}]),
+    "crypto": ("crypto", []),
+    "forex": ("forex", []),
+    "commodities": ("futures", []),
+    "stocks": ("america", [{"left": "type", "operation": "equal", "right": "stock"}]),
+}
+
+# Columnas que siempre se piden: símbolo y precio deciden si la fila es válida
+BASE_COLUMNS = ("name", "close")
+# Campo de InstrumentRef -> columna del screener (se piden según la proyección)
+FIELD_COLUMNS = {"name": "description", "currency": "currency", "change_24h_pct": "change"}
+
+
+def loads(content: bytes) -> Any:
+    return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload) if ORJSON_AVAILABLE else json.dumps(payload, separators=(",", ":")).encode()
+
+
+def scan_url(category: str, base_url: str = SCANNER_URL) -> str:
+    market, _ = SCANNER_MARKETS[category]
+    return f"{base_url.rstrip('/')}/{market}/scan"
+
+
+def scan_columns(fields: Fields = None) -> List[str]:
+    return list(BASE_COLUMNS) + [column for field, column in FIELD_COLUMNS.items() if wants(fields, field)]
+
+
+def scan_payload(category: str, start: int, end: int, fields: Fields = None) -> Dict[str, Any]:
+    """Cuerpo del POST: filas [start, end) ordenadas de forma estable"""
+    _, filters = SCANNER_MARKETS[category]
+    return {
+        "filter": filters,
+        "columns": scan_columns(fields),
+        "sort": {"sortBy": "name", "sortOrder": "asc"},
+        "range": [start, end],
+    }
+
+
+def decode_scan(content: bytes, category: str, columns: List[str]) -> Tuple[int, List[InstrumentRef]]:
+    """(totalCount, filas con precio > 0) de una respuesta de scan"""
+    payload = loads(content)
+    index = {column: i for i, column in enumerate(columns)}
+    name_at = index.get("description")
+    currency_at = index.get("currency")
+    change_at = index.get("change")
+
+    refs = []
+    for item in payload.get("data") or ():
+        values = item.get("d")
+        if not values or len(values) < len(columns):
+            continue
+        symbol, price = values[0], values[1]
+        if not symbol or not isinstance(price, (int, float)) or price <= 0:
+            continue
+        change = values[change_at] if change_at is not None else None
+        # Posicional: (symbol, name, exchange, currency, category, price, change_24h_pct)
+        refs.append(InstrumentRef(
+            symbol,
+            (values[name_at] or symbol) if name_at is not None else symbol,
+            item.get("s", "").partition(":")[0] or None,
+            values[currency_at] if currency_at is not None else None,
+            category,
+            float(price),
+            float(change) if isinstance(change, (int, float)) else None,
+        ))
+    return int(payload.get("totalCount") or 0), refs
+
+
+async def _scan_range(
+    client: httpx.AsyncClient,
+    category: str,
+    start: int,
+    end: int,
+    fields: Fields,
+    base_url: str,
+    headers: Optional[Dict[str, str]],
+    timeout: float,
+) -> Tuple[int, List[InstrumentRef]]:
+    url = scan_url(category, base_url)
+    payload = scan_payload(category, start, end, fields)
+    body = dumps(payload)
+
+    async def post():
+        response = await limited_post(client, url, content=body, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return decode_scan(response.content, category, payload["columns"])
+
+    # El cuerpo distingue rangos y columnas: misma clave, misma respuesta
+    return await single_flight.do((normalize_url(url), body.decode()), post)
+
+
+async def scan_category(
+    client: httpx.AsyncClient,
+    category: str,
+    max_rows: int,
+    fields: Fields = None,
+    base_url: str = SCANNER_URL,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 15,
+    scan_range: int = SCAN_RANGE,
+) -> List[InstrumentRef]:
+    """Filas de una categoría en rangos de `scan_range`.
+
+    El primer rango trae totalCount; el resto se pide en paralelo (el
+    limitador del host pone el techo). Los errores se propagan para que el
+    adaptador vuelva al HTML; si vence el deadline se devuelve lo que haya.
+    """
+    first_end = min(scan_range, max_rows)
+    total, first = await _scan_range(client, category, 0, first_end, fields, base_url, headers, timeout)
+    refs = list(first)  # La lista del primer rango puede estar compartida por single-flight
+    limit = min(total, max_rows)
+    if limit <= first_end:
+        return refs
+    if deadline_expired():
+        mark_partial()
+        return refs
+
+    tasks = [
+        asyncio.ensure_future(_scan_range(
+            client, category, start, min(start + scan_range, limit), fields, base_url, headers, timeout
+        ))
+        for start in range(first_end, limit, scan_range)
+    ]
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for task in tasks:
+            task.cancel()
+    for result in results:
+        if isinstance(result, DeadlineExceeded):
+            mark_partial()
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            refs.extend(result[1])
+    return refs
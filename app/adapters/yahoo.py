@@ -1,21 +1,30 @@
-import asyncio
+import functools
 import httpx
-import json
-import random
-from typing import List, Optional, Tuple
+from collections import Counter
+from typing import Any, Callable, List, Optional, Tuple
 from datetime import datetime
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_any, stop_after_attempt, wait_exponential, retry_if_exception_type
 from app.adapters.base import ProviderAdapter, InstrumentRef
 from app.models import InstrumentSnapshot
-from app.utils import get_headers, parse_number, safe_float, pct_change
+from app.utils import get_headers, parse_number
+from app.numeric import cell_change, cell_price
+from app.http_client import get_client, fetch_parsed, limited_get
+from app.anti_detection import HostBudget, host_limiters
+from app.deadline import deadline_expired
+from app.layout_cache import TableLayout, layout_cache, layout_fingerprint
+from app.projection import Fields, current_fields, parser_fields, projected_key, wants
+from app.pagination import Cursor, cursor_codec
 from bs4 import BeautifulSoup
 
 class YahooAdapter(ProviderAdapter):
     name = "yahoo"
+    # Presupuesto del host: Yahoo limita agresivamente, ~1 req/s sin ráfagas grandes
+    host_budget = HostBudget(requests_per_second=1.0, burst=2)
     
     def __init__(self, timeout: int = 8):
         self.timeout = timeout
         self.base_url = "https://finance.yahoo.com"
+        host_limiters.register(self.base_url, self.host_budget)
         # URLs específicas actualizadas según los requerimientos
         self.screeners = {
             "forex": "https://finance.yahoo.com/currencies",
@@ -41,20 +50,34 @@ class YahooAdapter(ProviderAdapter):
         }
     
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_any(stop_after_attempt(3), lambda retry_state: deadline_expired()),
         wait=wait_exponential(multiplier=1, min=1, max=10),
         retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.RequestError))
     )
-    async def _make_request(self, client: httpx.AsyncClient, url: str, params: dict = None) -> Optional[str]:
-        """Hacer petición HTTP con retry y rate limiting"""
-        # Delay aleatorio adicional
-        await asyncio.sleep(random.uniform(0.5, 2.0))
+    async def _make_request(self, client: httpx.AsyncClient, url: str, params: dict = None, parse: Optional[Callable[[str], Any]] = None, parse_key: Optional[str] = None) -> Any:
+        """Hacer petición HTTP con retry y rate limiting.
         
+        El ritmo lo impone el limitador del host; con `parse`, la petición es
+        condicional y devuelve las filas parseadas.
+        """
         # Usar headers específicos de Yahoo
         headers = self.headers.copy()
         
         try:
-            response = await client.get(
+            if parse is not None:
+                full_url = str(httpx.URL(url, params=params)) if params else url
+                return await fetch_parsed(
+                    client,
+                    full_url,
+                    parse,
+                    parse_key or self.name,
+                    headers=headers,
+                    timeout=self.timeout,
+                    follow_redirects=True
+                )
+            
+            response = await limited_get(
+                client,
                 url, 
                 params=params,
                 headers=headers, 
@@ -62,12 +85,6 @@ class YahooAdapter(ProviderAdapter):
                 follow_redirects=True
             )
             
-            # Manejar códigos de estado específicos
-            if response.status_code == 429:
-                print("⚠️ Yahoo Finance rate limit hit - waiting longer")
-                await asyncio.sleep(random.uniform(5, 15))
-                raise httpx.HTTPStatusError("Rate limited", request=response.request, response=response)
-            
             response.raise_for_status()
             return response.text
                 
@@ -76,6 +93,9 @@ class YahooAdapter(ProviderAdapter):
             # Para 404, no reintentar
             if e.response.status_code == 404:
                 return None
+            if e.response.status_code == 429:
+                # El limitador ya redujo la tasa del host; el retry esperará su turno
+                print("⚠️ Yahoo Finance rate limit hit - backing off")
             raise
         except Exception as e:
             print(f"Yahoo request error: {e}")
@@ -91,145 +111,210 @@ class YahooAdapter(ProviderAdapter):
         print(f"🎯 Objetivo: extraer símbolos de {category} desde {url}")
         
         try:
-            html_content = await self._make_request(client, url)
-            if not html_content:
+            fields = parser_fields(current_fields())
+            refs = await self._make_request(
+                client,
+                url,
+                parse=functools.partial(self._parse_yahoo_html, category=category, fields=fields),
+                parse_key=projected_key(self.name, fields),
+            )
+            if refs is None:
                 print(f"⚠️ No se pudo obtener contenido de {url}")
                 return []
+            return refs
             
-            soup = BeautifulSoup(html_content, 'html.parser')
-            refs = []
-            
-            # Buscar tabla con múltiples selectores
-            table = None
-            table_selectors = [
-                'table[data-test="fin-table"]',
-                'table[class*="table"]',
-                'table[class*="W(100%)"]',
-                'table',
-                '[data-test="fin-table"]',
-                '.fin-table'
-            ]
+        except Exception as e:
+            print(f"❌ Error scraping Yahoo {category}: {e}")
+            return []
+    
+    # Selectores de tabla en orden de preferencia
+    TABLE_SELECTORS = (
+        'table[data-test="fin-table"]',
+        'table[class*="table"]',
+        'table[class*="W(100%)"]',
+        'table',
+        '[data-test="fin-table"]',
+        '.fin-table'
+    )
+    
+    def _fingerprint(self, table, rows) -> str:
+        """Huella de la tabla: clase, textos del header y celdas por fila"""
+        header = [cell.get_text(strip=True) for cell in rows[0].select('th, td')] if rows else []
+        cells_per_row = len(rows[1].select('td')) if len(rows) > 1 else 0
+        return layout_fingerprint(table.get('class'), header, cells_per_row)
+    
+    def _find_table(self, soup: BeautifulSoup, category: str):
+        """Tabla y filas de datos, desde el layout en caché si la huella coincide"""
+        layout = layout_cache.get(self.name, category)
+        if layout is not None:
+            table = soup.select_one(layout.selector)
+            rows = table.select('tr') if table else []
+            if len(rows) > 1 and self._fingerprint(table, rows) == layout.fingerprint:
+                layout_cache.record_hit()
+                return table, rows, layout
+            print(f"   🔄 Layout de Yahoo {category} cambió, redescubriendo tabla")
+            layout_cache.invalidate(self.name, category)
+        
+        for selector in self.TABLE_SELECTORS:
+            table = soup.select_one(selector)
+            if table:
+                print(f"   ✅ Tabla encontrada con selector: {selector}")
+                rows = table.select('tr')
+                return table, rows, None if len(rows) <= 1 else TableLayout(
+                    selector=selector, fingerprint=self._fingerprint(table, rows)
+                )
+        return None, [], None
+    
+    def _scan_price(self, cells) -> Tuple[float, Optional[int]]:
+        """Primer valor numérico válido en las celdas 1-6"""
+        for j in range(1, min(len(cells), 7)):
+            price = cell_price(cells[j].get_text(strip=True))
+            if price:
+                return price, j
+        return 0.0, None
+    
+    def _scan_change(self, cells) -> Tuple[Optional[float], Optional[int]]:
+        """Primer cambio porcentual en las celdas 2-7"""
+        for j in range(2, min(len(cells), 8)):
+            change_pct = cell_change(cells[j].get_text(strip=True))
+            if change_pct is not None:
+                return change_pct, j
+        return None, None
+    
+    def _parse_yahoo_html(self, html_content: str, category: str, fields: Fields = None) -> List[InstrumentRef]:
+        """Extraer instrumentos del HTML de una página de Yahoo Finance.
+        
+        Con un layout en caché se va directo a la tabla y columnas conocidas;
+        los selectores se vuelven a probar solo si cambia la huella de la tabla.
+        Con `fields`, el nombre y el cambio solo se leen si se pidieron.
+        """
+        soup = BeautifulSoup(html_content, 'html.parser')
+        refs = []
+        
+        # Buscar tabla con múltiples selectores
+        table, rows, layout = self._find_table(soup, category)
+        
+        if not table:
+            print(f"   ❌ No se encontró tabla en {category}")
+            # Intentar buscar elementos de lista como fallback
+            list_items = soup.select('[data-test="quoteLink"], .quote-link, a[href*="/quote/"]')
+            if list_items:
+                print(f"   ✅ Encontrados {len(list_items)} elementos de lista")
+                for item in list_items:
+                    symbol = item.get_text(strip=True)
+                    if symbol and len(symbol) > 1 and len(symbol) < 20:
+                        refs.append(InstrumentRef(
+                            symbol=symbol,
+                            name=symbol,
+                            exchange=None,
+                            currency="USD" if category in ["stocks", "crypto"] else None,
+                            category=category,
+                            price=0.0,  # Precio por defecto
+                            change_24h_pct=None,
+                            change_1h_pct=None
+                        ))
+                print(f"   📊 {len(refs)} símbolos extraídos de lista")
+                return refs
+            else:
+                print(f"   ❌ No se encontraron elementos en {category}")
+                return []
+        
+        if len(rows) <= 1:
+            print(f"   ❌ No se encontraron filas de datos en {category}")
+            return []
+        
+        # Saltar header
+        data_rows = rows[1:] if len(rows) > 1 else rows
+        print(f"   📊 Procesando {len(data_rows)} filas de datos")
+        
+        discovered = layout is None or not layout.columns
+        price_col = None if discovered else layout.columns.get("price")
+        change_col = None if discovered else layout.columns.get("change")
+        price_cols, change_cols = Counter(), Counter()
+        want_change = wants(fields, "change_24h_pct")
+        
+        for i, row in enumerate(data_rows):
+            cells = row.select('td')
+            if len(cells) < 3:
+                continue
             
-            for selector in table_selectors:
-                table = soup.select_one(selector)
-                if table:
-                    print(f"   ✅ Tabla encontrada con selector: {selector}")
-                    break
+            # Extraer símbolo (posición varía según categoría)
+            symbol = None
+            name = None
             
-            if not table:
-                print(f"   ❌ No se encontró tabla en {category}")
-                # Intentar buscar elementos de lista como fallback
-                list_items = soup.select('[data-test="quoteLink"], .quote-link, a[href*="/quote/"]')
-                if list_items:
-                    print(f"   ✅ Encontrados {len(list_items)} elementos de lista")
-                    for item in list_items:
-                        symbol = item.get_text(strip=True)
-                        if symbol and len(symbol) > 1 and len(symbol) < 20:
-                            refs.append(InstrumentRef(
-                                symbol=symbol,
-                                name=symbol,
-                                exchange=None,
-                                currency="USD" if category in ["stocks", "crypto"] else None,
-                                category=category,
-                                price=0.0,  # Precio por defecto
-                                change_24h_pct=None,
-                                change_1h_pct=None
-                            ))
-                    print(f"   📊 {len(refs)} símbolos extraídos de lista")
-                    return refs
-                else:
-                    print(f"   ❌ No se encontraron elementos en {category}")
-                    return []
+            # Buscar enlace de símbolo
+            symbol_link = row.select_one('a[href*="/quote/"]') or row.select_one('[data-test="quoteLink"]')
+            if symbol_link:
+                symbol = symbol_link.get_text(strip=True)
+                name = symbol
+            else:
+                # Fallback: usar primera celda
+                symbol = cells[0].get_text(strip=True) if len(cells) > 0 else None
+                if wants(fields, "name"):
+                    name = cells[1].get_text(strip=True) if len(cells) > 1 else None
             
-            # Buscar filas
-            rows = table.select('tr')
-            if len(rows) <= 1:
-                print(f"   ❌ No se encontraron filas de datos en {category}")
-                return []
+            if not symbol or len(symbol) < 1:
+                continue
             
-            # Saltar header
-            data_rows = rows[1:] if len(rows) > 1 else rows
-            print(f"   📊 Procesando {len(data_rows)} filas de datos")
+            # Debug para los primeros elementos
+            if i < 5:
+                print(f"      DEBUG Fila {i+1}: {symbol} - Celdas: {[cell.get_text(strip=True)[:20] for cell in cells[:5]]}")
             
-            for i, row in enumerate(data_rows):
-                cells = row.select('td')
-                if len(cells) < 3:
-                    continue
-                
-                # Extraer símbolo (posición varía según categoría)
-                symbol = None
-                name = None
-                
-                # Buscar enlace de símbolo
-                symbol_link = row.select_one('a[href*="/quote/"]') or row.select_one('[data-test="quoteLink"]')
-                if symbol_link:
-                    symbol = symbol_link.get_text(strip=True)
-                    name = symbol
-                else:
-                    # Fallback: usar primera celda
-                    symbol = cells[0].get_text(strip=True) if len(cells) > 0 else None
-                    name = cells[1].get_text(strip=True) if len(cells) > 1 else None
-                
-                if not symbol or len(symbol) < 1:
-                    continue
-                
-                # Buscar precio en las celdas
-                price = 0.0
-                change_pct = None
-                
-                # Debug para los primeros elementos
+            # Columnas conocidas primero; si la celda no sirve, buscar en la fila
+            price, j = 0.0, None
+            if price_col is not None and price_col < len(cells):
+                price, j = cell_price(cells[price_col].get_text(strip=True)), price_col
+            if not price:
+                price, j = self._scan_price(cells)
+            if price:
+                price_cols[j] += 1
                 if i < 5:
-                    print(f"      DEBUG Fila {i+1}: {symbol} - Celdas: {[cell.get_text(strip=True)[:20] for cell in cells[:5]]}")
-                
-                # Buscar precio en las celdas 1-6
-                for j in range(1, min(len(cells), 7)):
-                    cell_text = cells[j].get_text(strip=True)
-                    
-                    if not price:
-                        # Intentar extraer precio
-                        try:
-                            clean_text = cell_text.replace(',', '').replace('$', '').replace('%', '').strip()
-                            potential_price = safe_float(clean_text)
-                            if potential_price and potential_price > 0 and potential_price < 1000000:
-                                price = potential_price
-                                if i < 5:
-                                    print(f"      ✅ Precio encontrado: {price} en celda {j}")
-                                break
-                        except:
-                            pass
-                
-                # Buscar cambio porcentual en las celdas siguientes
-                for j in range(2, min(len(cells), 8)):
-                    cell_text = cells[j].get_text(strip=True)
-                    if '%' in cell_text or '+' in cell_text or '-' in cell_text:
-                        change_pct = pct_change(cell_text)
-                        if change_pct is not None:
-                            if i < 5:
-                                print(f"      ✅ Cambio encontrado: {change_pct}% en celda {j}")
-                            break
-                
-                # Agregar referencia si tenemos símbolo y precio
-                if symbol and price > 0:
-                    refs.append(InstrumentRef(
-                        symbol=symbol,
-                        name=name if name and name != symbol else None,
-                        exchange=None,
-                        currency="USD" if category in ["stocks", "crypto"] else None,
-                        category=category,
-                        price=price,
-                        change_24h_pct=change_pct,
-                        change_1h_pct=None  # No disponible en Yahoo por defecto
-                    ))
-                    
-                    if i < 5:
-                        print(f"      📊 Agregando: {symbol} - Precio: {price}, Cambio: {change_pct}")
+                    print(f"      ✅ Precio encontrado: {price} en celda {j}")
             
-            print(f"✅ Yahoo {category}: extraídos={len(refs)} ✅")
-            return refs
+            change_pct, j = None, None
+            if want_change and change_col is not None and change_col < len(cells):
+                change_pct, j = cell_change(cells[change_col].get_text(strip=True)), change_col
+            if want_change and change_pct is None:
+                change_pct, j = self._scan_change(cells)
+            if change_pct is not None:
+                change_cols[j] += 1
+                if i < 5:
+                    print(f"      ✅ Cambio encontrado: {change_pct}% en celda {j}")
             
-        except Exception as e:
-            print(f"❌ Error scraping Yahoo {category}: {e}")
-            return []
+            # Agregar referencia si tenemos símbolo y precio
+            if symbol and price > 0:
+                refs.append(InstrumentRef(
+                    symbol=symbol,
+                    name=name if name and name != symbol else None,
+                    exchange=None,
+                    currency="USD" if category in ["stocks", "crypto"] else None,
+                    category=category,
+                    price=price,
+                    change_24h_pct=change_pct,
+                    change_1h_pct=None  # No disponible en Yahoo por defecto
+                ))
+                
+                if i < 5:
+                    print(f"      📊 Agregando: {symbol} - Precio: {price}, Cambio: {change_pct}")
+        
+        # Guardar la columna que ganó en la mayoría de las filas (al descubrir
+        # la tabla, o si una petición proyectada no la había leído)
+        learned = [
+            (field_name, counter)
+            for field_name, counter in (("price", price_cols), ("change", change_cols))
+            if counter and (discovered or field_name not in layout.columns)
+        ]
+        if layout is not None and refs and learned:
+            header = [cell.get_text(strip=True) for cell in rows[0].select('th, td')]
+            for field_name, counter in learned:
+                col = counter.most_common(1)[0][0]
+                layout.columns[field_name] = col
+                layout.headers[field_name] = header[col] if col < len(header) else ""
+            if discovered:
+                layout_cache.put(self.name, category, layout)
+        
+        print(f"✅ Yahoo {category}: extraídos={len(refs)} ✅")
+        return refs
     
     async def list_refs(self, category: str, cursor: Optional[str], page_size: int) -> Tuple[List[InstrumentRef], Optional[str]]:
         """Listar referencias de instrumentos con scraping real"""
@@ -237,17 +322,12 @@ class YahooAdapter(ProviderAdapter):
             return [], None
         
         # Usar scraping real en lugar de símbolos predefinidos
-        async with httpx.AsyncClient() as client:
-            refs = await self._scrape_yahoo_page(client, category)
+        client = get_client(self.base_url)
+        refs = await self._scrape_yahoo_page(client, category)
         
         # Aplicar paginación
-        start_idx = 0
-        if cursor:
-            try:
-                cursor_data = json.loads(cursor)
-                start_idx = cursor_data.get("offset", 0)
-            except:
-                pass
+        position = cursor_codec.decode(cursor, self.name, category) or Cursor(self.name, category)
+        start_idx = position.offset
         
         end_idx = start_idx + page_size
         paginated_refs = refs[start_idx:end_idx]
@@ -255,7 +335,7 @@ class YahooAdapter(ProviderAdapter):
         # Generar siguiente cursor
         next_cursor = None
         if end_idx < len(refs):
-            next_cursor = json.dumps({"offset": end_idx})
+            next_cursor = cursor_codec.encode(position.advance(end_idx - start_idx))
         
         return paginated_refs, next_cursor
     
@@ -2,18 +2,26 @@
 """
 Utilidades para evitar detección en scraping
 """
+import os
 import random
 import time
 import asyncio
-from typing import Dict, List, Optional
-from fake_useragent import UserAgent
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
 import httpx
 
+try:
+    from fake_useragent import UserAgent
+    FAKE_USERAGENT_AVAILABLE = True
+except ImportError:
+    FAKE_USERAGENT_AVAILABLE = False
+
 class AntiDetection:
     """Clase para manejar técnicas anti-detección"""
     
     def __init__(self):
-        self.ua = UserAgent()
+        self.ua = UserAgent() if FAKE_USERAGENT_AVAILABLE else None
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -103,18 +111,157 @@ class RateLimiter:
     def __init__(self, requests_per_second: float = 1.0):
         self.requests_per_second = requests_per_second
         self.last_request_time = 0.0
+        self._lock = threading.Lock()
         
     async def wait(self):
         """Esperar el tiempo necesario para respetar el rate limit"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        min_interval = 1.0 / self.requests_per_second
+        # Reservar el turno antes de dormir: así dos corrutinas concurrentes
+        # no calculan la misma espera y salen a la vez
+        with self._lock:
+            current_time = time.time()
+            min_interval = 1.0 / self.requests_per_second
+            slot = max(current_time, self.last_request_time + min_interval)
+            self.last_request_time = slot
         
-        if time_since_last_request < min_interval:
-            wait_time = min_interval - time_since_last_request
+        wait_time = slot - current_time
+        if wait_time > 0:
             await asyncio.sleep(wait_time)
+
+class HostBudget(NamedTuple):
+    """Presupuesto de peticiones que un adaptador declara para su host"""
+    requests_per_second: float
+    burst: int = 1
+
+class AdaptiveRateLimiter:
+    """Token bucket por host con ajuste AIMD de la tasa.
+    
+    Baja la tasa a la mitad ante 429/5xx o errores de red y la sube de forma
+    aditiva, hasta el presupuesto declarado, mientras la latencia se mantenga
+    cerca de la mejor observada.
+    """
+    
+    def __init__(
+        self,
+        requests_per_second: float,
+        burst: int = 1,
+        min_rate: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        increase_fraction: float = 0.05,
+        latency_tolerance: float = 2.0,
+    ):
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        self.min_rate = min_rate or max(requests_per_second / 20, 0.01)
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.decrease_factor = decrease_factor
+        self.increase_fraction = increase_fraction
+        self.latency_tolerance = latency_tolerance
+        self.updated_at = time.monotonic()
+        self.latency_ewma: Optional[float] = None
+        self.best_latency: Optional[float] = None
+        self.throttled = 0
+        self.total_wait = 0.0
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """Tomar un token (puede quedar en deuda) y devolver la espera necesaria"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+    
+    async def acquire(self) -> None:
+        """Esperar turno; seguro con corrutinas e hilos concurrentes"""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            self.throttled += 1
+            self.total_wait += wait_time
+            await asyncio.sleep(wait_time)
+    
+    def _decrease(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # Vaciar el bucket: la siguiente petición espera al menos un intervalo
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.tokens = min(self.tokens, -retry_after * self.rate)
+    
+    def on_response(self, status_code: int, latency: float, retry_after: Optional[float] = None) -> None:
+        """Ajustar la tasa según la respuesta del host"""
+        if status_code == 429 or status_code >= 500:
+            self._decrease(retry_after)
+            return
         
-        self.last_request_time = time.time()
+        with self._lock:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+            if self.best_latency is None or latency < self.best_latency:
+                self.best_latency = latency
+            
+            # Subir solo cuando la latencia se ha recuperado
+            if self.latency_ewma <= self.best_latency * self.latency_tolerance:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.increase_fraction)
+    
+    def on_error(self) -> None:
+        """Timeouts y errores de conexión cuentan como congestión"""
+        self._decrease()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "burst": self.capacity,
+            "throttled": self.throttled,
+            "total_wait_s": round(self.total_wait, 3),
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+        }
+
+class HostRateLimiters:
+    """Registro de limitadores adaptativos por host"""
+    
+    def __init__(self, default_budget: HostBudget):
+        self.default_budget = default_budget
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _host(url: str) -> str:
+        return (urlsplit(url).netloc or url).lower()
+    
+    def register(self, url: str, budget: HostBudget) -> AdaptiveRateLimiter:
+        """Declarar el presupuesto de un host (la última declaración manda)"""
+        host = self._host(url)
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None or limiter.max_rate != budget.requests_per_second or limiter.capacity != max(1, budget.burst):
+                limiter = AdaptiveRateLimiter(budget.requests_per_second, budget.burst)
+                self._limiters[host] = limiter
+            return limiter
+    
+    def get(self, url: str) -> AdaptiveRateLimiter:
+        host = self._host(url)
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self.register(url, self.default_budget)
+        return limiter
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {host: limiter.get_stats() for host, limiter in self._limiters.items()}
+
+# Limitadores compartidos por todos los adaptadores
+host_limiters = HostRateLimiters(
+    HostBudget(
+        requests_per_second=float(os.getenv("DEFAULT_HOST_RPS", "2")),
+        burst=int(os.getenv("DEFAULT_HOST_BURST", "2")),
+    )
+)
 
 class SessionManager:
     """Gestor de sesiones HTTP con anti-detección"""
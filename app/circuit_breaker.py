@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Circuit breakers por proveedor y categoría para el pipeline de scraping
+"""
+import os
+import time
+import threading
+from typing import Any, Dict, List, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Breaker clásico: closed -> open tras N fallos -> half_open tras el
+    tiempo de recuperación, donde solo se deja pasar una sonda a la vez"""
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.short_circuited = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """¿Puede pasar la petición? En half_open reserva la única sonda"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+
+            self.short_circuited += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Liberar la sonda sin contar éxito ni fallo (p.ej. se agotó el deadline)"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def get_state(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "retry_in_s": retry_in,
+        }
+
+
+class BreakerRegistry:
+    """Un breaker por (proveedor, categoría)"""
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, category: str) -> CircuitBreaker:
+        key = (provider, category)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                self._breakers[key] = breaker
+            return breaker
+
+    def categories_for(self, provider: str) -> Dict[str, Dict[str, Any]]:
+        return {
+            category: breaker.get_state()
+            for (name, category), breaker in self._breakers.items()
+            if name == provider
+        }
+
+    def provider_status(self, provider: str, categories: List[str]) -> str:
+        """ok si todo está cerrado, fail si todo está abierto, degraded en otro caso"""
+        states = [self.get(provider, category).state for category in categories]
+        if not states or all(state == CLOSED for state in states):
+            return "ok"
+        if all(state == OPEN for state in states):
+            return "fail"
+        return "degraded"
+
+
+circuit_breakers = BreakerRegistry(
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3")),
+    recovery_timeout=float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30")),
+)
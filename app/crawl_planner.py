@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Planificador de crawl: filas por página y total de cada categoría aprendidos
+de los crawls recientes, para ir directo a las páginas ?page=N de un offset
+"""
+import math
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from app.page_fetcher import PageResult, fetch_pages
+
+# Segundos tras los que un modelo sin observaciones nuevas deja de planificar
+PLANNER_MAX_AGE = float(os.getenv("PLANNER_MAX_AGE", "3600"))
+
+
+@dataclass
+class CategoryModel:
+    rows_per_page: int
+    # Total de filas y páginas de la fuente; None hasta ver la última página
+    total_rows: Optional[int] = None
+    pages: Optional[int] = None
+    # Cada fila fuente dio un item: el offset de un cursor es una fila fuente
+    dense: bool = True
+    updated_at: float = 0.0
+    observations: int = 0
+
+
+class CrawlPlanner:
+    """Modelo por URL de listado (las categorías de TradingViewAdapter y de
+    tradingview/common.py comparten URLs, así que comparten modelo).
+
+    Cada crawl, completo o de páginas sueltas, actualiza el modelo: la página
+    más llena da las filas por página y una página corta o vacía marca el
+    final de la categoría. Si el parser descartó filas, los offsets ya no
+    caen en páginas fijas y no se planifica hasta el siguiente crawl denso.
+    """
+
+    def __init__(self, max_age: float = 3600):
+        self.max_age = max_age
+        self._models: Dict[str, CategoryModel] = {}
+        self._lock = threading.Lock()
+        self.planned = 0
+        self.unplanned = 0
+
+    def model(self, url: str) -> Optional[CategoryModel]:
+        with self._lock:
+            model = self._models.get(url)
+            if model is None or time.monotonic() - model.updated_at > self.max_age:
+                return None
+            return model
+
+    def rows_per_page(self, url: str) -> Optional[int]:
+        model = self.model(url)
+        return model.rows_per_page if model else None
+
+    def total_rows(self, url: str) -> Optional[int]:
+        model = self.model(url)
+        return model.total_rows if model else None
+
+    def observe(self, url: str, results: List[PageResult]) -> None:
+        """Actualizar el modelo con páginas consecutivas recién descargadas"""
+        if not results:
+            return
+        with self._lock:
+            model = self._models.get(url)
+            fullest = max(r.rows for r in results)
+            if model is None:
+                if not fullest:
+                    return
+                model = self._models[url] = CategoryModel(rows_per_page=fullest)
+            elif fullest > model.rows_per_page or (len(results) > 1 and fullest):
+                # Varias páginas seguidas: la más llena es una página completa
+                model.rows_per_page = fullest
+
+            model.dense = all(len(r.items) == r.rows for r in results)
+            last = results[-1]
+            if last.rows < model.rows_per_page:
+                # Página corta o vacía: es el final de la categoría
+                model.pages = last.page if last.rows else last.page - 1
+                model.total_rows = (last.page - 1) * model.rows_per_page + last.rows
+            elif model.pages is not None and last.page >= model.pages:
+                # Más filas que antes en la última página conocida: la categoría creció
+                last_rows = model.total_rows - (model.pages - 1) * model.rows_per_page
+                if last.page > model.pages or last.rows > last_rows:
+                    model.pages = model.total_rows = None
+            model.updated_at = time.monotonic()
+            model.observations += 1
+
+    def plan(self, url: str, offset: int, count: int) -> Optional[range]:
+        """Páginas (1-based) que contienen las filas [offset, offset + count).
+
+        None si no hay modelo todavía (o no es denso): hay que crawlear desde
+        la página 1.
+        """
+        model = self.model(url)
+        if model is None or not model.dense or count <= 0:
+            self.unplanned += 1
+            return None
+        self.planned += 1
+        if model.total_rows is not None and offset >= model.total_rows:
+            return range(0)  # Más allá del final: nada que descargar
+        per_page = model.rows_per_page
+        first = offset // per_page + 1
+        last = (offset + count - 1) // per_page + 1
+        if model.pages is not None:
+            last = min(last, model.pages)
+        return range(first, max(first, last) + 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "planned": self.planned,
+                "unplanned": self.unplanned,
+                "models": {
+                    url: {
+                        "rows_per_page": m.rows_per_page,
+                        "total_rows": m.total_rows,
+                        "pages": m.pages,
+                        "dense": m.dense,
+                        "observations": m.observations,
+                    }
+                    for url, m in self._models.items()
+                },
+            }
+
+
+crawl_planner = CrawlPlanner(max_age=PLANNER_MAX_AGE)
+
+
+class RowWindow(NamedTuple):
+    items: list
+    # Página fuente y fila dentro de sus items donde sigue la lista
+    page: int
+    row: int
+    # Se agotó la categoría (página corta o vacía ya consumida)
+    exhausted: bool
+
+
+async def fetch_rows(
+    url: str,
+    fetch_page: Callable[[int], Awaitable[Optional[PageResult]]],
+    page: int,
+    row: int,
+    count: int,
+    window: int = 6,
+) -> RowWindow:
+    """`count` items desde la fila `row` de la página `page`, sin tocar las
+    páginas anteriores (`row` puede pasar del final de la página: se sigue
+    contando en las siguientes). Con modelo se piden de una vez las páginas que
+    cubren el pedido; sin modelo, de a una. Si una página falla se devuelve
+    lo reunido y la posición queda en esa página para reintentar.
+    """
+    items: list = []
+    while len(items) < count:
+        model = crawl_planner.model(url)
+        if model is not None and model.pages is not None and page > model.pages:
+            return RowWindow(items, page, row, True)
+        per_page = model.rows_per_page if model else None
+        batch = math.ceil((row + count - len(items)) / per_page) if per_page else 1
+        if model is not None and model.pages is not None:
+            batch = min(batch, model.pages - page + 1)
+        results = await fetch_pages(
+            fetch_page,
+            max_pages=batch,
+            window=min(batch, window),
+            page_size_hint=per_page,
+            start_page=page,
+        )
+        crawl_planner.observe(url, results)
+        full_size = crawl_planner.rows_per_page(url) or 0
+        for result in results:
+            if result.page != page:
+                # fetch_pages omite las páginas fallidas: la posición queda en la que falta
+                return RowWindow(items, page, row, False)
+            last = result.rows == 0 or result.rows < full_size
+            taken = result.items[row:row + count - len(items)]
+            items.extend(taken)
+            row += len(taken)
+            if row >= len(result.items):
+                if last:
+                    return RowWindow(items, page, len(result.items), True)
+                # Una fila más allá del final de la página sigue contando en la siguiente
+                page, row = page + 1, row - len(result.items)
+            if len(items) >= count:
+                break
+        if len(results) < batch:
+            # Página fallida (o deadline): la posición queda para reintentar
+            break
+    return RowWindow(items, page, row, False)
+
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Deadline por petición que se propaga por scrape_data, list_refs y la capa HTTP
+"""
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Set, Tuple
+
+# Presupuesto total por petición (Vercel corta a los 30 s) y margen reservado
+# para serializar la respuesta con lo recolectado hasta ese momento
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "25"))
+DEADLINE_SAFETY_MARGIN = float(os.getenv("DEADLINE_SAFETY_MARGIN", "2"))
+
+
+class DeadlineExceeded(Exception):
+    """No queda presupuesto para empezar más trabajo"""
+
+
+class Deadline:
+    """Instante límite compartido; los hijos marcan su resultado como parcial"""
+
+    def __init__(self, expires_at: float, label: Optional[Tuple[str, str]] = None, parent: Optional["Deadline"] = None):
+        self.expires_at = expires_at
+        self.label = label
+        self.parent = parent
+        self.partial = False
+        # Etiquetas (proveedor, categoría) que devolvieron resultados parciales
+        self.partials: Set[Tuple[str, str]] = set()
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def child(self, label: Tuple[str, str], margin: float = 0.0) -> "Deadline":
+        """Deadline para una tarea, `margin` segundos antes que el padre"""
+        return Deadline(self.expires_at - margin, label=label, parent=self)
+
+    def mark_partial(self) -> None:
+        self.partial = True
+        node = self
+        while node is not None:
+            if self.label is not None:
+                node.partials.add(self.label)
+            node = node.parent
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Fijar el deadline del contexto actual (las tareas hijas lo heredan)"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def time_left() -> float:
+    deadline = current_deadline()
+    return deadline.remaining() if deadline is not None else float("inf")
+
+
+def deadline_expired() -> bool:
+    deadline = current_deadline()
+    return deadline is not None and deadline.expired
+
+
+def mark_partial() -> None:
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.mark_partial()
+
+
+def check_deadline() -> None:
+    """Lanzar DeadlineExceeded (y marcar parcial) si ya no queda tiempo"""
+    if deadline_expired():
+        mark_partial()
+        raise DeadlineExceeded("request deadline exceeded")
+
+
+def bounded_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Reducir un timeout al presupuesto restante"""
+    deadline = current_deadline()
+    if deadline is None:
+        return timeout
+    remaining = deadline.remaining()
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+async def sleep_within_deadline(seconds: float) -> None:
+    """Pausa (p.ej. backoff de retry) que no se permite pasar del deadline"""
+    if seconds >= time_left():
+        mark_partial()
+        raise DeadlineExceeded("not enough time left to retry")
+    await asyncio.sleep(seconds)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Event loop persistente en un hilo propio: los handlers de Flask le envían
+corrutinas y esperan el resultado, y el estado ligado al loop (clientes
+HTTP, conexiones abiertas) sobrevive entre peticiones
+"""
+import asyncio
+import atexit
+import os
+import threading
+from typing import Any, Coroutine, Dict, Optional
+from app.http_client import close_clients
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# Usar uvloop si está instalado
+USE_UVLOOP = os.getenv("USE_UVLOOP", "true").lower() == "true"
+
+
+class BackgroundLoop:
+    """Un solo event loop corriendo en un hilo daemon.
+
+    Se arranca con la primera corrutina y se vuelve a crear si el hilo murió
+    o si el proceso viene de un fork (gunicorn --preload: el hilo no pasa al
+    hijo). `run` es el puente desde hilos síncronos; llamarlo desde el propio
+    loop bloquearía el loop, así que ahí se rechaza.
+    """
+
+    def __init__(self, use_uvloop: bool = True):
+        self.use_uvloop = use_uvloop and UVLOOP_AVAILABLE
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.starts = 0
+        self.submitted = 0
+        self.failed = 0
+
+    def _alive(self) -> bool:
+        return (
+            self._loop is not None
+            and self._thread is not None
+            and self._thread.is_alive()
+            and self._pid == os.getpid()
+        )
+
+    def _serve(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            # Detenido: cerrar los clientes HTTP de este loop antes de cerrarlo
+            loop.run_until_complete(close_clients())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._alive():
+                return self._loop
+            loop = uvloop.new_event_loop() if self.use_uvloop else asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(target=self._serve, args=(loop, ready), name="background-loop", daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            self.starts += 1
+            print(f"🔁 Event loop persistente iniciado ({'uvloop' if self.use_uvloop else 'asyncio'})")
+            return loop
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Ejecutar `coro` en el loop persistente y esperar el resultado (o la excepción)"""
+        loop = self.start()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("BackgroundLoop.run llamado desde el propio loop; usar await")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        self.submitted += 1
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timeout o excepción de la corrutina: que no quede corriendo en el loop
+            future.cancel()
+            self.failed += 1
+            raise
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            if not self._alive():
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        loop = self._loop if self._alive() else None
+        return {
+            "running": loop is not None,
+            "uvloop": self.use_uvloop,
+            "starts": self.starts,
+            "submitted": self.submitted,
+            "failed": self.failed,
+            "pending_tasks": len(asyncio.all_tasks(loop)) if loop is not None else 0,
+        }
+
+
+background_loop = BackgroundLoop(use_uvloop=USE_UVLOOP)
+# Al salir, cerrar los clientes HTTP y el loop en orden
+atexit.register(background_loop.stop)
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Capa HTTP compartida: pool de clientes por host y GET condicional
+"""
+import os
+import time
+import asyncio
+import hashlib
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Any, Callable, Optional, Protocol
+from urllib.parse import urlsplit
+import httpx
+from app.anti_detection import host_limiters
+from app.single_flight import normalize_url, single_flight
+from app.parse_executor import parse_executor
+from app.deadline import DeadlineExceeded, bounded_timeout, check_deadline, current_deadline, mark_partial
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def host_of(url: str) -> str:
+    """Obtener el host (netloc) normalizado de una URL"""
+    netloc = urlsplit(url).netloc
+    return (netloc or url).lower()
+
+
+class ClientRegistry:
+    """Mantiene un httpx.AsyncClient por host para reutilizar conexiones (DNS, TCP, TLS, keep-alive)"""
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 10,
+        max_keepalive_per_host: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 15.0,
+        http2: bool = True,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_keepalive_per_host = max_keepalive_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        # Hosts que no deben negociar HTTP/2 (p.ej. si responden mal por h2)
+        self.http1_only_hosts = set()
+        # Los clientes httpx quedan ligados al event loop donde abren conexiones,
+        # por eso se guardan por loop y luego por host
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+        self.created = 0
+
+    def _build_client(self, host: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections_per_host,
+            max_keepalive_connections=self.max_keepalive_per_host,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        self.created += 1
+        return httpx.AsyncClient(
+            http2=self.http2 and host not in self.http1_only_hosts,
+            limits=limits,
+            timeout=self.timeout,
+        )
+
+    def get_client(self, url: str) -> httpx.AsyncClient:
+        """Obtener (o crear) el cliente compartido para el host de la URL"""
+        loop = asyncio.get_running_loop()
+        host = host_of(url)
+        clients = self._clients.get(loop)
+        if clients is None:
+            clients = {}
+            self._clients[loop] = clients
+        client = clients.get(host)
+        if client is None or client.is_closed:
+            client = self._build_client(host)
+            clients[host] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Cerrar los clientes del event loop actual (hook de apagado)"""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.pop(loop, None) or {}
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"⚠️ Error cerrando cliente HTTP: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del registro de clientes"""
+        hosts = sorted({host for clients in self._clients.values() for host in clients})
+        return {
+            "http2": self.http2,
+            "max_connections_per_host": self.max_connections_per_host,
+            "open_clients": sum(len(clients) for clients in self._clients.values()),
+            "clients_created": self.created,
+            "hosts": hosts,
+        }
+
+
+# Instancia global compartida por todos los adaptadores
+client_registry = ClientRegistry(
+    max_connections_per_host=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10")),
+    max_keepalive_per_host=int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    http2=os.getenv("HTTP2_ENABLED", "true").lower() == "true",
+)
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Atajo para obtener el cliente compartido de una URL"""
+    return client_registry.get_client(url)
+
+
+async def close_clients() -> None:
+    """Cerrar los clientes compartidos del event loop actual"""
+    await client_registry.aclose()
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class HedgeTracker:
+    """Latencias recientes por host y presupuesto de peticiones duplicadas (hedging)"""
+
+    def __init__(self, budget_ratio: float = 0.1, min_samples: int = 20, window: int = 200, max_credits: float = 10.0):
+        # Cada petición primaria suma `budget_ratio` créditos; cada hedge gasta uno,
+        # así los hedges nunca superan esa fracción de la carga
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.max_credits = max_credits
+        self.credits = 0.0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def record(self, host: str, latency: float) -> None:
+        samples = self._latencies.get(host)
+        if samples is None:
+            samples = deque(maxlen=self.window)
+            self._latencies[host] = samples
+        samples.append(latency)
+
+    def hedge_delay(self, host: str) -> Optional[float]:
+        """p95 móvil del host; None mientras no haya muestras suficientes"""
+        samples = self._latencies.get(host)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def on_request(self) -> None:
+        self.requests += 1
+        self.credits = min(self.max_credits, self.credits + self.budget_ratio)
+
+    def take_credit(self) -> bool:
+        if self.credits >= 1.0:
+            self.credits -= 1.0
+            self.hedges += 1
+            return True
+        self.budget_denied += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": HEDGE_ENABLED,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "p95_ms": {
+                host: round(delay * 1000, 1)
+                for host in self._latencies
+                if (delay := self.hedge_delay(host)) is not None
+            },
+        }
+
+
+HEDGE_ENABLED = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+hedge_tracker = HedgeTracker(
+    budget_ratio=float(os.getenv("HEDGE_BUDGET_RATIO", "0.1")),
+    min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+)
+
+
+async def _single_request(client: httpx.AsyncClient, url: str, method: str = "GET", stream: bool = False, **kwargs) -> httpx.Response:
+    """Una petición con limitador y deadline. Con `stream` vuelve apenas llegan
+    los headers y el cuerpo queda sin leer (el llamador debe cerrar la respuesta)"""
+    limiter = host_limiters.get(url)
+    check_deadline()
+    deadline = current_deadline()
+    if deadline is None:
+        await limiter.acquire()
+    else:
+        try:
+            await asyncio.wait_for(limiter.acquire(), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            mark_partial()
+            raise DeadlineExceeded("request deadline exceeded waiting for rate limiter")
+        # El timeout de la petición nunca pasa del presupuesto restante
+        kwargs["timeout"] = bounded_timeout(kwargs.get("timeout", client.timeout.read))
+        check_deadline()
+    start = time.monotonic()
+    try:
+        if stream:
+            response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+        else:
+            response = await client.request(method, url, **kwargs)
+    except httpx.TimeoutException:
+        if deadline is not None and deadline.expired:
+            # Se agotó nuestro presupuesto, no es culpa del host
+            mark_partial()
+            raise DeadlineExceeded("request deadline exceeded during request")
+        limiter.on_error()
+        raise
+    except httpx.NetworkError:
+        limiter.on_error()
+        raise
+    latency = time.monotonic() - start
+    limiter.on_response(response.status_code, latency, _retry_after(response))
+    if response.status_code < 500:
+        hedge_tracker.record(host_of(url), latency)
+    return response
+
+
+async def limited_get(client: httpx.AsyncClient, url: str, hedge: Optional[bool] = None, **kwargs) -> httpx.Response:
+    """GET que respeta el presupuesto del host y le informa el resultado (AIMD).
+
+    Con hedging, si la respuesta no llega dentro del p95 móvil del host se
+    lanza una segunda petición idéntica; gana la primera respuesta y la otra
+    se cancela. Los hedges están acotados por el presupuesto de HedgeTracker.
+    """
+    hedge_tracker.on_request()
+    delay = hedge_tracker.hedge_delay(host_of(url)) if (HEDGE_ENABLED if hedge is None else hedge) else None
+    if delay is None:
+        return await _single_request(client, url, **kwargs)
+
+    primary = asyncio.ensure_future(_single_request(client, url, **kwargs))
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not hedge_tracker.take_credit():
+            return await primary
+
+        secondary = asyncio.ensure_future(_single_request(client, url, **kwargs))
+        tasks.add(secondary)
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tasks.discard(task)
+                if task.exception() is None:
+                    if task is secondary:
+                        hedge_tracker.hedge_wins += 1
+                    return task.result()
+        # Ambas fallaron: propagar el error de la primaria
+        return primary.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def limited_post(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """POST con el mismo presupuesto de host y deadline que limited_get (sin hedging)"""
+    hedge_tracker.on_request()
+    return await _single_request(client, url, method="POST", **kwargs)
+
+
+@dataclass
+class ValidatorEntry:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+    # Filas ya parseadas por parser (la misma URL la pueden leer adaptadores distintos)
+    parsed: Dict[str, Any] = field(default_factory=dict)
+    stored_at: float = field(default_factory=time.time)
+
+
+class ValidatorStore:
+    """Validadores HTTP (ETag/Last-Modified) y filas parseadas por URL"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, ValidatorEntry]" = OrderedDict()
+        self.not_modified_hits = 0
+        self.same_body_hits = 0
+        self.full_parses = 0
+        self.streamed_parses = 0
+        self.early_stops = 0
+
+    def get(self, url: str) -> Optional[ValidatorEntry]:
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+        return entry
+
+    def put(self, url: str, entry: ValidatorEntry) -> None:
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def conditional_headers(self, url: str, parse_key: str) -> Dict[str, str]:
+        """Headers condicionales; solo si hay filas guardadas para este parser"""
+        entry = self.get(url)
+        if entry is None or parse_key not in entry.parsed:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.not_modified_hits + self.same_body_hits + self.full_parses + self.streamed_parses
+        reused = self.not_modified_hits + self.same_body_hits
+        return {
+            "entries": len(self._entries),
+            "not_modified_hits": self.not_modified_hits,
+            "same_body_hits": self.same_body_hits,
+            "full_parses": self.full_parses,
+            "streamed_parses": self.streamed_parses,
+            "early_stops": self.early_stops,
+            "reuse_rate": round(reused / total, 3) if total else 0.0,
+        }
+
+
+validator_store = ValidatorStore(max_entries=int(os.getenv("VALIDATOR_STORE_MAX_ENTRIES", "512")))
+
+
+def body_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _with_validators(url: str, parse_key: str, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+    headers = dict(headers or {})
+    conditional = validator_store.conditional_headers(url, parse_key)
+    if conditional:
+        # Revalidar contra el origen en lugar de pedir siempre la página completa
+        headers.pop("Pragma", None)
+        headers["Cache-Control"] = "max-age=0"
+        headers.update(conditional)
+    return headers
+
+
+async def fetch_parsed(
+    client: httpx.AsyncClient,
+    url: str,
+    parse: Callable[[str], Any],
+    parse_key: str,
+    headers: Optional[Dict[str, str]] = None,
+    **kwargs,
+) -> Any:
+    """GET condicional que devuelve filas parseadas.
+
+    Un 304, o un 200 con el mismo hash de cuerpo, reutiliza las filas ya
+    parseadas sin decodificar ni parsear el HTML. Los errores HTTP se
+    propagan con raise_for_status para que cada adaptador aplique su retry.
+    Llamadas concurrentes a la misma URL con el mismo parser comparten una
+    sola descarga (single-flight). Con PARSE_WORKERS, `parse` corre en un
+    proceso aparte (ver app/parse_executor.py) y debe poder serializarse.
+    """
+    return await single_flight.do(
+        (normalize_url(url), parse_key),
+        lambda: _fetch_parsed(client, url, parse, parse_key, headers, **kwargs),
+    )
+
+
+async def _fetch_parsed(client, url, parse, parse_key, headers, **kwargs) -> Any:
+    headers = _with_validators(url, parse_key, headers)
+    response = await limited_get(client, url, headers=headers, **kwargs)
+    entry = validator_store.get(url)
+
+    if response.status_code == 304 and entry is not None and parse_key in entry.parsed:
+        validator_store.not_modified_hits += 1
+        return entry.parsed[parse_key]
+
+    response.raise_for_status()
+    digest = body_hash(response.content)
+    if entry is not None and entry.body_hash == digest and parse_key in entry.parsed:
+        validator_store.same_body_hits += 1
+        entry.etag = response.headers.get("ETag") or entry.etag
+        entry.last_modified = response.headers.get("Last-Modified") or entry.last_modified
+        return entry.parsed[parse_key]
+
+    validator_store.full_parses += 1
+    parsed = await parse_executor.parse(parse, response)
+    if parsed is None:
+        return None
+
+    if entry is None or entry.body_hash != digest:
+        # Cuerpo nuevo: las filas de otros parsers ya no son válidas
+        entry = ValidatorEntry(body_hash=digest)
+    entry.etag = response.headers.get("ETag")
+    entry.last_modified = response.headers.get("Last-Modified")
+    entry.parsed[parse_key] = parsed
+    entry.stored_at = time.time()
+    validator_store.put(url, entry)
+    return parsed
+
+
+class StreamParser(Protocol):
+    """Parser incremental: recibe texto por trozos y avisa cuando ya no necesita más"""
+    done: bool
+
+    def feed(self, data: str) -> None: ...
+
+    def close(self) -> None: ...
+
+
+async def fetch_streamed(
+    client: httpx.AsyncClient,
+    url: str,
+    make_parser: Callable[[], StreamParser],
+    finish: Callable[[StreamParser], Any],
+    parse_key: str,
+    headers: Optional[Dict[str, str]] = None,
+    chunk_size: int = 16384,
+    **kwargs,
+) -> Any:
+    """GET condicional que parsea el cuerpo a medida que llega.
+
+    El cuerpo se decodifica por trozos y se le pasa al parser incremental sin
+    armar nunca el documento completo en memoria; cuando el parser marca
+    `done` se deja de leer y se cierra la respuesta. `finish(parser)` arma el
+    resultado. Un 304 reutiliza las filas guardadas igual que `fetch_parsed`
+    (sin hash de cuerpo, porque el cuerpo no se lee completo). No hace hedging.
+    También comparte descargas concurrentes de la misma URL (single-flight).
+    """
+    return await single_flight.do(
+        (normalize_url(url), parse_key),
+        lambda: _fetch_streamed(client, url, make_parser, finish, parse_key, headers, chunk_size, **kwargs),
+    )
+
+
+async def _fetch_streamed(client, url, make_parser, finish, parse_key, headers, chunk_size, **kwargs) -> Any:
+    headers = _with_validators(url, parse_key, headers)
+    response = await _single_request(client, url, stream=True, headers=headers, **kwargs)
+    try:
+        entry = validator_store.get(url)
+        if response.status_code == 304 and entry is not None and parse_key in entry.parsed:
+            validator_store.not_modified_hits += 1
+            return entry.parsed[parse_key]
+
+        response.raise_for_status()
+        validator_store.streamed_parses += 1
+        parser = make_parser()
+        async for chunk in response.aiter_text(chunk_size):
+            parser.feed(chunk)
+            if parser.done:
+                validator_store.early_stops += 1
+                break
+        parser.close()
+        parsed = finish(parser)
+    finally:
+        await response.aclose()
+
+    if parsed is None:
+        return None
+    entry = ValidatorEntry(
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+    entry.parsed[parse_key] = parsed
+    validator_store.put(url, entry)
+    return parsed
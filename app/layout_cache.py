@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Caché de layouts de tabla por proveedor y categoría
+"""
+import time
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+@dataclass
+class TableLayout:
+    """Dónde está la tabla de datos y qué columna trae cada campo"""
+    selector: str
+    index: int = 0  # Posición de la tabla entre las que coinciden con el selector
+    row_selector: Optional[str] = None
+    columns: Dict[str, int] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)  # campo -> texto del header de su columna
+    fingerprint: str = ""
+    learned_at: float = field(default_factory=time.time)
+
+
+def layout_fingerprint(table_class: Any, header_texts: Iterable[str], cells_per_row: int) -> str:
+    """Huella estructural de una tabla: clase, textos del header y celdas por fila"""
+    if isinstance(table_class, (list, tuple)):
+        table_class = " ".join(table_class)
+    parts = [table_class or ""]
+    parts.extend(" ".join(text.split()).lower() for text in header_texts)
+    parts.append(str(cells_per_row))
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+class LayoutCache:
+    """Layout ganador por (proveedor, categoría).
+
+    Los adaptadores van directo a la tabla y columnas conocidas; solo si la
+    huella de la página deja de coincidir se vuelve a probar la lista
+    completa de selectores.
+    """
+
+    def __init__(self):
+        self._layouts: Dict[Tuple[str, str], TableLayout] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.mismatches = 0
+        self.discoveries = 0
+
+    def get(self, provider: str, category: str) -> Optional[TableLayout]:
+        with self._lock:
+            return self._layouts.get((provider, category))
+
+    def put(self, provider: str, category: str, layout: TableLayout) -> None:
+        with self._lock:
+            self._layouts[(provider, category)] = layout
+            self.discoveries += 1
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def invalidate(self, provider: str, category: str) -> None:
+        """La página cambió de estructura: la próxima vez se redescubre"""
+        with self._lock:
+            if self._layouts.pop((provider, category), None) is not None:
+                self.mismatches += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._layouts.clear()
+
+    def export(self) -> Dict[Tuple[str, str], TableLayout]:
+        """Copia de los layouts (para enviarlos a un proceso de parseo)"""
+        with self._lock:
+            return dict(self._layouts)
+
+    def load(self, layouts: Dict[Tuple[str, str], TableLayout]) -> None:
+        """Reemplazar los layouts por los del proceso padre"""
+        with self._lock:
+            self._layouts = dict(layouts)
+
+    def counters(self) -> Tuple[int, int, int]:
+        with self._lock:
+            return self.hits, self.mismatches, self.discoveries
+
+    def merge(
+        self,
+        before: Dict[Tuple[str, str], TableLayout],
+        after: Dict[Tuple[str, str], TableLayout],
+        hits: int = 0,
+        mismatches: int = 0,
+        discoveries: int = 0,
+    ) -> None:
+        """Aplicar lo que cambió un parseo hecho en otro proceso: solo las
+        claves que difieren entre `before` y `after`, para no pisar lo que
+        otros parseos hayan aprendido mientras tanto"""
+        with self._lock:
+            for key in before.keys() - after.keys():
+                self._layouts.pop(key, None)
+            for key, layout in after.items():
+                if before.get(key) != layout:
+                    self._layouts[key] = layout
+            self.hits += hits
+            self.mismatches += mismatches
+            self.discoveries += discoveries
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "layouts": {
+                    f"{provider}/{category}": {
+                        "selector": layout.selector,
+                        "index": layout.index,
+                        "columns": dict(layout.columns),
+                    }
+                    for (provider, category), layout in self._layouts.items()
+                },
+                "hits": self.hits,
+                "mismatches": self.mismatches,
+                "discoveries": self.discoveries,
+            }
+
+
+layout_cache = LayoutCache()
@@ -1,8 +1,7 @@
 import os
 import asyncio
 import time
-import threading
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from flask import Flask, request, jsonify
 
@@ -13,33 +12,27 @@ try:
     SENTRY_AVAILABLE = True
 except ImportError:
     SENTRY_AVAILABLE = False
-from app.models import ScrapeResponse, ScrapeMeta, ProviderStatus, HealthResponse, InstrumentSnapshot
+from app.models import ScrapeResponse, ScrapeMeta, ProviderStatus, HealthResponse, InstrumentSnapshot, SNAPSHOT_FIELDS
 from app.adapters.mock import MockAdapter
 from app.utils import format_latency
+from app.http_client import client_registry, validator_store, hedge_tracker
+from app.anti_detection import host_limiters
+from app.circuit_breaker import circuit_breakers
+from app.single_flight import single_flight
+from app.parse_executor import parse_executor
+from app.snapshots import snapshot_store
+from app.crawl_planner import crawl_planner
+from app.event_loop import background_loop
+from app.adapters.base import InstrumentRef
+from app.pagination import InvalidCursor, cursor_codec
+from app.stream_merge import DEFAULT_SORT, MergeStream, merge_page, parse_sort
+from app.projection import Fields, fields_scope, parse_fields
+from app.layout_cache import layout_cache
+from app.deadline import Deadline, deadline_scope, REQUEST_DEADLINE, DEADLINE_SAFETY_MARGIN
 
 def run_async_in_thread(coro):
-    """Ejecutar corrutina asíncrona en un hilo separado"""
-    result = [None]
-    exception = [None]
-    
-    def run_in_thread():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result[0] = loop.run_until_complete(coro)
-        except Exception as e:
-            exception[0] = e
-        finally:
-            loop.close()
-    
-    thread = threading.Thread(target=run_in_thread)
-    thread.start()
-    thread.join()
-    
-    if exception[0]:
-        raise exception[0]
-    
-    return result[0]
+    """Ejecutar corrutina asíncrona en el event loop persistente (app/event_loop.py)"""
+    return background_loop.run(coro)
 
 # Importaciones opcionales para adaptadores avanzados
 try:
@@ -224,7 +217,7 @@ def create_app():
                 # Ejecutar scraping rápido
                 start_provider = time.time()
                 try:
-                    all_snapshots = run_async_in_thread(
+                    all_snapshots, _ = run_async_in_thread(
                         scrape_data(
                             {provider_name: adapter},
                             [provider_name],
@@ -233,9 +226,10 @@ def create_app():
                             None,
                             1,
                             1,
-                            True
+                            True,
+                            Deadline.after(max(0.0, REQUEST_DEADLINE - (time.time() - start_time)))
                         )
-                    ) or []
+                    )
                 except Exception as e:
                     print(f"Error en scraping de {provider_name}: {e}")
                     all_snapshots = []
@@ -323,6 +317,12 @@ def create_app():
         dedupe_by_symbol = request.args.get("dedupe_by_symbol", "true").lower() == "true"
         
         # Validar parámetros
+        try:
+            fields = parse_fields(request.args.get("fields"), SNAPSHOT_FIELDS)
+            sort = parse_sort(request.args.get("sort"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         if limit_per_page > 500:
             return jsonify({"error": "limit_per_page cannot exceed 500"}), 400
         
@@ -342,9 +342,10 @@ def create_app():
         else:
             selected_categories = [c.strip() for c in categories_param.split(",") if c.strip() in valid_categories]
         
-                            # Ejecutar scraping
+        # Ejecutar scraping
         try:
-            all_snapshots = run_async_in_thread(
+            deadline = Deadline.after(REQUEST_DEADLINE - (time.time() - start_time))
+            all_snapshots, next_cursor = run_async_in_thread(
                 scrape_data(
                     adapters,
                     selected_providers,
@@ -353,9 +354,12 @@ def create_app():
                     cursor,
                     hours_window,
                     max_concurrency,
-                    respect_robots
+                    respect_robots,
+                    deadline,
+                    fields,
+                    sort
                 )
-            ) or []
+            )
             
             # Aplicar deduplicación si se solicita
             if dedupe_by_symbol:
@@ -368,13 +372,14 @@ def create_app():
                 categories=selected_categories,
                 limit_per_page=limit_per_page,
                 hours_window=hours_window,
-                status=get_provider_status(selected_providers),
-                next_cursor=get_next_cursor(all_snapshots, limit_per_page)
+                status=get_provider_status(selected_providers, selected_categories, deadline.partials),
+                next_cursor=next_cursor
             )
             
             response = ScrapeResponse(
                 meta=meta,
-                data=all_snapshots
+                data=all_snapshots,
+                fields=fields
             )
             
             # Formatear respuesta
@@ -384,6 +389,8 @@ def create_app():
             else:
                 return jsonify(response.to_dict())
                 
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -407,6 +414,16 @@ def create_app():
             
             return jsonify({
                 "cache": cache_stats,
+                "http_clients": client_registry.get_stats(),
+                "conditional_requests": validator_store.get_stats(),
+                "rate_limits": host_limiters.get_stats(),
+                "hedging": hedge_tracker.get_stats(),
+                "single_flight": single_flight.get_stats(),
+                "layouts": layout_cache.get_stats(),
+                "parse_executor": parse_executor.get_stats(),
+                "snapshots": snapshot_store.get_stats(),
+                "crawl_planner": crawl_planner.get_stats(),
+                "event_loop": background_loop.get_stats(),
                 "api_key": key_stats,
                 "adapters": {
                     name: {
@@ -493,66 +510,122 @@ async def scrape_data(
     cursor: Optional[str],
     hours_window: int,
     max_concurrency: int,
-    respect_robots: bool
-) -> List[InstrumentSnapshot]:
-    """Función principal de scraping"""
-    all_snapshots = []
+    respect_robots: bool,
+    deadline: Optional[Deadline] = None,
+    fields: Fields = None,
+    sort: str = DEFAULT_SORT
+) -> Tuple[List[InstrumentSnapshot], Optional[str]]:
+    """Función principal de scraping: (snapshots, cursor compuesto siguiente).
     
+    Cada proveedor/categoría es un stream con su propio cursor; la página es
+    la mezcla k-way de los streams por `sort` (ver app/stream_merge.py) y de
+    cada uno se piden solo las filas que la página necesita. Con `deadline`,
+    cada stream trabaja contra un deadline hijo (con margen) y al vencer se
+    cortan sus descargas; los pares cortados quedan en `deadline.partials` y
+    su cursor sigue donde estaba. Con `fields`, los parsers de los
+    adaptadores solo extraen las columnas pedidas.
+    """
     # Crear semáforo para limitar concurrencia
     semaphore = asyncio.Semaphore(max_concurrency)
     
-    async def scrape_provider_category(provider: str, category: str):
+    async def list_stream(provider: str, category: str, stream_cursor: Optional[str], count: int):
+        # Un breaker abierto corta antes de ocupar un slot del semáforo
+        breaker = circuit_breakers.get(provider, category)
+        if not breaker.allow_request():
+            print(f"⛔ {provider}/{category}: circuito abierto, se omite")
+            return None
+        
+        child = deadline.child((provider, category), margin=DEADLINE_SAFETY_MARGIN) if deadline else None
+        with deadline_scope(child):
+            return await list_with_breaker(provider, category, stream_cursor, count, breaker, child)
+    
+    async def list_with_breaker(provider: str, category: str, stream_cursor: Optional[str], count: int, breaker, child: Optional[Deadline]):
         async with semaphore:
+            succeeded = False
+            if child is not None and child.expired:
+                child.mark_partial()
+                breaker.release()
+                return None
             try:
-                print(f"🔍 DEBUG: Iniciando scraping de {provider}/{category}")
-                adapter = adapters[provider]
-                
-                # Obtener referencias
-                refs, next_cursor = await adapter.list_refs(category, cursor, limit_per_page)
-                print(f"🔍 DEBUG: {provider}/{category} - Referencias obtenidas: {len(refs)}")
-                
-                if not refs:
-                    print(f"🔍 DEBUG: {provider}/{category} - No hay referencias")
-                    return []
-                
-                # Debug: mostrar las primeras referencias
-                for i, ref in enumerate(refs[:3]):
-                    print(f"🔍 DEBUG: {provider}/{category} - Ref {i+1}: {ref.symbol} = ${ref.price:.2f}")
-                
-                # Obtener snapshots
-                snapshots = await adapter.fetch_snapshots(refs, hours_window)
-                print(f"🔍 DEBUG: {provider}/{category} - Snapshots obtenidos: {len(snapshots)}")
-                
-                # Debug: mostrar los primeros snapshots
-                for i, snapshot in enumerate(snapshots[:3]):
-                    print(f"🔍 DEBUG: {provider}/{category} - Snapshot {i+1}: {snapshot.symbol} = ${snapshot.price:.2f}")
-                
-                return snapshots
-                
+                listing = adapters[provider].list_refs(category, stream_cursor, count)
+                if child is not None:
+                    listing = asyncio.wait_for(listing, timeout=child.remaining())
+                refs, next_cursor = await listing
+                print(f"🔍 {provider}/{category}: {len(refs)} referencias")
+                if not refs and stream_cursor is not None:
+                    # El cursor prometía más filas: los adaptadores devuelven [] cuando
+                    # el proveedor falla, así que el stream sigue donde estaba
+                    return None
+                # Sin filas desde el principio (p.ej. categoría sin datos): fin normal
+                # de la lista, no un fallo del proveedor
+                succeeded = True
+                return refs, next_cursor
+            except asyncio.TimeoutError:
+                if child is None:
+                    print(f"Error scraping {provider}/{category}: timeout")
+                    return None
+                # Vencido el deadline: se corta y se responde con lo recolectado
+                child.mark_partial()
+                print(f"⏱️ {provider}/{category}: cancelado por deadline")
+                return None
             except Exception as e:
                 print(f"Error scraping {provider}/{category}: {e}")
+                return None
+            finally:
+                # Fallan las excepciones y los [] donde el cursor prometía filas;
+                # quedarse sin tiempo no es culpa del proveedor
+                if succeeded:
+                    breaker.record_success()
+                elif child is not None and (child.partial or child.expired):
+                    breaker.release()
+                else:
+                    breaker.record_failure()
+    
+    async def snapshots_for(stream: MergeStream, refs: List[InstrumentRef]) -> List[InstrumentSnapshot]:
+        async with semaphore:
+            try:
+                return await adapters[stream.provider].fetch_snapshots(refs, hours_window)
+            except Exception as e:
+                print(f"Error scraping {stream.provider}/{stream.category}: {e}")
                 return []
     
-    # Crear tareas para todos los proveedores y categorías
-    tasks = []
+    # Streams del cursor compuesto; los que no estaban (o con otro orden) empiezan de cero
+    saved = {}
+    decoded = cursor_codec.decode_merge(cursor)
+    if decoded is not None and decoded[0] == sort:
+        saved = {(p, c): (start, skip, done, size) for p, c, start, skip, done, size in decoded[1]}
+    streams = []
     for provider in providers:
         for category in categories:
-            task = scrape_provider_category(provider, category)
-            tasks.append(task)
-    
-    # Ejecutar todas las tareas
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+            start, skip, done, size = saved.get((provider, category), (None, 0, False, 0))
+            streams.append(MergeStream(provider, category, start=start, skip=skip, done=done, size=size))
     
-    # Recolectar resultados
-    for result in results:
-        if isinstance(result, list):
-            all_snapshots.extend(result)
+    # La mezcla compara por `sort`: el parser tiene que extraer ese campo
+    merge_fields = fields | {sort.lstrip("-")} if fields is not None else None
+    with fields_scope(merge_fields):
+        # Las tareas copian el contexto al crearse y heredan la proyección
+        merged = await merge_page(streams, limit_per_page, sort, list_stream)
+        
+        by_stream: Dict[int, List[InstrumentRef]] = {}
+        for stream, ref in merged:
+            by_stream.setdefault(id(stream), []).append(ref)
+        selected = [s for s in streams if id(s) in by_stream]
+        results = await asyncio.gather(*(snapshots_for(s, by_stream[id(s)]) for s in selected))
     
-    print(f"🔍 DEBUG: Total snapshots finales: {len(all_snapshots)}")
-    for i, snapshot in enumerate(all_snapshots[:5]):
-        print(f"🔍 DEBUG: Snapshot final {i+1}: {snapshot.symbol} = ${snapshot.price:.2f}")
+    # Mismo orden que la mezcla
+    rank = {(stream.provider, stream.category, ref.symbol): i for i, (stream, ref) in reversed(list(enumerate(merged)))}
+    all_snapshots = sorted(
+        (snapshot for result in results for snapshot in result),
+        key=lambda snap: rank.get((snap.provider, snap.category, snap.symbol), len(rank)),
+    )
+    print(f"🔀 Mezcla de {len(streams)} streams por {sort}: {len(all_snapshots)} snapshots, "
+          f"{sum(s.requests for s in streams)} llamadas a list_refs")
     
-    return all_snapshots
+    # Sin filas porque fallaron todos los streams: el cursor sigue donde estaba
+    next_cursor = None
+    if any(not s.state()[4] for s in streams):
+        next_cursor = cursor_codec.encode_merge(sort, [s.state() for s in streams])
+    return all_snapshots, next_cursor
 
 def deduplicate_snapshots(snapshots: List[InstrumentSnapshot]) -> List[InstrumentSnapshot]:
     """Deduplicar snapshots por símbolo, priorizando mock"""
@@ -578,16 +651,33 @@ def deduplicate_snapshots(snapshots: List[InstrumentSnapshot]) -> List[Instrumen
     
     return deduplicated
 
-def get_provider_status(providers: List[str]) -> dict:
-    """Obtener estado de los proveedores"""
+def get_provider_status(providers: List[str], categories: Optional[List[str]] = None, partials: Optional[set] = None) -> dict:
+    """Obtener estado de los proveedores según sus circuit breakers y el deadline"""
+    partials = partials or set()
     status = {}
     for provider in providers:
-        status[provider] = ProviderStatus(status="ok")
+        breaker_states = circuit_breakers.categories_for(provider)
+        checked = categories if categories is not None else list(breaker_states)
+        open_categories = [c for c, state in breaker_states.items() if state["state"] != "closed"]
+        partial_categories = sorted(c for p, c in partials if p == provider)
+        
+        provider_status = circuit_breakers.provider_status(provider, checked)
+        if partial_categories and provider_status == "ok":
+            provider_status = "degraded"
+        
+        messages = []
+        if open_categories:
+            messages.append(f"circuit not closed for: {', '.join(open_categories)}")
+        if partial_categories:
+            messages.append(f"partial results (deadline) for: {', '.join(partial_categories)}")
+        
+        category_status = {c: {"circuit": state} for c, state in breaker_states.items()}
+        for category in partial_categories:
+            category_status.setdefault(category, {})["partial"] = True
+        
+        status[provider] = ProviderStatus(
+            status=provider_status,
+            message="; ".join(messages) or None,
+            categories=category_status
+        )
     return status
-
-def get_next_cursor(snapshots: List[InstrumentSnapshot], limit_per_page: int) -> Optional[str]:
-    """Obtener cursor para la siguiente página"""
-    if len(snapshots) >= limit_per_page:
-        # En una implementación real, aquí devolverías el cursor real
-        return "next_page_token"
-    return None
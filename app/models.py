@@ -1,6 +1,6 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields as dataclass_fields
 from datetime import datetime
-from typing import Literal, Any, Optional, Dict, List
+from typing import Literal, Any, Optional, Dict, FrozenSet, List
 
 Category = Literal["forex", "stocks", "crypto", "indices", "commodities"]
 Provider = Literal["yahoo", "tradingview", "finviz"]
@@ -20,8 +20,14 @@ class InstrumentSnapshot:
     ts: datetime = field(default_factory=datetime.now)
     meta: Dict[str, Any] = field(default_factory=dict)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convertir a diccionario para JSON"""
+    def to_dict(self, fields: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """Convertir a diccionario para JSON; con `fields`, solo esos campos"""
+        if fields is not None:
+            return {
+                name: self.ts.isoformat() if name == "ts" else getattr(self, name)
+                for name in SNAPSHOT_FIELDS
+                if name in fields
+            }
         return {
             "provider": self.provider,
             "category": self.category,
@@ -36,17 +42,22 @@ class InstrumentSnapshot:
             "meta": self.meta
         }
 
+# Campos que se pueden pedir con `fields=` (en el orden de la respuesta)
+SNAPSHOT_FIELDS = tuple(f.name for f in dataclass_fields(InstrumentSnapshot))
+
 @dataclass
 class ProviderStatus:
     status: Status
     message: Optional[str] = None
     latency_ms: Optional[float] = None
+    categories: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "status": self.status,
             "message": self.message,
-            "latency_ms": self.latency_ms
+            "latency_ms": self.latency_ms,
+            "categories": self.categories
         }
 
 @dataclass
@@ -74,11 +85,12 @@ class ScrapeMeta:
 class ScrapeResponse:
     meta: ScrapeMeta
     data: List[InstrumentSnapshot]
+    fields: Optional[FrozenSet[str]] = None  # Proyección pedida con `fields=`
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "meta": self.meta.to_dict(),
-            "data": [snapshot.to_dict() for snapshot in self.data]
+            "data": [snapshot.to_dict(self.fields) for snapshot in self.data]
         }
 
 @dataclass
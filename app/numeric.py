@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tokenizador numérico compartido para celdas de precios, cambios y volúmenes
+"""
+import re
+from typing import Optional
+
+# Clases de caracteres (tablas de búsqueda) para lo que rodea al número
+_SPACES = " \xa0\u2007\u2009\u202f"
+_CURRENCY = "$\u20ac\xa3\xa5\u20b9\u20bf"  # $ € £ ¥ ₹ ₿
+_MINUS = frozenset("-\u2212\u2012\u2013\ufe63\uff0d")  # incluye menos unicode
+_SKIP_BEFORE_SIGN = frozenset(_SPACES + _CURRENCY)
+_MULTIPLIERS = {"K": 1e3, "k": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+# Tope de cell_price: por encima no es un precio de una tabla de cotizaciones
+MAX_CELL_PRICE = 1000000
+
+# Solo el número: dígitos con separadores de miles/decimales ("1,234.5",
+# "1.234,5", "1 234,5", "1'234.5"); el resto se resuelve con las tablas
+_NUMBER = re.compile(r"\d+(?:[.,']\d+|[ \xa0\u2009\u202f]\d{3}(?!\d))*\.?|\.\d+")
+_SUFFIX = re.compile(r"[ \xa0\u2009\u202f]?([KMBTk])(?![A-Za-z])")
+# Lo que puede rodear al número en modo estricto: espacios, signo, moneda,
+# paréntesis, "%" y un código de moneda ("USD", "USDT")
+_STRICT_PREFIX = re.compile(r"[\s(]*(?:[A-Za-z]{3,4})?[\s" + _CURRENCY + r"+\-\u2212\u2012\u2013\ufe63\uff0d\uff0b]*")
+_STRICT_SUFFIX = re.compile(r"[\s%)]*(?:[A-Za-z]{3,4})?[\s)]*")
+
+
+def _to_float(token: str) -> float:
+    """Resolver separadores: el último de "," / "." es el decimal si aparecen
+    los dos; una sola coma es decimal salvo que agrupe exactamente 3 dígitos"""
+    if "," not in token:
+        if "." in token and token.count(".") > 1:
+            token = token.replace(".", "")
+    else:
+        dot = token.rfind(".")
+        comma = token.rfind(",")
+        if dot >= 0:
+            token = token.replace(",", "") if dot > comma else token.replace(".", "").replace(",", ".")
+        elif token.count(",") == 1 and (len(token) - comma - 1 != 3 or token[:comma] == "0"):
+            token = token.replace(",", ".")
+        else:
+            token = token.replace(",", "")
+    if not token.isascii() or "'" in token or " " in token:
+        token = "".join(ch for ch in token if ch in "0123456789.")
+    return float(token)
+
+
+def parse_numeric(text: Optional[str], strict: bool = False, suffixes: bool = True) -> Optional[float]:
+    """Convertir el texto de una celda en número.
+
+    Maneja símbolos de moneda, separadores de miles ("1,234.5", "1.234,5",
+    "1 234,5"), menos unicode, negativos entre paréntesis, "%" y sufijos
+    K/M/B/T. Sin `strict` toma el primer número del texto (como un
+    re.search); con `strict` el texto solo puede tener, además del número,
+    signo, moneda, "%" y un código de moneda ("USD", "USDT"). Con
+    `suffixes=False` el sufijo se ignora y se devuelve el número tal cual.
+    """
+    if not text:
+        return None
+    match = _NUMBER.search(text)
+    if match is None:
+        return None
+    start, end = match.span()
+    if strict and not (_STRICT_PREFIX.fullmatch(text, 0, start) and _STRICT_SUFFIX.fullmatch(text, end)):
+        return None
+    try:
+        value = _to_float(match.group())
+    except ValueError:
+        return None
+
+    if end < len(text):
+        suffix = _SUFFIX.match(text, end)
+        if suffix is not None:
+            if suffixes:
+                value *= _MULTIPLIERS[suffix.group(1)]
+            end = suffix.end()
+
+    # Signo: el carácter previo al número, saltando espacios y símbolos de moneda
+    i = start - 1
+    while i >= 0 and text[i] in _SKIP_BEFORE_SIGN:
+        i -= 1
+    if i >= 0:
+        if text[i] in _MINUS:
+            value = -value
+        elif text[i] == "(" and ")" in text[end:]:
+            value = -value
+    return value
+
+
+def cell_price(text: Optional[str]) -> float:
+    """Precio de una celda de tabla; 0.0 si no es un número positivo menor
+    que MAX_CELL_PRICE. Sin letras: ni "Name 1", ni "S&P 500", ni un "1.2M"
+    de volumen son precios"""
+    if not text or any(ch.isalpha() for ch in text):
+        return 0.0
+    price = parse_numeric(text, strict=True, suffixes=False)
+    if price is not None and 0 < price < MAX_CELL_PRICE:
+        return price
+    return 0.0
+
+
+def cell_change(text: Optional[str]) -> Optional[float]:
+    """Cambio porcentual de una celda; solo si trae "%" o signo"""
+    if text and ("%" in text or "+" in text or "-" in text):
+        return parse_numeric(text, suffixes=False)
+    return None
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Descarga concurrente y acotada de páginas numeradas (?page=N)
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+from app.deadline import deadline_expired, mark_partial
+
+
+class PageResult(NamedTuple):
+    page: int
+    rows: int  # Filas encontradas en la tabla fuente (para detectar la última página)
+    items: list
+
+
+async def fetch_pages(
+    fetch_page: Callable[[int], Awaitable[Optional[PageResult]]],
+    max_pages: int,
+    window: int = 4,
+    page_size_hint: Optional[int] = None,
+    max_errors: int = 3,
+    start_page: int = 1,
+) -> List[PageResult]:
+    """Descargar páginas con una ventana de peticiones en vuelo.
+
+    Las páginas se lanzan en orden, como máximo `window` a la vez; el ritmo
+    por host lo impone el limitador de la capa HTTP. Al ver la primera página
+    vacía o corta se dejan de lanzar páginas y se cancelan las posteriores que
+    sigan en vuelo. Tampoco se lanzan páginas pasado el deadline de la petición.
+    `fetch_page` devuelve None si la página falló; tras `max_errors` fallos se
+    deja de lanzar. El resultado se devuelve en orden de página.
+    """
+    last_page = start_page + max_pages - 1
+
+    results: Dict[int, PageResult] = {}
+    in_flight: Dict[asyncio.Task, int] = {}
+    cancelled: List[asyncio.Task] = []
+    next_page = start_page
+    stop_page: Optional[int] = None
+    errors = 0
+
+    def detect_stop_page() -> Optional[int]:
+        full_size = page_size_hint or max((r.rows for r in results.values()), default=0)
+        short_pages = [p for p, r in results.items() if r.rows == 0 or r.rows < full_size]
+        return min(short_pages) if short_pages else None
+
+    def can_launch() -> bool:
+        return (
+            stop_page is None
+            and errors < max_errors
+            and next_page <= last_page
+            and len(in_flight) < window
+            and not deadline_expired()
+        )
+
+    async def run_page(page: int) -> Optional[PageResult]:
+        try:
+            return await fetch_page(page)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"   ❌ Error en página {page}: {e}")
+            return None
+
+    try:
+        while in_flight or can_launch():
+            while can_launch():
+                task = asyncio.ensure_future(run_page(next_page))
+                in_flight[task] = next_page
+                next_page += 1
+
+            done, _ = await asyncio.wait(set(in_flight), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                page = in_flight.pop(task)
+                result = task.result()
+                if result is None:
+                    errors += 1
+                    continue
+                results[page] = result
+
+            stop_page = detect_stop_page()
+            if stop_page is not None:
+                for task, page in list(in_flight.items()):
+                    if page > stop_page:
+                        task.cancel()
+                        in_flight.pop(task)
+                        cancelled.append(task)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        pending = list(in_flight) + cancelled
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if stop_page is None and next_page <= last_page and deadline_expired():
+        # Se cortó el crawl por el deadline: lo devuelto es parcial
+        mark_partial()
+
+    return [results[p] for p in sorted(results) if stop_page is None or p <= stop_page]
@@ -1,41 +1,141 @@
-from typing import Optional, List, Any
-from app.utils import encode_cursor, decode_cursor
-
-class PaginationManager:
-    """Gestiona la paginación por lotes"""
-    
-    def __init__(self, limit_per_page: int = 200):
-        self.limit_per_page = limit_per_page
-        self.current_offset = 0
-        self.total_processed = 0
-        self.has_more = True
-    
-    def create_cursor(self, provider: str, category: str, offset: int) -> str:
-        """Crear cursor para la siguiente página"""
-        data = {
-            "provider": provider,
-            "category": category,
-            "offset": offset,
-            "limit": self.limit_per_page
-        }
-        return encode_cursor(data)
-    
-    def parse_cursor(self, cursor: Optional[str]) -> Optional[dict[str, Any]]:
-        """Parsear cursor existente"""
-        if not cursor:
+#!/usr/bin/env python3
+"""
+Cursores firmados y sin estado: proveedor, categoría, posición en la lista,
+página fuente y fila dentro de esa página, y época del snapshot; y el cursor
+compuesto de la mezcla de varios proveedores (ver app/stream_merge.py)
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+from dataclasses import dataclass, replace
+from typing import Any, List, Optional, Tuple
+
+# Clave compartida por todos los workers: obligatoria con ENVIRONMENT=production.
+# En desarrollo se usa una clave fija, igual en todos los procesos locales
+CURSOR_SECRET = os.getenv("CURSOR_SECRET", "")
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+DEVELOPMENT_CURSOR_SECRET = "cursor-secret-de-desarrollo"
+CURSOR_VERSION = 1
+MERGE_CURSOR_VERSION = 2
+# Bytes de la firma HMAC-SHA256 que viajan en el cursor
+SIGNATURE_BYTES = 12
+
+
+class InvalidCursor(ValueError):
+    """El cliente mandó un cursor que no se puede reanudar (mal formado, con
+    otra firma o de otro proveedor/categoría)"""
+
+
+def cursor_secret(secret: str = CURSOR_SECRET, environment: str = ENVIRONMENT) -> str:
+    """Clave de firma de los cursores; en producción CURSOR_SECRET es obligatorio"""
+    if secret:
+        return secret
+    if environment == "production":
+        raise RuntimeError("CURSOR_SECRET es obligatorio con ENVIRONMENT=production")
+    return DEVELOPMENT_CURSOR_SECRET
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Dónde sigue la lista de un proveedor/categoría.
+
+    `offset` son las filas ya entregadas; `page` y `row` la página fuente
+    (?page=N, 1-based) y el índice dentro de sus filas extraídas donde
+    sigue, para reanudar sin volver a las páginas anteriores. `epoch` es
+    el snapshot del que salió la página (ver app/snapshots.py).
+    """
+    provider: str
+    category: str
+    offset: int = 0
+    page: Optional[int] = None
+    row: Optional[int] = None
+    epoch: Optional[int] = None
+
+    def advance(self, count: int, page: Optional[int] = None, row: Optional[int] = None) -> "Cursor":
+        return replace(self, offset=self.offset + count, page=page, row=row)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class CursorCodec:
+    """Codifica cursores como `payload.firma` en base64 url-safe.
+
+    El payload es un arreglo JSON compacto; la firma (HMAC-SHA256 truncado)
+    impide que un cliente fabrique posiciones o épocas. Cualquier worker con
+    el mismo CURSOR_SECRET puede reanudar un cursor de otro.
+    """
+
+    def __init__(self, secret: str):
+        self._key = secret.encode()
+        self.encoded = 0
+        self.rejected = 0
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._key, payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+    def _seal(self, values: List[Any]) -> str:
+        payload = json.dumps(values, separators=(",", ":")).encode()
+        self.encoded += 1
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def _open(self, token: str) -> List[Any]:
+        payload_text, signature_text = token.split(".", 1)
+        payload = _b64decode(payload_text)
+        if not hmac.compare_digest(self._sign(payload), _b64decode(signature_text)):
+            raise ValueError("firma inválida")
+        values = json.loads(payload)
+        if not isinstance(values, list):
+            raise ValueError("payload inválido")
+        return values
+
+    def encode(self, cursor: Cursor) -> str:
+        return self._seal([CURSOR_VERSION, cursor.provider, cursor.category, cursor.offset, cursor.page, cursor.row, cursor.epoch])
+
+    def decode(self, token: Optional[str], provider: Optional[str] = None, category: Optional[str] = None) -> Optional[Cursor]:
+        """Cursor del token; None sin token. InvalidCursor si está mal formado,
+        la firma no coincide o es de otro proveedor/categoría: empezar de
+        nuevo en silencio haría que el cliente repitiera la primera página"""
+        if not token:
+            return None
+        try:
+            version, cursor_provider, cursor_category, offset, page, row, epoch = self._open(token)
+            if version != CURSOR_VERSION:
+                raise ValueError(f"versión {version}")
+            cursor = Cursor(cursor_provider, cursor_category, int(offset), page, row, epoch)
+        except (ValueError, TypeError, binascii.Error) as e:
+            self.rejected += 1
+            raise InvalidCursor(f"cursor inválido: {e}") from e
+        if (provider is not None and cursor.provider != provider) or (category is not None and cursor.category != category):
+            self.rejected += 1
+            raise InvalidCursor(f"cursor de {cursor.provider}/{cursor.category}")
+        return cursor
+
+    def encode_merge(self, sort: str, streams: List[list]) -> str:
+        """Cursor compuesto: orden de la mezcla y [proveedor, categoría, cursor, skip, terminado, tamaño] por stream"""
+        return self._seal([MERGE_CURSOR_VERSION, "merge", sort, streams])
+
+    def decode_merge(self, token: Optional[str]) -> Optional[Tuple[str, List[list]]]:
+        """(orden, streams) del cursor compuesto; None sin token, InvalidCursor
+        si no es válido"""
+        if not token:
             return None
-        return decode_cursor(cursor)
-    
-    def should_continue(self, items_processed: int) -> bool:
-        """Determinar si debe continuar con más páginas"""
-        return items_processed >= self.limit_per_page
-    
-    def get_next_cursor(self, provider: str, category: str, current_offset: int) -> Optional[str]:
-        """Obtener cursor para la siguiente página"""
-        return self.create_cursor(provider, category, current_offset + self.limit_per_page)
-    
-    def update_progress(self, items_count: int):
-        """Actualizar progreso de paginación"""
-        self.total_processed += items_count
-        if items_count < self.limit_per_page:
-            self.has_more = False
+        try:
+            version, kind, sort, streams = self._open(token)
+            if version != MERGE_CURSOR_VERSION or kind != "merge":
+                raise ValueError(f"versión {version}")
+        except (ValueError, TypeError, binascii.Error) as e:
+            self.rejected += 1
+            raise InvalidCursor(f"cursor inválido: {e}") from e
+        return sort, streams
+
+
+cursor_codec = CursorCodec(cursor_secret())
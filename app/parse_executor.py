@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Executor de parseo: saca el parseo de HTML del event loop a procesos aparte
+"""
+import os
+import pickle
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+import httpx
+from app.layout_cache import layout_cache
+
+# Procesos de parseo; 0 parsea en el hilo del event loop (comportamiento original)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+
+
+def _parse_in_worker(parse: Callable[[str], Any], content: bytes, encoding: str, layouts: Dict) -> tuple:
+    """Corre en el proceso worker: decodifica los bytes crudos, parsea y
+    devuelve lo que el proceso padre necesita para reflejar los layouts
+    aprendidos (la caché de layouts de cada worker es propia)"""
+    layout_cache.load(layouts)
+    before = layout_cache.counters()
+    result = parse(content.decode(encoding, errors="replace"))
+    after = layout_cache.counters()
+    deltas = tuple(a - b for a, b in zip(after, before))
+    return result, layout_cache.export(), deltas
+
+
+class ParseExecutor:
+    """Parseo de páginas en un ProcessPoolExecutor.
+
+    BeautifulSoup y lexbor son CPU puro: en el event loop bloquean al resto
+    de proveedores/categorías y peticiones mientras parsean. Con workers, los
+    bytes crudos de la respuesta viajan al pool y vuelven las filas ya
+    extraídas (InstrumentRef es un NamedTuple, así que viajan como tuplas).
+    La función de parseo debe poder serializarse: una función de módulo o un
+    functools.partial de un método del adaptador, no una lambda.
+
+    Si el pool no se puede crear (p.ej. serverless sin /dev/shm) o se rompe,
+    se parsea en el hilo actual como antes.
+    """
+
+    def __init__(self, max_workers: int = 0):
+        self.max_workers = max_workers
+        self.available = max_workers > 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.offloaded = 0
+        self.inline = 0
+        self.fallbacks = 0
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if not self.available:
+            return None
+        with self._lock:
+            if self._pool is None:
+                try:
+                    # spawn: el servidor tiene hilos (Flask, loops por petición) y fork no es seguro
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except (OSError, NotImplementedError, ImportError) as e:
+                    print(f"⚠️ Pool de parseo no disponible, parseando en el hilo: {e}")
+                    self.available = False
+                    return None
+            return self._pool
+
+    async def parse(self, parse: Callable[[str], Any], response: httpx.Response) -> Any:
+        """Parsear el cuerpo de `response` en el pool (o en el hilo si no hay)"""
+        pool = self._get_pool()
+        if pool is None:
+            self.inline += 1
+            return parse(response.text)
+
+        try:
+            # Validar antes de enviar: un error al serializar no se distingue
+            # después de un error del propio parseo en el worker
+            pickle.dumps(parse)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            print(f"⚠️ {parse!r} no se puede enviar al pool, parseando en el hilo")
+            self.fallbacks += 1
+            return parse(response.text)
+
+        layouts = layout_cache.export()
+        loop = asyncio.get_running_loop()
+        try:
+            result, learned, deltas = await loop.run_in_executor(
+                pool, _parse_in_worker, parse, response.content, response.encoding or "utf-8", layouts
+            )
+        except BrokenProcessPool:
+            print("⚠️ Pool de parseo roto, parseando en el hilo")
+            self.fallbacks += 1
+            self._reset(pool)
+            return parse(response.text)
+        self.offloaded += 1
+        layout_cache.merge(layouts, learned, *deltas)
+        return result
+
+    def _reset(self, pool: ProcessPoolExecutor) -> None:
+        """Descartar un pool roto; el siguiente parseo crea uno nuevo"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers if self.available else 0,
+            "pool_started": self._pool is not None,
+            "offloaded": self.offloaded,
+            "inline": self.inline,
+            "fallbacks": self.fallbacks,
+        }
+
+
+parse_executor = ParseExecutor(PARSE_WORKERS)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Proyección de columnas: qué campos pidió el cliente (`fields=`)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import FrozenSet, Iterable, Iterator, Optional
+
+# None = todos los campos
+Fields = Optional[FrozenSet[str]]
+
+# Se extraen siempre: identifican la fila y deciden si es válida (precio > 0),
+# así la misma página da las mismas filas con cualquier proyección
+ROW_FIELDS = frozenset({"symbol", "price"})
+
+# Campos calculados a partir de otros
+DERIVED_FROM = {"price_24h": ("change_24h_pct",)}
+
+
+def parse_fields(param: Optional[str], allowed: Iterable[str]) -> Fields:
+    """Interpretar `fields=symbol,price`; ValueError si hay campos desconocidos"""
+    if not param or param.strip().lower() == "all":
+        return None
+    fields = frozenset(name.strip() for name in param.split(",") if name.strip())
+    unknown = fields - set(allowed)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return fields or None
+
+
+def wants(fields: Fields, name: str) -> bool:
+    return fields is None or name in fields
+
+
+def parser_fields(fields: Fields) -> Fields:
+    """Campos que el parser debe extraer para poder armar los pedidos"""
+    if fields is None:
+        return None
+    needed = set(fields) | ROW_FIELDS
+    for name in fields:
+        needed.update(DERIVED_FROM.get(name, ()))
+    return frozenset(needed)
+
+
+def projected_key(parse_key: str, fields: Fields) -> str:
+    """Clave de parseo por proyección: filas parciales no sirven a una petición completa"""
+    if fields is None:
+        return parse_key
+    return f"{parse_key}[{','.join(sorted(fields))}]"
+
+
+_current_fields: ContextVar[Fields] = ContextVar("current_fields", default=None)
+
+
+def current_fields() -> Fields:
+    return _current_fields.get()
+
+
+@contextmanager
+def fields_scope(fields: Fields) -> Iterator[Fields]:
+    """Fijar la proyección del contexto actual (las tareas hijas la heredan)"""
+    token = _current_fields.set(fields)
+    try:
+        yield fields
+    finally:
+        _current_fields.reset(token)
@@ -25,6 +25,7 @@ class ApiMeta(BaseModel):
     limit_per_page: int
     next_cursor: Optional[str] = None
     status: Literal["ok", "degraded", "fail"]
+    partial: bool = False  # True si el deadline cortó el crawl
 
 
 class Price24hResponse(BaseModel):
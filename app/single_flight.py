@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Single-flight: una sola descarga en vuelo por URL, compartida entre llamadores
+"""
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from app.deadline import DeadlineExceeded, deadline_expired
+
+
+def normalize_url(url: str) -> str:
+    """Esquema y host en minúsculas, query ordenada y sin fragmento"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+class _LeaderCancelled(Exception):
+    """El líder fue cancelado antes de terminar"""
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes con la misma clave en una sola ejecución.
+
+    El primer llamador (líder) ejecuta la función; los que llegan mientras
+    sigue en vuelo esperan su resultado. Los handlers de Flask comparten el
+    event loop persistente de app/event_loop.py, pero no es el único: la app
+    FastAPI corre en el suyo y los scripts usan asyncio.run. Por eso el
+    resultado va en un concurrent.futures.Future, que cualquier loop puede
+    esperar.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.waiting = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+                self.waiting += 1
+
+        if not leader:
+            try:
+                # shield: cancelar a un espectador no cancela la descarga compartida
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                pass
+            except DeadlineExceeded:
+                # Se le acabó el tiempo al líder, no necesariamente a este llamador
+                if deadline_expired():
+                    raise
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            return await self.do(key, fn)
+
+        # La clave se libera antes de publicar el resultado: quien llegue
+        # después ya no se suma a una llamada terminada
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Los que esperaban reintentan por su cuenta (uno será el nuevo líder)
+            self._release(key)
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    def _release(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced_waiters": self.coalesced,
+            "waiting": self.waiting,
+            "coalesce_rate": round(self.coalesced / total, 3) if total else 0.0,
+        }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Snapshots de categoría: cada crawl queda guardado, inmutable y con su época,
+para que las páginas siguientes de un cursor no vuelvan a scrapear
+"""
+import bisect
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from app.adapters.base import InstrumentRef
+from app.projection import Fields
+from app.single_flight import single_flight
+
+# Segundos que un snapshot sirve a sus cursores
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "300"))
+# Edad máxima para servir también primeras páginas nuevas (como market_data en cache.py)
+SNAPSHOT_REUSE = float(os.getenv("SNAPSHOT_REUSE", "60"))
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SNAPSHOT_MAX_ENTRIES", "64"))
+
+# (proveedor, categoría, proyección, variante del crawl)
+SnapshotKey = Tuple[str, str, Fields, Hashable]
+
+
+@dataclass(frozen=True)
+class CategorySnapshot:
+    """Resultado completo de un crawl; los cursores lo referencian por `epoch`"""
+    key: SnapshotKey
+    epoch: int
+    refs: Tuple[InstrumentRef, ...]
+    expected_rows: int
+    # False si el deadline cortó el crawl: solo sirve a sus propios cursores
+    complete: bool
+    created_at: float
+    # Offset en `refs` donde empieza cada página fuente (1, 2, ...); vacío si el crawl no es por páginas
+    page_starts: Tuple[int, ...] = ()
+
+    def page(self, offset: int, page_size: int) -> List[InstrumentRef]:
+        return list(self.refs[offset:offset + page_size])
+
+    def position(self, offset: int) -> Tuple[Optional[int], Optional[int]]:
+        """(página fuente, fila dentro de la página) del offset, para cursores reanudables"""
+        if not self.page_starts:
+            return None, None
+        index = bisect.bisect_right(self.page_starts, offset) - 1
+        return index + 1, offset - self.page_starts[index]
+
+
+class SnapshotStore:
+    """Snapshots por época, con el último publicado por clave.
+
+    Publicar una época nueva para la misma clave desaloja la anterior; pasado
+    SNAPSHOT_TTL el snapshot se desaloja al consultarlo. Una primera página
+    solo reutiliza el último snapshot durante SNAPSHOT_REUSE segundos. Los
+    crawls de Flask corren en el event loop persistente (app/event_loop.py),
+    pero el store también se usa desde otros loops e hilos (FastAPI, los
+    hilos de los handlers), así que todo va bajo un lock.
+    """
+
+    def __init__(self, ttl: float = 300, reuse: float = 60, max_entries: int = 64):
+        self.ttl = ttl
+        self.reuse = reuse
+        self.max_entries = max_entries
+        self._by_epoch: "OrderedDict[int, CategorySnapshot]" = OrderedDict()
+        self._latest: Dict[SnapshotKey, int] = {}
+        self._lock = threading.Lock()
+        self._last_epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.replaced = 0
+        self.published = 0
+
+    def _next_epoch(self) -> int:
+        # Milisegundos crecientes: un cursor de antes de un reinicio no coincide con otra época
+        self._last_epoch = max(int(time.time() * 1000), self._last_epoch + 1)
+        return self._last_epoch
+
+    def _fresh(self, snapshot: CategorySnapshot) -> bool:
+        if time.monotonic() - snapshot.created_at <= self.ttl:
+            return True
+        self._evict(snapshot.epoch)
+        self.expired += 1
+        return False
+
+    def _evict(self, epoch: int) -> None:
+        snapshot = self._by_epoch.pop(epoch, None)
+        if snapshot is not None and self._latest.get(snapshot.key) == epoch:
+            del self._latest[snapshot.key]
+
+    def get(self, epoch: int, key: SnapshotKey) -> Optional[CategorySnapshot]:
+        """Snapshot de un cursor; None si expiró, fue reemplazado o es de otra clave"""
+        with self._lock:
+            snapshot = self._by_epoch.get(epoch)
+            if snapshot is None or snapshot.key != key or not self._fresh(snapshot):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return snapshot
+
+    def current(self, key: SnapshotKey) -> Optional[CategorySnapshot]:
+        """Último snapshot completo de la clave si tiene menos de `reuse` segundos
+        (para una primera página; si no, toca crawlear una época nueva)"""
+        with self._lock:
+            epoch = self._latest.get(key)
+            snapshot = self._by_epoch.get(epoch) if epoch is not None else None
+            if (
+                snapshot is None
+                or not snapshot.complete
+                or not self._fresh(snapshot)
+                or time.monotonic() - snapshot.created_at > self.reuse
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return snapshot
+
+    def publish(
+        self,
+        key: SnapshotKey,
+        refs: List[InstrumentRef],
+        expected_rows: int,
+        complete: bool,
+        page_starts: Tuple[int, ...] = (),
+    ) -> CategorySnapshot:
+        with self._lock:
+            snapshot = CategorySnapshot(
+                key=key,
+                epoch=self._next_epoch(),
+                refs=tuple(refs),
+                expected_rows=expected_rows,
+                complete=complete,
+                created_at=time.monotonic(),
+                page_starts=tuple(page_starts),
+            )
+            previous = self._latest.get(key)
+            if previous is not None:
+                self._evict(previous)
+                self.replaced += 1
+            self._by_epoch[snapshot.epoch] = snapshot
+            self._latest[key] = snapshot.epoch
+            while len(self._by_epoch) > self.max_entries:
+                self._evict(next(iter(self._by_epoch)))
+            self.published += 1
+            return snapshot
+
+    async def materialize(
+        self,
+        key: SnapshotKey,
+        crawl: Callable[[], Awaitable[Tuple]],
+    ) -> CategorySnapshot:
+        """Correr `crawl` -> (filas, filas fuente, completo[, inicio de cada página])
+        y publicar una época nueva.
+
+        Peticiones concurrentes de la misma clave comparten un solo crawl.
+        """
+        async def run() -> CategorySnapshot:
+            return self.publish(key, *await crawl())
+        return await single_flight.do(("snapshot", key), run)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_epoch.clear()
+            self._latest.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "snapshots": len(self._by_epoch),
+                "rows": sum(len(s.refs) for s in self._by_epoch.values()),
+                "ttl": self.ttl,
+                "reuse": self.reuse,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "replaced": self.replaced,
+                "published": self.published,
+            }
+
+
+snapshot_store = SnapshotStore(ttl=SNAPSHOT_TTL, reuse=SNAPSHOT_REUSE, max_entries=SNAPSHOT_MAX_ENTRIES)
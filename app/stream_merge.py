@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Mezcla k-way de las listas de varios proveedores/categorías: cada página toma
+de cada stream solo las filas que necesita y el cursor compuesto guarda dónde
+quedó cada uno.
+
+Los adaptadores devuelven sus filas en el orden de la fuente, no por `sort`:
+`sort` ordena las filas dentro de cada página, no la lista completa. Solo si
+las fuentes ya vienen ordenadas por la clave las páginas sucesivas forman un
+orden global
+"""
+import asyncio
+import heapq
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+from app.adapters.base import InstrumentRef
+
+# Claves de orden de la mezcla; "-" delante ordena de mayor a menor
+SORT_KEYS = ("symbol", "price", "change_24h_pct")
+DEFAULT_SORT = "symbol"
+
+# (proveedor, categoría, cursor, filas) -> (filas, siguiente cursor); None si falló.
+# ([], None) en el primer bloque es una lista vacía; después, un fallo
+ListRefs = Callable[[str, str, Optional[str], int], Awaitable[Optional[Tuple[List[InstrumentRef], Optional[str]]]]]
+
+
+def parse_sort(raw: Optional[str]) -> str:
+    """Validar `sort=`; ValueError si la clave no existe o no admite orden inverso"""
+    sort = (raw or DEFAULT_SORT).strip()
+    name = sort.lstrip("-")
+    if name not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {name}. Allowed: {', '.join(SORT_KEYS)}")
+    if sort.startswith("-") and name == "symbol":
+        raise ValueError("symbol can only be sorted ascending")
+    return sort
+
+
+def sort_key(sort: str) -> Callable[[InstrumentRef], Any]:
+    """Clave comparable de una fila; los valores ausentes van al final"""
+    name = sort.lstrip("-")
+    sign = -1 if sort.startswith("-") else 1
+    if name == "symbol":
+        return lambda ref: ref.symbol
+    def key(ref: InstrumentRef) -> Tuple[bool, float]:
+        value = getattr(ref, name)
+        return (value is None, sign * value if value is not None else 0.0)
+    return key
+
+
+@dataclass
+class MergeStream:
+    """Un proveedor/categoría dentro de la mezcla.
+
+    Las filas se piden por bloques al `list_refs` del adaptador; `start` es
+    el cursor del bloque en curso, `size` las filas que se pidieron y `skip`
+    las que ya salieron en páginas anteriores. Al reanudar se vuelve a pedir
+    el mismo bloque (mismo tamaño, mismo orden tras ordenarlo) y se descartan
+    las primeras `skip`.
+    """
+    provider: str
+    category: str
+    start: Optional[str] = None
+    skip: int = 0
+    done: bool = False
+    # Filas pedidas para el bloque en curso; 0 = todavía no se pidió
+    size: int = 0
+    buffer: Deque[InstrumentRef] = field(default_factory=deque)
+    # Cursor tras el bloque en curso; None con `loaded` = no hay más filas
+    next_cursor: Optional[str] = None
+    loaded: bool = False
+    # El último pedido falló: no se insiste en esta página
+    failed: bool = False
+    requests: int = 0
+
+    @property
+    def has_more(self) -> bool:
+        return not self.done and not self.failed and (not self.loaded or self.next_cursor is not None)
+
+    async def fill(self, list_refs: ListRefs, count: int, key: Optional[Callable[[InstrumentRef], Any]] = None) -> None:
+        """Traer el siguiente bloque ordenado por `key` (el primero descarta `skip` filas)"""
+        if not self.has_more:
+            return
+        if self.loaded:
+            start, skip, size = self.next_cursor, 0, count
+        else:
+            start, skip, size = self.start, self.skip, self.size or self.skip + count
+        self.requests += 1
+        result = await list_refs(self.provider, self.category, start, size)
+        if result is None:
+            # Falló o venció el deadline: el stream sigue donde estaba la próxima página
+            self.failed = True
+            return
+        refs, next_cursor = result
+        if not refs and next_cursor is None and (start is not None or skip):
+            # Este bloque ya había dado filas: vacío es un error tragado, no el final
+            self.failed = True
+            return
+        # sorted es estable: el mismo bloque da siempre el mismo orden
+        block = sorted(refs, key=key) if key is not None else refs
+        self.start, self.skip, self.size = start, skip, size
+        self.buffer = deque(block[skip:])
+        self.next_cursor = next_cursor
+        self.loaded = True
+        if not self.buffer and next_cursor is None:
+            self.done = True
+
+    def pop(self) -> InstrumentRef:
+        self.skip += 1
+        return self.buffer.popleft()
+
+    def state(self) -> list:
+        """[proveedor, categoría, cursor, skip, terminado, tamaño] para el cursor compuesto"""
+        if not self.loaded:
+            return [self.provider, self.category, self.start, self.skip, self.done, self.size]
+        if self.buffer:
+            return [self.provider, self.category, self.start, self.skip, False, self.size]
+        if self.next_cursor is not None:
+            return [self.provider, self.category, self.next_cursor, 0, False, 0]
+        return [self.provider, self.category, None, 0, True, 0]
+
+
+async def merge_page(streams: List[MergeStream], page_size: int, sort: str, list_refs: ListRefs) -> List[Tuple[MergeStream, InstrumentRef]]:
+    """Siguientes `page_size` filas de la mezcla, ordenadas por `sort`
+    dentro de la página.
+
+    Cada stream arranca con su parte de la página; cuando uno se vacía se
+    le pide solo lo que falta. Cada bloque se ordena al llegar y un heap con
+    la cabeza de cada stream elige las filas en O(page_size · log k); la
+    página se reordena al final porque un segundo bloque de un stream puede
+    traer filas menores que las ya elegidas.
+    """
+    key = sort_key(sort)
+    live = [s for s in streams if s.has_more]
+    share = math.ceil(page_size / len(live)) if live else 0
+    await asyncio.gather(*(s.fill(list_refs, share, key) for s in live))
+
+    heap = [(key(s.buffer[0]), i) for i, s in enumerate(streams) if s.buffer]
+    heapq.heapify(heap)
+    merged: List[Tuple[MergeStream, InstrumentRef]] = []
+    while heap and len(merged) < page_size:
+        _, i = heapq.heappop(heap)
+        stream = streams[i]
+        merged.append((stream, stream.pop()))
+        if not stream.buffer and len(merged) < page_size:
+            await stream.fill(list_refs, page_size - len(merged), key)
+        if stream.buffer:
+            heapq.heappush(heap, (key(stream.buffer[0]), i))
+    merged.sort(key=lambda pair: key(pair[1]))
+    return merged
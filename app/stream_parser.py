@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tokenizador HTML incremental para tablas de cotizaciones
+"""
+from html.parser import HTMLParser
+from typing import Callable, FrozenSet, List, Optional
+
+# Etiquetas que cierran implícitamente una celda/fila (HTML sin cierre explícito)
+_CELL_TAGS = {"td", "th"}
+_SECTION_TAGS = {"thead", "tbody", "tfoot"}
+
+
+class TableRowStreamer(HTMLParser):
+    """Extrae los headers y las filas de la tabla de datos a medida que llegan bytes.
+
+    Se alimenta con `feed(chunk)` y llama a `on_row(cells)` cada vez que se
+    cierra un `<tr>` del cuerpo de una tabla, sin esperar al resto del
+    documento. `cells` son los textos de los `<td>`; los headers son los
+    `<th>` del primer `<thead>`. La tabla de datos es la primera con headers
+    (`<thead>` o celdas `<th>`): cuando se cierra, `done` pasa a True y el
+    llamador puede dejar de leer la respuesta. Las tablas anidadas no se
+    recorren como filas; su texto queda en la celda que las contiene.
+
+    El texto de cada celda se arma igual que `Node.text(strip=True)` de
+    selectolax: cada nodo de texto recortado y concatenado. Con `wanted`
+    (índices de `<td>`), las demás celdas llegan vacías sin acumular su texto.
+    """
+
+    def __init__(self, on_row: Callable[[List[str]], None]):
+        super().__init__(convert_charrefs=True)
+        self.on_row = on_row
+        self.headers: Optional[List[str]] = None
+        self.rows = 0
+        self.done = False
+        self.wanted: Optional[FrozenSet[int]] = None
+        self._table_depth = 0
+        self._table_has_headers = False
+        self._table_rows = 0
+        self._section: Optional[str] = None
+        self._in_header_thead = False
+        self._header_cells: List[str] = []
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._cell_tag: Optional[str] = None
+        self._skip_text = False
+        # Un nodo de texto puede llegar partido entre dos trozos de `feed`
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if self.done:
+            return
+        if tag == "table":
+            self._table_depth += 1
+            if self._table_depth == 1:
+                self._table_has_headers = False
+                self._table_rows = 0
+        elif self._table_depth != 1:
+            return
+        elif tag in _SECTION_TAGS:
+            self._close_row()
+            self._section = tag
+            if tag == "thead":
+                self._table_has_headers = True
+                if self.headers is None:
+                    self._in_header_thead = True
+        elif tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag in _CELL_TAGS:
+            self._close_cell()
+            if tag == "th":
+                self._table_has_headers = True
+            if self._row is None:
+                self._row = []
+            self._cell = []
+            self._cell_tag = tag
+            self._skip_text = (
+                tag == "td" and self.wanted is not None
+                and not self._in_header_thead and len(self._row) not in self.wanted
+            )
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if self.done or self._table_depth == 0:
+            return
+        if tag == "table":
+            self._table_depth -= 1
+            if self._table_depth > 0:
+                return
+            self._close_row()
+            self._section = None
+            if self._table_rows and self._table_has_headers:
+                # Fin de la tabla de datos: el resto del documento sobra
+                self.done = True
+        elif self._table_depth != 1:
+            return
+        elif tag in _CELL_TAGS:
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag in _SECTION_TAGS:
+            self._close_row()
+            self._section = None
+            if tag == "thead" and self._in_header_thead:
+                self.headers = self._header_cells
+                self._in_header_thead = False
+
+    def handle_data(self, data):
+        if self._cell is not None and not self._skip_text:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def _flush_text(self) -> None:
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text = []
+        if text and self._cell is not None:
+            self._cell.append(text)
+
+    def _close_cell(self) -> None:
+        if self._cell is None:
+            return
+        text = "".join(self._cell)
+        self._cell = None
+        if self._in_header_thead:
+            self._header_cells.append(text)
+        elif self._row is not None and self._cell_tag == "td":
+            self._row.append(text)
+
+    def _close_row(self) -> None:
+        self._close_cell()
+        row, self._row = self._row, None
+        if row is None or self._section in ("thead", "tfoot"):
+            return
+        self.rows += 1
+        self._table_rows += 1
+        self.on_row(row)
+
+    def close(self) -> None:
+        super().close()
+        self._flush_text()
+        if not self.done:
+            self._close_row()
@@ -1,54 +1,11 @@
 import time
-import base64
-import json
 from typing import Optional, Any
 from datetime import datetime, timedelta
+from app.numeric import parse_numeric
 
 def pct_change(text: str) -> Optional[float]:
-    """Parsear cambio porcentual de texto"""
-    if not text:
-        return None
-    
-    # Limpiar texto
-    text = text.strip().replace(',', '').replace('%', '')
-    
-    # Manejar paréntesis (valores negativos)
-    if '(' in text and ')' in text:
-        text = text.replace('(', '').replace(')', '')
-        try:
-            return -float(text)
-        except ValueError:
-            return None
-    
-    # Buscar patrones de cambio porcentual
-    import re
-    patterns = [
-        r'([+-]?\d+\.?\d*)%',  # 1.23% o +1.23% o -1.23%
-        r'([+-]?\d+\.?\d*)',   # 1.23 o +1.23 o -1.23
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                return float(match.group(1))
-            except ValueError:
-                continue
-    
-    return None
-
-def encode_cursor(data: dict[str, Any]) -> str:
-    """Codificar cursor para paginación"""
-    json_str = json.dumps(data, separators=(',', ':'))
-    return base64.urlsafe_b64encode(json_str.encode()).decode()
-
-def decode_cursor(cursor: str) -> Optional[dict[str, Any]]:
-    """Decodificar cursor para paginación"""
-    try:
-        json_str = base64.urlsafe_b64decode(cursor.encode()).decode()
-        return json.loads(json_str)
-    except Exception:
-        return None
+    """Parsear cambio porcentual de texto (+1.23%, −1.23%, (1.23%))"""
+    return parse_numeric(text, suffixes=False)
 
 def format_latency(start_time: float) -> float:
     """Formatear latencia en milisegundos"""
@@ -77,25 +34,8 @@ def get_headers() -> dict[str, str]:
     }
 
 def parse_number(text: str) -> Optional[float]:
-    """Parsear número de texto, manejando formatos comunes"""
-    if not text:
-        return None
-    
-    # Limpiar texto
-    text = text.strip().replace(',', '').replace('%', '')
-    
-    # Manejar paréntesis (valores negativos)
-    if '(' in text and ')' in text:
-        text = text.replace('(', '').replace(')', '')
-        try:
-            return -float(text)
-        except ValueError:
-            return None
-    
-    try:
-        return float(text)
-    except ValueError:
-        return None
+    """Parsear número de texto, manejando formatos comunes (miles, %, paréntesis, K/M/B/T)"""
+    return parse_numeric(text, strict=True)
 
 def safe_float(value: Any) -> Optional[float]:
     """Convertir valor a float de forma segura"""
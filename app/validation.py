@@ -5,6 +5,7 @@ Utilidades para validación de datos financieros
 import re
 from datetime import datetime, timedelta
 from typing import Optional, Union, Dict, Any
+from app.numeric import parse_numeric
 import pandas as pd
 import numpy as np
 
@@ -135,26 +136,7 @@ class DataValidator:
         """Limpiar y convertir string de precio a float"""
         if not isinstance(price_str, str):
             return None
-            
-        try:
-            # Remover caracteres no numéricos excepto punto y coma
-            cleaned = re.sub(r'[^\d.,\-+]', '', price_str.strip())
-            
-            # Manejar diferentes formatos de números
-            if ',' in cleaned and '.' in cleaned:
-                # Formato como 1,234.56
-                cleaned = cleaned.replace(',', '')
-            elif ',' in cleaned and cleaned.count(',') == 1 and len(cleaned.split(',')[1]) <= 2:
-                # Formato europeo como 1234,56
-                cleaned = cleaned.replace(',', '.')
-            elif ',' in cleaned:
-                # Formato como 1,234,567
-                cleaned = cleaned.replace(',', '')
-            
-            return float(cleaned)
-            
-        except (ValueError, AttributeError):
-            return None
+        return parse_numeric(price_str, suffixes=False)
     
     @staticmethod
     def sanitize_percentage(pct_str: str) -> Optional[float]:
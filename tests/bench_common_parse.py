@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parser de páginas de tradingview/common.py
+
+Compara el parseo anterior (árbol selectolax para las filas + BeautifulSoup
+para los headers, todas las celdas extraídas) contra el parseo en una sola
+pasada de parse_page_html, sobre una página de varios miles de filas.
+
+Uso: python -m tests.bench_common_parse [filas] [repeticiones]
+"""
+import sys
+import time
+from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
+from app.adapters.tradingview.common import header_positions, parse_cells, parse_page_html
+from tests.fixtures.tradingview_pages import tradingview_page
+
+
+def parse_page_two_pass(html: str, category: str):
+    """Parseo previo: dos árboles (lexbor y html.parser) y listas de celdas"""
+    soup = BeautifulSoup(html, "html.parser")
+    thead = soup.find("thead")
+    header_pos = header_positions([th.get_text(strip=True) for th in thead.find_all("th")]) if thead else {}
+    tree = HTMLParser(html)
+    rows = tree.css("table tbody tr") or tree.css("tr")
+    refs = []
+    for node in rows:
+        ref = parse_cells([td.text(strip=True) for td in node.css("td")], category, header_pos)
+        if ref:
+            refs.append(ref)
+    return len(rows), refs
+
+
+def cpu_per_page(parse, html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        parse(html, "crypto")
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    html = tradingview_page(rows)
+
+    before = parse_page_two_pass(html, "crypto")
+    after = parse_page_html(html, "crypto")
+    assert before == after, "los dos parsers no devuelven lo mismo"
+
+    print(f"📄 Página: {rows} filas, {len(html) / 1e6:.2f} MB")
+    two_pass = cpu_per_page(parse_page_two_pass, html, repeat)
+    single_pass = cpu_per_page(parse_page_html, html, repeat)
+    print(f"🐢 Dos pasadas (selectolax + BeautifulSoup): {two_pass * 1000:8.1f} ms CPU/página")
+    print(f"⚡ Una pasada (selectolax):                   {single_pass * 1000:8.1f} ms CPU/página")
+    print(f"📉 Reducción: {(1 - single_pass / two_pass) * 100:.1f}% ({two_pass / single_pass:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del tokenizador numérico (app/numeric.py) contra los parsers
+de celdas que reemplaza
+
+Uso: python -m tests.bench_numeric [celdas]
+"""
+import re
+import sys
+import time
+import random
+from app.numeric import parse_numeric
+
+
+# --- Implementaciones anteriores (referencia) ---
+
+def old_normalize_number(text):
+    if not text:
+        return None
+    t = (text.replace("\xa0", " ")
+              .replace("USD", "")
+              .replace("$", "")
+              .replace(",", "")
+              .replace("%", "")
+              .strip())
+    t = re.sub(r"\s+", " ", t)
+    if t == "" or t in {"-", "N/A"}:
+        return None
+    try:
+        return float(t)
+    except ValueError:
+        try:
+            return float(t.replace(" ", "").replace(",", "."))
+        except ValueError:
+            return None
+
+
+def old_pct_change(text):
+    if not text:
+        return None
+    text = text.strip().replace(',', '').replace('%', '')
+    if '(' in text and ')' in text:
+        text = text.replace('(', '').replace(')', '')
+        try:
+            return -float(text)
+        except ValueError:
+            return None
+    import re
+    patterns = [
+        r'([+-]?\d+\.?\d*)%',
+        r'([+-]?\d+\.?\d*)',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            try:
+                return float(match.group(1))
+            except ValueError:
+                continue
+    return None
+
+
+def old_parse_number(text):
+    if not text:
+        return None
+    text = text.strip().replace(',', '').replace('%', '')
+    if '(' in text and ')' in text:
+        text = text.replace('(', '').replace(')', '')
+        try:
+            return -float(text)
+        except ValueError:
+            return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def old_sanitize_price(price_str):
+    if not isinstance(price_str, str):
+        return None
+    try:
+        cleaned = re.sub(r'[^\d.,\-+]', '', price_str.strip())
+        if ',' in cleaned and '.' in cleaned:
+            cleaned = cleaned.replace(',', '')
+        elif ',' in cleaned and cleaned.count(',') == 1 and len(cleaned.split(',')[1]) <= 2:
+            cleaned = cleaned.replace(',', '.')
+        elif ',' in cleaned:
+            cleaned = cleaned.replace(',', '')
+        return float(cleaned)
+    except (ValueError, AttributeError):
+        return None
+
+
+def old_extract_price_from_cell(cell_text):
+    if not cell_text:
+        return None
+    clean_text = cell_text.strip()
+    for pattern in [r'[\$]?([\d,]+\.?\d*)', r'([\d,]+\.?\d*)\s*USD', r'([\d,]+\.?\d*)\s*\$']:
+        match = re.search(pattern, clean_text)
+        if match:
+            try:
+                price = float(match.group(1).replace(',', ''))
+                if 0.0001 <= price <= 1000000:
+                    return price
+            except (ValueError, TypeError):
+                continue
+    try:
+        clean_text = clean_text.replace('$', '').replace(',', '').replace('USD', '').strip()
+        if clean_text:
+            price = float(clean_text)
+            if 0.0001 <= price <= 1000000:
+                return price
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def old_extract_change_from_cell(cell_text):
+    if not cell_text:
+        return None
+    clean_text = cell_text.strip()
+    for pattern in [r'([+-]?\d+\.?\d*)\s*%', r'([+-]?\d+\.?\d*)']:
+        match = re.search(pattern, clean_text)
+        if match:
+            try:
+                change = float(match.group(1))
+                if -100 <= change <= 1000:
+                    return change
+            except (ValueError, TypeError):
+                continue
+    return None
+
+
+# --- Columnas de prueba con el formato de las celdas reales ---
+
+def make_columns(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    prices = [f"{rng.uniform(0.001, 90000):,.4f}\xa0USD" if i % 20 else "—" for i in range(n)]
+    changes = [f"{'−' if rng.random() < 0.5 else '+'}{rng.uniform(0, 25):.2f}%" for i in range(n)]
+    caps = [f"{rng.uniform(1, 999):.2f}\xa0{rng.choice('KMBT')}\xa0USD" for i in range(n)]
+    return {"precios": prices, "cambios": changes, "market cap": caps}
+
+
+def per_cell(fn, cells, repeat=5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in cells:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(cells) * 1e9
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    columns = make_columns(n)
+    old_parsers = {
+        "normalize_number": old_normalize_number,
+        "pct_change": old_pct_change,
+        "parse_number": old_parse_number,
+        "sanitize_price": old_sanitize_price,
+        "_extract_price_from_cell": old_extract_price_from_cell,
+        "_extract_change_from_cell": old_extract_change_from_cell,
+    }
+
+    print(f"📊 {n} celdas por columna (ns/celda)")
+    for column, cells in columns.items():
+        print(f"\n🧮 Columna: {column}")
+        for name, fn in old_parsers.items():
+            print(f"   🐢 {name:28s} {per_cell(fn, cells):8.0f}")
+        print(f"   ⚡ {'parse_numeric':28s} {per_cell(parse_numeric, cells):8.0f}")
+
+
+if __name__ == "__main__":
+    main()
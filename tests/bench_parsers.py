@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark y paridad de los parsers sobre el corpus grabado (tests/fixtures/corpus)
+
+Para cada parser y página reporta filas/s, µs por fila y pico de memoria
+(heap de Python, tracemalloc; lo que reserva lexbor en C no se ve), y
+compara la salida exacta contra tests/fixtures/corpus/expected. Un cambio
+en la salida falla la paridad (código de salida 1); si el cambio es el
+esperado, `--update` graba la nueva salida.
+
+Uso: python -m tests.bench_parsers [--repeat N] [--parser NOMBRE] [--update]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List
+
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+
+from app.adapters.base import InstrumentRef
+from app.adapters.finviz import FinvizAdapter
+from app.adapters.tradingview import TradingViewAdapter
+from app.adapters.tradingview.common import extract_rows_selectolax, find_header_positions, parse_row
+from app.adapters.yahoo import YahooAdapter
+from app.anti_detection import HostBudget, host_limiters
+from app.http_client import validator_store
+from tests.conftest import EMPTY_PAGE, quiet
+from tests.fixtures import corpus
+
+EXPECTED_DIR = corpus.CORPUS_DIR / "expected"
+
+# Categorías del corpus -> categorías de TradingViewAdapter
+ADAPTER_CATEGORIES = {"futures": "commodities"}
+
+@dataclass
+class Case:
+    parser: str
+    name: str
+    run: Callable[[], List[InstrumentRef]]
+
+    @property
+    def expected_path(self) -> Path:
+        return EXPECTED_DIR / self.parser / f"{self.name}.json"
+
+
+def common_rows(page: corpus.CorpusPage) -> Callable[[], List[InstrumentRef]]:
+    """extract_rows_selectolax + parse_row (tradingview/common.py)"""
+    html = corpus.load(page)
+
+    def run():
+        tree = LexborHTMLParser(html)
+        header_pos = find_header_positions(tree)
+        refs = []
+        for row in extract_rows_selectolax(tree):
+            ref = parse_row(row, page.category, header_pos)
+            if ref:
+                refs.append(ref)
+        return refs
+    return run
+
+
+def tradingview_scrape(category: str) -> Callable[[], List[InstrumentRef]]:
+    """TradingViewAdapter._scrape_tradingview_page contra las páginas del corpus"""
+    by_url = {page.url: corpus.load(page) for page in corpus.pages("tradingview", category)}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text=by_url.get(str(request.url), EMPTY_PAGE))
+
+    async def scrape(adapter: TradingViewAdapter) -> List[InstrumentRef]:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await adapter._scrape_tradingview_page(client, ADAPTER_CATEGORIES.get(category, category), max_pages=10)
+
+    def run():
+        adapter = TradingViewAdapter()
+        # Sin red de por medio, el presupuesto del host solo mediría esperas
+        host_limiters.register(adapter.base_url, HostBudget(requests_per_second=1e6, burst=adapter.page_window))
+        validator_store.clear()  # Cada corrida parsea todas las páginas
+        try:
+            return asyncio.run(scrape(adapter))
+        finally:
+            host_limiters.register(adapter.base_url, adapter.host_budget)
+    return run
+
+
+def finviz_page(page: corpus.CorpusPage) -> Callable[[], List[InstrumentRef]]:
+    html = corpus.load(page)
+    return lambda: FinvizAdapter()._parse_finviz_html(html, page.category)
+
+
+def finviz_csv(page: corpus.CorpusPage) -> Callable[[], List[InstrumentRef]]:
+    text = corpus.load(page)
+    return lambda: FinvizAdapter()._parse_finviz_csv(text, page.category)
+
+
+def yahoo_page(page: corpus.CorpusPage) -> Callable[[], List[InstrumentRef]]:
+    html = corpus.load(page)
+    return lambda: YahooAdapter()._parse_yahoo_html(html, page.category)
+
+
+def cases() -> List[Case]:
+    found = [Case("common", page.name, common_rows(page)) for page in corpus.pages("tradingview")]
+    found += [Case("tradingview_adapter", category, tradingview_scrape(category)) for category in corpus.TV_PAGES]
+    found += [Case("finviz", page.name, finviz_page(page)) for page in corpus.pages("finviz") if page.ext == "html"]
+    found += [Case("finviz_csv", page.name, finviz_csv(page)) for page in corpus.pages("finviz") if page.ext == "csv"]
+    found += [Case("yahoo", page.name, yahoo_page(page)) for page in corpus.pages("yahoo")]
+    return found
+
+
+def load_expected(case: Case) -> List[InstrumentRef]:
+    items = json.loads(case.expected_path.read_text(encoding="utf-8"))
+    return [InstrumentRef(**item) for item in items]
+
+
+def save_expected(case: Case, refs: List[InstrumentRef]) -> None:
+    case.expected_path.parent.mkdir(parents=True, exist_ok=True)
+    # Una fila por línea: los diffs muestran qué filas cambiaron
+    lines = ",\n".join(json.dumps(ref._asdict(), ensure_ascii=False) for ref in refs)
+    case.expected_path.write_text(f"[\n{lines}\n]\n", encoding="utf-8")
+
+
+def measure(case: Case, repeat: int) -> tuple:
+    """(mejor tiempo en s, pico de memoria en bytes) de una corrida"""
+    quiet(case.run)  # Calentar: layouts en caché, como en producción
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        quiet(case.run)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    quiet(case.run)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--parser", help="Correr solo este parser (common, tradingview_adapter, finviz, finviz_csv, yahoo)")
+    parser.add_argument("--update", action="store_true", help="Grabar la salida actual como esperada")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'parser':<20} {'página':<12} {'filas':>6} {'filas/s':>10} {'µs/fila':>9} {'pico MB':>8}  paridad")
+    for case in cases():
+        if args.parser and case.parser != args.parser:
+            continue
+        refs = quiet(case.run)
+        if args.update:
+            save_expected(case, refs)
+            parity = "📝"
+        elif case.expected_path.exists() and refs == load_expected(case):
+            parity = "✅"
+        else:
+            parity = "❌"
+            failures += 1
+        seconds, peak = measure(case, args.repeat)
+        rows = len(refs)
+        rate = rows / seconds if seconds else 0.0
+        per_row = seconds / rows * 1e6 if rows else 0.0
+        print(f"{case.parser:<20} {case.name:<12} {rows:>6} {rate:>10,.0f} {per_row:>9.1f} {peak / 1e6:>8.2f}  {parity}")
+
+    if failures:
+        print(f"❌ {failures} casos no coinciden con la salida grabada")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark del screener JSON de TradingView frente a las páginas HTML
+
+Ambas rutas corren contra el servidor local con las respuestas grabadas
+(tests/fixtures/tradingview_server.py), así que se comparan peticiones,
+tiempo total y filas sobre los mismos instrumentos. También mide solo la
+decodificación de una respuesta de scan con orjson y con json.
+
+Uso: python -m tests.bench_scanner [--repeat N] [--category NOMBRE]
+"""
+import argparse
+import asyncio
+import gzip
+import time
+from typing import Callable, List
+
+from app.adapters.base import InstrumentRef
+from app.adapters.tradingview import scanner
+from app.http_client import close_clients, get_client, validator_store
+from tests.conftest import quiet
+from tests.fixtures import corpus
+from tests.fixtures.tradingview_server import TradingViewStandIn
+
+
+def scrape(server: TradingViewStandIn, category: str, use_scanner: bool) -> Callable[[], List[InstrumentRef]]:
+    def run():
+        adapter = server.adapter(use_scanner)
+        validator_store.clear()  # Cada corrida parsea todas las páginas
+
+        async def go():
+            try:
+                return await adapter._scrape_tradingview_page(
+                    get_client(server.url), corpus.adapter_category(category), max_pages=100
+                )
+            finally:
+                await close_clients()
+        return asyncio.run(go())
+    return run
+
+
+def best_of(run: Callable[[], List[InstrumentRef]], repeat: int) -> tuple:
+    """(mejor tiempo en s, filas) tras una corrida de calentamiento"""
+    refs = quiet(run)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        quiet(run)
+        best = min(best, time.perf_counter() - start)
+    return best, refs
+
+
+def bench_decode(category: str, repeat: int) -> None:
+    content = gzip.decompress(corpus.scan_path(category).read_bytes())
+    columns = corpus.SCAN_COLUMNS
+    for label, available in (("orjson", scanner.ORJSON_AVAILABLE), ("json", False)):
+        if label == "orjson" and not available:
+            print("   orjson no instalado")
+            continue
+        saved, scanner.ORJSON_AVAILABLE = scanner.ORJSON_AVAILABLE, available
+        try:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                _, refs = scanner.decode_scan(content, category, columns)
+                best = min(best, time.perf_counter() - start)
+        finally:
+            scanner.ORJSON_AVAILABLE = saved
+        print(f"   decode {label:<7} {len(content) / 1024:>6.0f} KB  {len(refs):>5} filas  {best * 1e3:>7.2f} ms  {len(refs) / best:>10,.0f} filas/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--category", choices=list(corpus.TV_SCAN_ROWS))
+    args = parser.parse_args()
+    categories = [args.category] if args.category else list(corpus.TV_SCAN_ROWS)
+
+    with TradingViewStandIn(categories=categories) as server:
+        print(f"{'categoría':<10} {'ruta':<8} {'peticiones':>10} {'filas':>6} {'tiempo s':>9}")
+        for category in categories:
+            symbols = {}
+            for label, use_scanner in (("json", True), ("html", False)):
+                before = sum(server.requests.values())
+                seconds, refs = best_of(scrape(server, category, use_scanner), args.repeat)
+                requests = (sum(server.requests.values()) - before) // (args.repeat + 1)
+                symbols[label] = {ref.symbol for ref in refs}
+                print(f"{category:<10} {label:<8} {requests:>10} {len(refs):>6} {seconds:>9.3f}")
+            missing = symbols["html"] - symbols["json"]
+            print(f"   símbolos del HTML ausentes en el JSON: {len(missing)}")
+            bench_decode(category, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Fixtures y utilidades compartidas de los tests: el corpus de páginas de
+TradingView servido con httpx.MockTransport y la salida de los adaptadores
+silenciada
+"""
+import os
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Set, TypeVar
+
+import httpx
+import pytest
+
+from app.adapters.tradingview import common
+from app.anti_detection import HostBudget, host_limiters
+from app.crawl_planner import crawl_planner
+from app.http_client import validator_store
+from app.snapshots import snapshot_store
+from tests.fixtures import corpus
+
+T = TypeVar("T")
+
+# Tabla sin filas: lo que devuelve TradingView pasada la última página
+EMPTY_PAGE = "<html><body><table><thead><tr><th>Symbol</th></tr></thead><tbody></tbody></table></body></html>"
+
+TV_HOST = "https://www.tradingview.com"
+
+
+def quiet(run: Callable[[], T]) -> T:
+    # Los prints de los adaptadores cuentan en el tiempo, pero no se muestran
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        return run()
+
+
+class CorpusSource:
+    """Páginas de TradingView del corpus por URL; `requested` registra cada
+    descarga y las URLs en `failing` responden 500"""
+
+    def __init__(self, by_url: Dict[str, str]):
+        self.by_url = by_url
+        self.requested: List[str] = []
+        self.failing: Set[str] = set()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.requested.append(url)
+        if url in self.failing:
+            return httpx.Response(500, text="error")
+        return httpx.Response(200, text=self.by_url.get(url, EMPTY_PAGE))
+
+
+@pytest.fixture
+def tv_pages(monkeypatch):
+    """Todas las categorías del corpus detrás del cliente de common, con el
+    planificador, los snapshots y los validadores vacíos"""
+    source = CorpusSource({
+        page.url: corpus.load(page)
+        for category in common.TV_URLS
+        for page in corpus.pages("tradingview", category)
+    })
+    client = httpx.AsyncClient(transport=httpx.MockTransport(source.handler))
+    monkeypatch.setattr(common, "get_client", lambda url: client)
+    # Sin red de por medio el presupuesto del host solo mediría esperas (y un 500 lo baja)
+    previous = host_limiters.get(TV_HOST)
+    host_limiters.register(TV_HOST, HostBudget(requests_per_second=1e6, burst=64))
+    snapshot_store.clear()
+    validator_store.clear()
+    crawl_planner.clear()
+    yield source
+    snapshot_store.clear()
+    crawl_planner.clear()
+    host_limiters.register(TV_HOST, HostBudget(requests_per_second=previous.max_rate, burst=previous.capacity))
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Corpus de páginas HTML para benchmarks y paridad de parsers (gzip)
+
+Cada entrada es una página de TradingView (todas las categorías, varias
+páginas donde el sitio pagina), Finviz o Yahoo, guardada comprimida en
+tests/fixtures/corpus/<proveedor>/<nombre>.html.gz (.csv.gz para el export
+CSV de Finviz). Las respuestas del
+screener JSON de TradingView (una por categoría, todas las filas) van en
+tests/fixtures/corpus/tradingview_scan/<categoría>.json.gz.
+
+    python -m tests.fixtures.corpus build    # regenerar las páginas sintéticas
+    python -m tests.fixtures.corpus record   # grabar las páginas reales (requiere red)
+
+`build` es determinista (misma semilla, mismo marcado que las tablas de cada
+sitio); `record` reemplaza las páginas por las descargadas del sitio real.
+"""
+import csv
+import gzip
+import io
+import json
+import random
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.adapters.tradingview.scanner import scan_columns, scan_payload, scan_url
+from tests.fixtures.tradingview_pages import HEADERS as CRYPTO_HEADERS
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+
+@dataclass(frozen=True)
+class CorpusPage:
+    provider: str
+    name: str
+    category: str
+    page: int
+    url: str
+    ext: str = "html"
+
+    @property
+    def path(self) -> Path:
+        return CORPUS_DIR / self.provider / f"{self.name}.{self.ext}.gz"
+
+
+def _tv_url(path: str, page: int) -> str:
+    url = f"https://www.tradingview.com/markets/{path}/"
+    return url if page == 1 else f"{url}?page={page}"
+
+
+# Filas por página de cada categoría de TradingView (la última página es corta)
+TV_PAGES = {
+    "indices": ("indices/quotes-all", [80]),
+    "crypto": ("cryptocurrencies/prices-all", [100, 100, 41]),
+    "forex": ("currencies/rates-all", [100, 63]),
+    "futures": ("futures/quotes-all", [90]),
+    "stocks": ("stocks-usa/market-movers-large-cap", [100]),
+}
+
+PAGES: List[CorpusPage] = [
+    CorpusPage("tradingview", f"{category}_p{page}", category, page, _tv_url(path, page))
+    for category, (path, sizes) in TV_PAGES.items()
+    for page in range(1, len(sizes) + 1)
+] + [
+    CorpusPage("finviz", "stocks", "stocks", 1, "https://finviz.com/screener.ashx?v=111&s=ta_mostactive"),
+    CorpusPage("finviz", "crypto", "crypto", 1, "https://finviz.com/crypto.ashx"),
+    CorpusPage("finviz", "forex", "forex", 1, "https://finviz.com/forex.ashx"),
+    # Export CSV del mismo screener que finviz/stocks (mismas filas)
+    CorpusPage("finviz", "stocks_export", "stocks", 1, "https://finviz.com/export.ashx?v=111&s=ta_mostactive", ext="csv"),
+    CorpusPage("yahoo", "stocks", "stocks", 1, "https://finance.yahoo.com/most-active"),
+    CorpusPage("yahoo", "crypto", "crypto", 1, "https://finance.yahoo.com/crypto"),
+]
+
+
+def pages(provider: Optional[str] = None, category: Optional[str] = None) -> List[CorpusPage]:
+    return [
+        page for page in PAGES
+        if (provider is None or page.provider == provider) and (category is None or page.category == category)
+    ]
+
+
+def load(page: CorpusPage) -> str:
+    return gzip.decompress(page.path.read_bytes()).decode("utf-8")
+
+
+def save(page: CorpusPage, html: str) -> None:
+    page.path.parent.mkdir(parents=True, exist_ok=True)
+    # mtime=0: el mismo HTML da los mismos bytes (diffs limpios en git)
+    page.path.write_bytes(gzip.compress(html.encode("utf-8"), mtime=0))
+
+
+# --- Páginas sintéticas ---
+
+def _signed(value: float, unicode_minus: bool = True) -> str:
+    """TradingView muestra los negativos con el signo menos unicode"""
+    text = f"{value:+.2f}"
+    return text.replace("-", "−") if unicode_minus else text
+
+
+TV_HEADERS = {
+    "indices": ["Symbol", "Price", "Change %", "Change", "High", "Low", "Technical Rating"],
+    "crypto": CRYPTO_HEADERS,
+    "forex": ["Symbol", "Price", "Change %", "Change", "Bid", "Ask", "High", "Low", "Technical Rating"],
+    "futures": ["Symbol", "Price", "Change %", "Change", "High", "Low", "Technical Rating"],
+    "stocks": ["Symbol", "Market cap", "Price", "Change %", "Volume", "Rel Volume", "P/E", "EPS dil TTM", "Sector"],
+}
+
+_CURRENCIES = ["USD", "EUR", "JPY", "GBP", "CHF", "CAD", "AUD", "NZD", "MXN", "COP", "BRL", "SEK", "NOK", "ZAR"]
+_PAIRS = [(base, quote) for base in _CURRENCIES for quote in _CURRENCIES if base != quote]
+_RATINGS = ["Strong buy", "Buy", "Neutral", "Sell", "Strong sell"]
+
+
+def _tv_symbol(category: str, i: int) -> tuple:
+    """(símbolo, descripción) con la forma de cada mercado"""
+    if category == "forex":
+        base, quote = _PAIRS[i % len(_PAIRS)]
+        return f"{base}{quote}", f"{base} / {quote}"
+    if category == "futures":
+        return f"F{i:03d}1!", f"Future contract {i}"
+    if category == "indices":
+        return f"IX{i:03d}", f"Index number {i}"
+    if category == "stocks":
+        return f"STK{i:03d}", f"Company {i} Inc."
+    return f"C{i:05d}", f"Coin number {i}"
+
+
+def _tv_cells(rng: random.Random, category: str, price: float, change: float) -> List[str]:
+    fmt = f"{price:,.4f}" if price < 10 else f"{price:,.2f}"
+    change_cell = f'<span class="{"positive" if change >= 0 else "negative"}-p_QIAEOQ">{_signed(change)}%</span>'
+    if category == "crypto":
+        return [
+            f"{fmt}&nbsp;<span>USD</span>", change_cell, f"{_signed(price * change / 100)}&nbsp;USD",
+            f"{rng.uniform(1, 900):.2f}&nbsp;B&nbsp;USD", f"{rng.uniform(1, 900):.2f}&nbsp;M&nbsp;USD",
+            f"{rng.uniform(1, 900):.2f}&nbsp;M", f"{rng.uniform(0, 1):.4f}", f"{rng.uniform(0, 5):.2f}%",
+            '<span class="tag-T0ZgeRdr">Layer 1</span>',
+        ]
+    if category == "stocks":
+        return [
+            f"{rng.uniform(0.2, 3.5):.2f}&nbsp;T&nbsp;USD", f"{fmt}&nbsp;USD", change_cell,
+            f"{rng.uniform(1, 90):.2f}&nbsp;M", f"{rng.uniform(0.3, 3):.2f}", f"{rng.uniform(5, 80):.2f}",
+            f"{_signed(rng.uniform(-5, 20))}&nbsp;USD", "Technology services",
+        ]
+    rating = _RATINGS[rng.randrange(len(_RATINGS))]
+    high, low = price * (1 + rng.uniform(0, 0.03)), price * (1 - rng.uniform(0, 0.03))
+    cells = [fmt, change_cell, _signed(price * change / 100)]
+    if category == "forex":
+        cells += [f"{price * 0.9999:.5f}", f"{price * 1.0001:.5f}"]
+    cells += [f"{high:,.2f}", f"{low:,.2f}", f'<span class="rating">{rating}</span>']
+    return cells
+
+
+def _tv_price_change(rng: random.Random, category: str, i: int) -> tuple:
+    price = rng.choice([rng.uniform(0.5, 2.0), rng.uniform(10, 500), rng.uniform(1000, 70000)])
+    if category == "forex" and i % 9 == 0:
+        price = rng.uniform(90, 160)  # cotizaciones de tres cifras (como los pares con JPY)
+    return price, rng.uniform(-12, 12)
+
+
+def tradingview_row(rng: random.Random, category: str, i: int, price: float, change: float) -> str:
+    symbol, description = _tv_symbol(category, i)
+    cells = "".join(f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{cell}</td>' for cell in _tv_cells(rng, category, price, change))
+    return (
+        f'<tr class="row-RdUXZpkv listRow" data-rowkey="{category.upper()}:{symbol}">'
+        f'<td class="cell-RLhfr_y4 left-RLhfr_y4"><span class="tickerCell-GrtoTeat">'
+        f'<img class="logo-PsAlMQQF" src="/logo/{symbol}.svg">'
+        f'<a class="apply-common-tooltip tickerNameBox-GrtoTeat" href="/symbols/{symbol}/">{symbol}</a>'
+        f'<sup class="tickerDescription-GrtoTeat">{description}</sup></span></td>{cells}</tr>'
+    )
+
+
+def tradingview_document(category: str, rows: List[str]) -> str:
+    headers = "".join(
+        f'<th class="cell-RLhfr_y4"><div class="headCell-RLhfr_y4"><span>{text}</span></div></th>'
+        for text in TV_HEADERS[category]
+    )
+    footer = "".join(f'<p class="footer-link"><a href="/support/{n}/">Help {n}</a></p>' for n in range(60))
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f"<title>{category.title()} — TradingView</title>"
+        '<script>window.initData = {"theme":"light","locale":"en"};</script></head><body class="chart-page">'
+        '<div class="tv-header"><nav><ul><li><a href="/markets/">Markets</a></li></ul></nav></div>'
+        '<div class="tv-screener-table"><div class="tableWrap-SfGgNYTG"><table class="table-Ngq2xrcG">'
+        f'<thead><tr class="row-RdUXZpkv">{headers}</tr></thead><tbody>{"".join(rows)}</tbody></table></div></div>'
+        f'<div class="tv-footer">{footer}</div></body></html>'
+    )
+
+
+def tradingview_corpus_page(category: str, page: int, rows: int, seed: int) -> str:
+    rng = random.Random(seed)
+    offset = sum(TV_PAGES[category][1][:page - 1])
+    body = []
+    for i in range(offset, offset + rows):
+        price, change = _tv_price_change(rng, category, i)
+        body.append(tradingview_row(rng, category, i, price, change))
+    return tradingview_document(category, body)
+
+
+FINVIZ_HEADERS = {
+    "stocks": ["No.", "Ticker", "Company", "Price", "Change", "Volume", "Sector", "Industry", "Country"],
+    "crypto": ["Ticker", "Name", "Price", "Change", "Perf Week", "Perf Month", "Perf Year", "Volume"],
+    "forex": ["Ticker", "Name", "Price", "Change", "Perf Week", "Perf Month", "Perf Year", "Volume"],
+}
+
+
+# Columnas del export CSV del screener de acciones
+FINVIZ_CSV_HEADERS = ["No.", "Ticker", "Company", "Sector", "Industry", "Country", "Market Cap", "P/E", "Price", "Change", "Volume"]
+
+
+def _finviz_rows(category: str, rows: int, seed: int) -> List[tuple]:
+    """(i, precio, cambio, volumen, rendimientos) de cada fila"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(rows):
+        price = rng.uniform(1, 800) if category != "forex" else rng.uniform(0.5, 160)
+        change = f"{rng.uniform(-9, 9):.2f}%"
+        volume = rng.randrange(10_000, 90_000_000)
+        perf = () if category == "stocks" else (rng.uniform(-20, 20), rng.uniform(-30, 30), rng.uniform(-80, 200))
+        data.append((i, price, change, volume, perf))
+    return data
+
+
+def finviz_corpus_page(category: str, rows: int, seed: int) -> str:
+    header = "".join(f'<td class="table-top" align="center">{text}</td>' for text in FINVIZ_HEADERS[category])
+    body = []
+    for i, price, change, volume, perf in _finviz_rows(category, rows, seed):
+        if category == "stocks":
+            cells = [str(i + 1), f'<a class="screener-link-primary">T{i:03d}</a>', f"Company {i}",
+                     f"{price:.2f}", change, f"{volume:,}", "Technology", "Software", "USA"]
+        else:
+            symbol = f"X{i:02d}USD" if category == "crypto" else "".join(_PAIRS[i * 3 % len(_PAIRS)])
+            cells = [f'<a class="tab-link">{symbol}</a>', f"Name {i}", f"{price:,.4f}", change,
+                     f"{perf[0]:.2f}%", f"{perf[1]:.2f}%", f"{perf[2]:.2f}%", f"{volume:,}"]
+        body.append(f'<tr class="table-light-row-cp">{"".join(f"<td>{cell}</td>" for cell in cells)}</tr>')
+    return (
+        '<!DOCTYPE html><html><head><title>Finviz</title></head><body>'
+        '<table class="header-table"><tr><td><a href="/">Home</a></td><td><a href="/news.ashx">News</a></td></tr></table>'
+        '<div id="screener-content"><table class="table-light" width="100%">'
+        f'<tr valign="middle">{header}</tr>{"".join(body)}</table></div></body></html>'
+    )
+
+
+def finviz_corpus_csv(rows: int, seed: int) -> str:
+    """Export CSV del screener de acciones (todas las celdas entre comillas, como el sitio)"""
+    out = io.StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator="\r\n")
+    writer.writerow(FINVIZ_CSV_HEADERS)
+    for i, price, change, volume, _ in _finviz_rows("stocks", rows, seed):
+        writer.writerow([i + 1, f"T{i:03d}", f"Company {i}", "Technology", "Software", "USA",
+                         f"{price * 1e3:.2f}", f"{price / 7:.2f}", f"{price:.2f}", change, volume])
+    return out.getvalue()
+
+
+YAHOO_HEADERS = ["Symbol", "Name", "Price (Intraday)", "Change", "% Change", "Volume", "Avg Vol (3 month)", "Market Cap"]
+
+
+def yahoo_corpus_page(category: str, rows: int, seed: int) -> str:
+    rng = random.Random(seed)
+    header = "".join(f'<th scope="col">{text}</th>' for text in YAHOO_HEADERS)
+    body = []
+    for i in range(rows):
+        symbol = f"Y{i:03d}" if category == "stocks" else f"YC{i:03d}-USD"
+        price = rng.uniform(0.2, 900)
+        change = rng.uniform(-8, 8)
+        cells = [
+            f'<a href="/quote/{symbol}?p={symbol}" data-test="quoteLink">{symbol}</a>', f"Name {i}",
+            f'<fin-streamer data-field="regularMarketPrice" value="{price:.4f}">{price:,.2f}</fin-streamer>',
+            _signed(price * change / 100, unicode_minus=False),
+            f"{_signed(change, unicode_minus=False)}%", f"{rng.uniform(1, 90):.3f}M", f"{rng.uniform(1, 90):.3f}M",
+            f"{rng.uniform(1, 900):.3f}B",
+        ]
+        body.append(f'<tr class="simpTblRow">{"".join(f"<td>{cell}</td>" for cell in cells)}</tr>')
+    return (
+        '<!DOCTYPE html><html><head><title>Yahoo Finance</title></head><body><div id="scr-res-table">'
+        '<table class="W(100%)"><thead><tr>'
+        f'{header}</tr></thead><tbody>{"".join(body)}</tbody></table></div></body></html>'
+    )
+
+
+# --- Respuestas del screener JSON ---
+
+SCAN_DIR = CORPUS_DIR / "tradingview_scan"
+
+# Filas por categoría (los expected_counts de TradingViewAdapter)
+TV_SCAN_ROWS = {"indices": 80, "crypto": 3541, "forex": 2586, "futures": 429, "stocks": 100}
+
+# Columnas grabadas: las de una petición sin proyección
+SCAN_COLUMNS = scan_columns()
+
+# Categorías del corpus -> categorías de TradingViewAdapter
+ADAPTER_CATEGORIES = {"futures": "commodities"}
+
+_SCAN_EXCHANGES = {"indices": "TVC", "crypto": "CRYPTO", "forex": "FX_IDC", "futures": "COMEX", "stocks": "NASDAQ"}
+
+
+def adapter_category(category: str) -> str:
+    return ADAPTER_CATEGORIES.get(category, category)
+
+
+def scan_path(category: str) -> Path:
+    return SCAN_DIR / f"{category}.json.gz"
+
+
+def load_scan(category: str) -> dict:
+    return json.loads(gzip.decompress(scan_path(category).read_bytes()))
+
+
+def save_scan(category: str, content: bytes) -> None:
+    SCAN_DIR.mkdir(parents=True, exist_ok=True)
+    scan_path(category).write_bytes(gzip.compress(content, mtime=0))
+
+
+def tradingview_scan_response(category: str, rows: int, seed: int) -> dict:
+    """Respuesta de scan con precios redondeados como en las tablas HTML"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(rows):
+        price, change = _tv_price_change(rng, category, i)
+        symbol, description = _tv_symbol(category, i)
+        currency = symbol[3:] if category == "forex" else "USD"
+        values = {
+            "name": symbol,
+            "close": round(price, 4 if price < 10 else 2),
+            "description": description,
+            "currency": currency,
+            "change": round(change, 2),
+        }
+        data.append({"s": f"{_SCAN_EXCHANGES[category]}:{symbol}", "d": [values[column] for column in SCAN_COLUMNS]})
+    return {"totalCount": rows, "data": data}
+
+
+def build_scan(category: str) -> bytes:
+    seed = sum(map(ord, f"scan_{category}"))
+    return json.dumps(tradingview_scan_response(category, TV_SCAN_ROWS[category], seed), separators=(",", ":")).encode()
+
+
+def record_scan(category: str) -> bytes:
+    import httpx
+
+    payload = scan_payload(adapter_category(category), 0, TV_SCAN_ROWS[category])
+    response = httpx.post(scan_url(adapter_category(category)), json=payload, timeout=20)
+    response.raise_for_status()
+    return response.content
+
+
+def build_page(page: CorpusPage) -> str:
+    seed = sum(map(ord, page.name))
+    if page.provider == "tradingview":
+        rows = TV_PAGES[page.category][1][page.page - 1]
+        return tradingview_corpus_page(page.category, page.page, rows, seed)
+    if page.provider == "finviz" and page.ext == "csv":
+        return finviz_corpus_csv(60, sum(map(ord, page.category)))  # Semilla de finviz/stocks
+    if page.provider == "finviz":
+        return finviz_corpus_page(page.category, 60, seed)
+    return yahoo_corpus_page(page.category, 50, seed)
+
+
+def record_page(page: CorpusPage) -> str:
+    import httpx
+    from app.utils import get_headers
+
+    response = httpx.get(page.url, headers=get_headers(), timeout=20, follow_redirects=True)
+    response.raise_for_status()
+    return response.text
+
+
+def main(argv: List[str]) -> None:
+    commands: Dict[str, Callable[[CorpusPage], str]] = {"build": build_page, "record": record_page}
+    scan_commands: Dict[str, Callable[[str], bytes]] = {"build": build_scan, "record": record_scan}
+    if len(argv) != 1 or argv[0] not in commands:
+        print(__doc__)
+        sys.exit(2)
+    for page in PAGES:
+        html = commands[argv[0]](page)
+        save(page, html)
+        print(f"📄 {page.path.relative_to(CORPUS_DIR)}: {len(html) / 1024:.0f} KB")
+    for category in TV_SCAN_ROWS:
+        content = scan_commands[argv[0]](category)
+        save_scan(category, content)
+        print(f"📄 {scan_path(category).relative_to(CORPUS_DIR)}: {len(content) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
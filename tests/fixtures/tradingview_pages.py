@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Páginas sintéticas con el marcado de las tablas de TradingView (markets/*)
+
+Se generan de forma determinista para no versionar HTML de varios MB: misma
+estructura de thead/tbody, clases y celdas que la página grabada de
+cryptocurrencies/prices-all, con el número de filas que se pida.
+"""
+import random
+
+HEADERS = [
+    "Symbol", "Price", "Change % 24h", "Change 24h", "Market cap", "Volume 24h in USD",
+    "Circulating Supply", "Vol / Mkt Cap", "Social dominance", "Category",
+]
+
+PAGE_HEAD = """<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">
+<title>Cryptocurrency Prices, Charts and Crypto Market Cap — TradingView</title>
+<script>window.initData = {"theme":"light","locale":"en","markup":"<table><tr><td>x</td></tr></table>"};</script>
+<link rel="stylesheet" href="/static/bundles/market.css"></head><body class="chart-page">
+<div class="tv-header"><nav><ul><li><a href="/markets/">Markets</a></li><li><a href="/screener/">Screeners</a></li></ul></nav></div>
+<div class="tv-screener-table"><div class="tableWrap-SfGgNYTG"><table class="table-Ngq2xrcG">
+<thead><tr class="row-RdUXZpkv">{headers}</tr></thead><tbody>"""
+
+PAGE_TAIL = """</tbody></table></div></div>
+<div class="tv-footer">{footer}</div></body></html>"""
+
+
+def _row(rng: random.Random, i: int) -> str:
+    symbol = f"C{i:05d}"
+    price = rng.uniform(0.0001, 70000)
+    change = rng.uniform(-25, 25)
+    return (
+        f'<tr class="row-RdUXZpkv listRow" data-rowkey="CRYPTO:{symbol}USD">'
+        f'<td class="cell-RLhfr_y4 left-RLhfr_y4"><span class="tickerCell-GrtoTeat">'
+        f'<img class="logo-PsAlMQQF" src="/logo/{symbol}.svg">'
+        f'<a class="apply-common-tooltip tickerNameBox-GrtoTeat" href="/symbols/{symbol}USD/">{symbol}</a>'
+        f'<sup class="tickerDescription-GrtoTeat">Coin number {i}</sup></span></td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{price:,.4f}&nbsp;<span class="currency-tfxE2x9T">USD</span></td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4"><span class="{"positive" if change >= 0 else "negative"}-p_QIAEOQ">{change:+.2f}%</span></td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{price * change / 100:+,.4f}&nbsp;USD</td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{rng.uniform(1, 900):.2f}&nbsp;B&nbsp;USD</td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{rng.uniform(1, 900):.2f}&nbsp;M&nbsp;USD</td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{rng.uniform(1, 900):.2f}&nbsp;M</td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{rng.uniform(0, 1):.4f}</td>'
+        f'<td class="cell-RLhfr_y4 right-RLhfr_y4">{rng.uniform(0, 5):.2f}%</td>'
+        f'<td class="cell-RLhfr_y4 left-RLhfr_y4"><span class="tag-T0ZgeRdr">Layer 1</span></td>'
+        f'</tr>'
+    )
+
+
+def tradingview_page(rows: int, seed: int = 42) -> str:
+    """Página de TradingView con `rows` filas de datos"""
+    rng = random.Random(seed)
+    headers = "".join(
+        f'<th class="cell-RLhfr_y4"><div class="headCell-RLhfr_y4"><span>{text}</span></div></th>'
+        for text in HEADERS
+    )
+    footer = "".join(f'<p class="footer-link"><a href="/support/{n}/">Help {n}</a></p>' for n in range(200))
+    body = "".join(_row(rng, i) for i in range(rows))
+    return PAGE_HEAD.replace("{headers}", headers) + body + PAGE_TAIL.replace("{footer}", footer)
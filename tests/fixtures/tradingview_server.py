@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Servidor local que hace de TradingView con las respuestas grabadas del corpus
+
+    POST /<mercado>/scan   rango pedido de tests/fixtures/corpus/tradingview_scan
+    GET  /markets/...      las mismas filas como tablas HTML de 100 filas
+
+Las dos rutas sirven los mismos instrumentos, así que el screener JSON y el
+scraping HTML se pueden comparar contra el mismo servidor (sin red).
+
+    with TradingViewStandIn() as server:
+        adapter = server.adapter(use_scanner=True)
+"""
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+
+from app.adapters.tradingview import TradingViewAdapter
+from app.adapters.tradingview.scanner import SCANNER_MARKETS
+from app.anti_detection import HostBudget, host_limiters
+from tests.fixtures import corpus
+
+HTML_PAGE_ROWS = 100
+CLOSE = corpus.SCAN_COLUMNS.index("close")
+CHANGE = corpus.SCAN_COLUMNS.index("change")
+
+
+class TradingViewStandIn:
+    """ThreadingHTTPServer en un puerto libre de 127.0.0.1.
+
+    `failing` son mercados del screener que responden 500 (para probar la
+    vuelta al HTML) y `failing_pages` números de página HTML que también
+    responden 500; `requests` cuenta las peticiones por método.
+    """
+
+    def __init__(self, categories: Optional[List[str]] = None, failing: Optional[Set[str]] = None,
+                 failing_pages: Optional[Set[int]] = None):
+        self.scans = {category: corpus.load_scan(category) for category in categories or corpus.TV_SCAN_ROWS}
+        self.by_market = {SCANNER_MARKETS[corpus.adapter_category(category)][0]: category for category in self.scans}
+        self.by_path = {f"/markets/{corpus.TV_PAGES[category][0]}/": category for category in self.scans}
+        self.failing = failing or set()
+        self.failing_pages = failing_pages or set()
+        self.requests = {"POST": 0, "GET": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def adapter(self, use_scanner: bool = True) -> TradingViewAdapter:
+        """TradingViewAdapter con el screener y las páginas en este servidor"""
+        adapter = TradingViewAdapter(use_scanner=use_scanner, scanner_url=self.url)
+        adapter.markets = {category: self.url + urlsplit(url).path for category, url in adapter.markets.items()}
+        # Después del adaptador (gana el último registro): sin red de por
+        # medio, el presupuesto del host solo mediría esperas
+        host_limiters.register(self.url, HostBudget(requests_per_second=1e6, burst=64))
+        return adapter
+
+    def __enter__(self) -> "TradingViewStandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _count(self, method: str) -> None:
+        with self._lock:
+            self.requests[method] += 1
+
+    def scan(self, market: str, payload: dict) -> Optional[dict]:
+        """Rango y columnas pedidos de la respuesta grabada"""
+        category = self.by_market.get(market)
+        if category is None:
+            return None
+        recorded = self.scans[category]
+        start, end = payload.get("range", [0, recorded["totalCount"]])
+        columns = [corpus.SCAN_COLUMNS.index(column) for column in payload.get("columns", corpus.SCAN_COLUMNS)]
+        data = [
+            {"s": item["s"], "d": [item["d"][i] for i in columns]}
+            for item in recorded["data"][start:end]
+        ]
+        return {"totalCount": recorded["totalCount"], "data": data}
+
+    def page(self, path: str, page: int) -> Optional[str]:
+        """Página HTML `page` con las filas grabadas (vacía después de la última)"""
+        category = self.by_path.get(path)
+        if category is None:
+            return None
+        rng = random.Random(page)
+        start = (page - 1) * HTML_PAGE_ROWS
+        rows = [
+            corpus.tradingview_row(rng, category, i, item["d"][CLOSE], item["d"][CHANGE])
+            for i, item in enumerate(self.scans[category]["data"][start:start + HTML_PAGE_ROWS], start)
+        ]
+        return corpus.tradingview_document(category, rows)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def _reply(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                server._count("POST")
+                market = self.path.strip("/").split("/")[0]
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                result = None if market in server.failing else server.scan(market, payload)
+                if result is None:
+                    self._reply(500, b'{"error":"scan failed"}', "application/json")
+                    return
+                self._reply(200, json.dumps(result, separators=(",", ":")).encode(), "application/json")
+
+            def do_GET(self) -> None:
+                server._count("GET")
+                parts = urlsplit(self.path)
+                page = int(parse_qs(parts.query).get("page", ["1"])[0])
+                if page in server.failing_pages:
+                    self._reply(500, b"error", "text/plain")
+                    return
+                html = server.page(parts.path, page)
+                if html is None:
+                    self._reply(404, b"not found", "text/plain")
+                    return
+                self._reply(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+        return Handler
@@ -0,0 +1,61 @@
+"""
+Recorrido completo de categorías (iter_category_pages) y /api/verify:
+cada página fuente se descarga una sola vez
+"""
+import asyncio
+import collections
+import json
+
+from api import vercel_app
+from app.adapters.tradingview import common
+from app.deadline import Deadline, deadline_scope
+from app.http_client import validator_store
+from tests.conftest import quiet
+
+
+def test_iter_category_yields_every_page_in_order(tv_pages):
+    async def walk():
+        return [batch async for batch in common.iter_category("crypto")]
+
+    batches = quiet(lambda: asyncio.run(walk()))
+
+    assert [len(batch) for batch in batches] == [100, 100, 41]
+    assert len({ref.symbol for batch in batches for ref in batch}) == 241
+
+
+def test_verify_fetches_each_source_page_once(tv_pages):
+    quiet(lambda: asyncio.run(vercel_app.verify()))  # Primer recorrido: aprende el modelo
+    tv_pages.requested.clear()
+    validator_store.clear()
+
+    report = json.loads(quiet(lambda: asyncio.run(vercel_app.verify())).body)["tradingview"]
+
+    assert collections.Counter(tv_pages.requested) == collections.Counter(set(tv_pages.by_url))
+    assert {category: entry["status"] for category, entry in report.items()} == dict.fromkeys(common.TV_URLS, "ok")
+    assert report["crypto"]["scraped_count"] == report["crypto"]["expected_count"] == 241
+
+
+def test_failed_middle_page_stops_the_walk(tv_pages):
+    tv_pages.failing.add("https://www.tradingview.com/markets/cryptocurrencies/prices-all/?page=2")
+    deadline = Deadline.after(60).child(("tradingview", "crypto"))
+
+    async def crawl():
+        with deadline_scope(deadline):
+            return await common.crawl_category("crypto")
+
+    refs, expected_rows, complete, page_starts = quiet(lambda: asyncio.run(crawl()))
+
+    # Sin la página 2 no se sigue con la 3: sus filas no quedan rotuladas como página 2
+    assert (len(refs), expected_rows, complete, page_starts) == (100, 100, False, (0,))
+    assert deadline.partial
+
+
+def test_verify_reports_a_truncated_category(tv_pages):
+    tv_pages.failing.add("https://www.tradingview.com/markets/cryptocurrencies/prices-all/?page=2")
+
+    report = json.loads(quiet(lambda: asyncio.run(vercel_app.verify())).body)["tradingview"]
+
+    assert report["crypto"]["status"] == "degraded"
+    assert report["crypto"]["complete"] is False
+    assert report["crypto"]["resume_page"] == 2
+    assert report["forex"]["complete"] is True
@@ -0,0 +1,15 @@
+"""
+Paridad exacta de cada parser con la salida grabada del corpus
+(tests/fixtures/corpus); los tiempos se miden con tests/bench_parsers.py
+"""
+import pytest
+
+from tests.bench_parsers import cases, load_expected
+from tests.conftest import quiet
+
+CASES = cases()
+
+
+@pytest.mark.parametrize("case", CASES, ids=[f"{case.parser}-{case.name}" for case in CASES])
+def test_parser_matches_recorded_output(case):
+    assert quiet(case.run) == load_expected(case)
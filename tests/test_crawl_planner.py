@@ -0,0 +1,157 @@
+"""
+Planificador de crawl (app/crawl_planner.py): modelo de filas por página
+aprendido de los crawls y offsets de cursor llevados a sus páginas ?page=N
+"""
+import asyncio
+
+from app.adapters.tradingview import common
+from app.crawl_planner import CrawlPlanner, crawl_planner, fetch_rows
+from app.http_client import validator_store
+from app.page_fetcher import PageResult
+from app.snapshots import snapshot_store
+from app.pagination import Cursor, cursor_codec
+from tests.conftest import quiet
+
+URL = "https://example.com/list/"
+
+
+def page(number: int, rows: int, items: int = None) -> PageResult:
+    return PageResult(page=number, rows=rows, items=[None] * (rows if items is None else items))
+
+
+def test_model_learns_page_size_and_end():
+    planner = CrawlPlanner()
+    assert planner.plan(URL, 0, 10) is None
+
+    planner.observe(URL, [page(1, 100), page(2, 100), page(3, 41)])
+
+    assert planner.rows_per_page(URL) == 100
+    assert planner.total_rows(URL) == 241
+    assert planner.model(URL).pages == 3
+
+
+def test_plan_maps_offsets_to_pages():
+    planner = CrawlPlanner()
+    planner.observe(URL, [page(1, 100), page(2, 100), page(3, 41)])
+
+    assert planner.plan(URL, 150, 10) == range(2, 3)
+    assert planner.plan(URL, 190, 20) == range(2, 4)
+    # Sin pasar de la última página conocida, ni más allá del total
+    assert planner.plan(URL, 200, 500) == range(3, 4)
+    assert planner.plan(URL, 241, 10) == range(0)
+
+
+def test_full_last_page_means_the_category_grew():
+    planner = CrawlPlanner()
+    planner.observe(URL, [page(1, 100), page(2, 100), page(3, 41)])
+
+    planner.observe(URL, [page(3, 100)])
+
+    assert planner.total_rows(URL) is None
+    assert planner.plan(URL, 200, 200) == range(3, 5)
+
+
+def test_dropped_rows_disable_planning():
+    planner = CrawlPlanner()
+    planner.observe(URL, [page(1, 100, items=42), page(2, 100)])
+
+    assert planner.rows_per_page(URL) == 100
+    assert planner.plan(URL, 150, 10) is None
+
+
+def test_stale_model_does_not_plan():
+    planner = CrawlPlanner(max_age=0)
+    planner.observe(URL, [page(1, 100)])
+
+    assert planner.plan(URL, 0, 10) is None
+
+
+def test_small_request_fetches_one_page(tv_pages):
+    async def list_after_crawl():
+        everything, _, _ = await common.list_refs_for_category("crypto", None, 500)
+        # Sin snapshot vigente (otra época, TTL vencido) el modelo ya sabe dónde está el offset
+        snapshot_store.clear()
+        del tv_pages.requested[:]
+        batch, cursor, expected = await common.list_refs_for_category(
+            "crypto", cursor_codec.encode(Cursor("tradingview", "crypto", 150)), 10
+        )
+        return everything, batch, cursor, expected
+
+    everything, batch, cursor, expected = quiet(lambda: asyncio.run(list_after_crawl()))
+
+    assert tv_pages.requested == [common.TV_URLS["crypto"] + "?page=2"]
+    assert batch == everything[150:160]
+    assert expected == 241
+    assert cursor_codec.decode(cursor) == Cursor("tradingview", "crypto", 160, page=2, row=60)
+
+
+def test_cold_small_request_fetches_one_page(tv_pages):
+    batch, cursor, _ = quiet(lambda: asyncio.run(common.list_refs_for_category("crypto", None, 10)))
+
+    # Sin modelo todavía: solo la página 1, no un crawl de la categoría
+    assert tv_pages.requested == [common.TV_URLS["crypto"]]
+    assert len(batch) == 10
+    assert cursor_codec.decode(cursor) == Cursor("tradingview", "crypto", 10, page=1, row=10)
+
+
+def test_slice_across_a_page_boundary(tv_pages):
+    async def list_after_crawl():
+        everything, _, _ = await common.list_refs_for_category("crypto", None, 500)
+        snapshot_store.clear()
+        del tv_pages.requested[:]
+        batch, cursor, _ = await common.list_refs_for_category("crypto", cursor_codec.encode(Cursor("tradingview", "crypto", 190)), 100)
+        return everything, batch, cursor
+
+    everything, batch, cursor = quiet(lambda: asyncio.run(list_after_crawl()))
+
+    assert sorted(tv_pages.requested) == [common.TV_URLS["crypto"] + "?page=2", common.TV_URLS["crypto"] + "?page=3"]
+    assert batch == everything[190:241]
+    assert cursor is None
+
+
+def test_fetch_rows_stops_at_a_failed_middle_page():
+    url = "https://example.com/gaps/"
+    crawl_planner.observe(url, [PageResult(page, 10, list(range(10))) for page in (1, 2)])
+
+    async def fetch_page(number):
+        if number == 3:
+            return None
+        return PageResult(number, 10, [f"p{number}r{i}" for i in range(10)])
+
+    try:
+        window = asyncio.run(fetch_rows(url, fetch_page, page=2, row=5, count=30))
+    finally:
+        crawl_planner.clear()
+
+    # Solo las filas de la página 2; el cursor queda en la página 3 para reintentar
+    assert window.items == [f"p2r{i}" for i in range(5, 10)]
+    assert (window.page, window.row, window.exhausted) == (3, 0, False)
+
+
+def test_adapter_small_request_without_a_plan_fetches_one_page():
+    from tests.fixtures.tradingview_server import TradingViewStandIn
+    from app.http_client import close_clients
+
+    crawl_planner.clear()
+    snapshot_store.clear()
+    validator_store.clear()
+    with TradingViewStandIn(categories=["crypto"], failing=set()) as server:
+        adapter = server.adapter(use_scanner=False)
+
+        async def list_twice():
+            try:
+                first, cursor = await adapter.list_refs("crypto", None, 10)
+                # Sin snapshot vigente el modelo planifica: otra vez solo la página 1
+                snapshot_store.clear()
+                again, _ = await adapter.list_refs("crypto", None, 10)
+                return first, cursor, again
+            finally:
+                await close_clients()
+
+        first, cursor, again = quiet(lambda: asyncio.run(list_twice()))
+    crawl_planner.clear()
+
+    assert len(first) == 10 and first == again
+    assert server.requests["GET"] == 2
+    assert cursor_codec.decode(cursor).page == 1
+    assert cursor_codec.decode(cursor).row == 10
@@ -0,0 +1,83 @@
+"""
+Cursores firmados (app/pagination.py): formato, firma, rechazo con 400 y
+reanudación desde la página/fila fuente en un worker sin snapshot ni modelo
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from api import vercel_app
+from app.adapters.tradingview import common
+from app.crawl_planner import crawl_planner
+from app.main import create_app
+from app.pagination import Cursor, CursorCodec, InvalidCursor, cursor_codec, cursor_secret
+from app.snapshots import snapshot_store
+from tests.conftest import quiet
+
+CURSOR = Cursor("tradingview", "crypto", offset=150, page=2, row=50, epoch=1760000000000)
+
+
+def test_round_trip_is_compact():
+    token = cursor_codec.encode(CURSOR)
+
+    assert cursor_codec.decode(token) == CURSOR
+    assert len(token) < 100
+
+
+def test_tampered_or_foreign_cursors_are_rejected():
+    token = cursor_codec.encode(CURSOR)
+    payload, signature = token.split(".")
+    forged = cursor_codec.encode(Cursor("tradingview", "crypto", offset=0)).split(".")[0]
+
+    for bad in (f"{forged}.{signature}", payload, "next_page_token"):
+        with pytest.raises(InvalidCursor):
+            cursor_codec.decode(bad)
+    with pytest.raises(InvalidCursor):
+        CursorCodec("otra-clave").decode(token)
+    # Un cursor de otra categoría no sirve aquí
+    with pytest.raises(InvalidCursor):
+        cursor_codec.decode(token, "tradingview", "forex")
+    assert cursor_codec.decode(token, "tradingview", "crypto") == CURSOR
+    assert cursor_codec.decode(None) is None
+
+
+def test_secret_is_shared_and_required_in_production():
+    # Sin CURSOR_SECRET todos los procesos de desarrollo firman igual
+    assert CursorCodec(cursor_secret("")).decode(cursor_codec.encode(CURSOR)) == CURSOR
+    assert cursor_secret("clave", "production") == "clave"
+    with pytest.raises(RuntimeError):
+        cursor_secret("", "production")
+
+
+def test_rejected_cursor_is_a_bad_request():
+    async def price24h():
+        transport = httpx.ASGITransport(app=vercel_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/price24h", params={"category": "crypto", "cursor": "next_page_token"})
+
+    assert asyncio.run(price24h()).status_code == 400
+
+    client = quiet(create_app).test_client()
+    response = quiet(lambda: client.get("/api/scrape", query_string={"providers": "mock", "cursor": "next_page_token"}))
+    assert response.status_code == 400
+
+
+def test_cursor_resumes_on_a_fresh_worker(tv_pages):
+    async def first_then_resume():
+        first, cursor, _ = await common.list_refs_for_category("crypto", None, 150)
+        # Otro worker: sin snapshot ni modelo, solo el cursor
+        snapshot_store.clear()
+        crawl_planner.clear()
+        del tv_pages.requested[:]
+        rest, next_cursor, _ = await common.list_refs_for_category("crypto", cursor, 150)
+        return first, cursor, rest, next_cursor
+
+    first, cursor, rest, next_cursor = quiet(lambda: asyncio.run(first_then_resume()))
+
+    assert cursor_codec.decode(cursor).page == 2
+    assert cursor_codec.decode(cursor).row == 50
+    url = common.TV_URLS["crypto"]
+    assert tv_pages.requested == [url + "?page=2", url + "?page=3"]
+    assert len(first) + len(rest) == len({ref.symbol for ref in first + rest}) == 241
+    assert next_cursor is None
@@ -0,0 +1,77 @@
+"""
+Event loop persistente (app/event_loop.py): mismo loop y mismos clientes
+HTTP entre llamadas, puente seguro desde varios hilos y cierre del pool al
+apagar la app FastAPI
+"""
+import asyncio
+import threading
+
+import pytest
+
+from api import vercel_app
+from app.event_loop import BackgroundLoop
+from app.http_client import get_client
+from tests.conftest import quiet
+
+
+@pytest.fixture
+def loop():
+    background = BackgroundLoop(use_uvloop=False)
+    yield background
+    background.stop()
+
+
+async def current_client():
+    return asyncio.get_running_loop(), get_client("https://www.tradingview.com/markets/")
+
+
+def test_clients_survive_between_calls(loop):
+    first_loop, first_client = quiet(lambda: loop.run(current_client()))
+    second_loop, second_client = loop.run(current_client())
+
+    assert first_loop is second_loop
+    assert first_client is second_client
+    assert loop.get_stats()["starts"] == 1
+
+
+def test_exceptions_reach_the_caller(loop):
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        quiet(lambda: loop.run(fail()))
+    assert loop.run(asyncio.sleep(0, result=7)) == 7
+
+
+def test_submit_from_many_threads(loop):
+    results = []
+
+    def worker(n):
+        results.append(loop.run(asyncio.sleep(0.01, result=n)))
+
+    quiet(loop.start)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == list(range(16))
+    assert loop.get_stats()["submitted"] == 16
+
+
+def test_run_from_inside_the_loop_is_rejected(loop):
+    async def nested():
+        loop.run(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError):
+        quiet(lambda: loop.run(nested()))
+
+
+def test_fastapi_lifespan_closes_clients():
+    async def serve():
+        async with vercel_app.lifespan(vercel_app.app):
+            return get_client("https://www.tradingview.com")
+
+    # Al apagar el worker se cierra el pool compartido
+    assert asyncio.run(serve()).is_closed
@@ -0,0 +1,73 @@
+"""
+Export CSV de Finviz (FinvizAdapter._parse_finviz_csv): columnas por nombre,
+mismas filas que la tabla HTML del mismo screener y vuelta al HTML
+"""
+import asyncio
+import csv
+import io
+
+import httpx
+
+from app.adapters.finviz import FinvizAdapter
+from app.http_client import validator_store
+from app.projection import parser_fields
+from tests.conftest import quiet
+from tests.fixtures import corpus
+
+HTML_PAGE, CSV_PAGE = sorted(corpus.pages("finviz", "stocks"), key=lambda page: page.ext != "html")
+LOGIN_PAGE = "<!DOCTYPE html><html><body><form action='/login.ashx'></form></body></html>"
+
+
+def parse_csv(text: str, fields=None):
+    return quiet(lambda: FinvizAdapter()._parse_finviz_csv(text, "stocks", fields))
+
+
+def test_csv_matches_html_rows():
+    csv_refs = parse_csv(corpus.load(CSV_PAGE))
+    html_refs = quiet(lambda: FinvizAdapter()._parse_finviz_html(corpus.load(HTML_PAGE), "stocks"))
+
+    assert len(csv_refs) == 60
+    assert set(html_refs) <= set(csv_refs)
+
+
+def test_columns_are_found_by_header_name():
+    rows = list(csv.reader(io.StringIO(corpus.load(CSV_PAGE))))
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in rows:
+        writer.writerow(row[::-1])
+
+    assert parse_csv(out.getvalue()) == parse_csv(corpus.load(CSV_PAGE))
+
+
+def test_projection_skips_unrequested_columns():
+    refs = parse_csv(corpus.load(CSV_PAGE), fields=parser_fields(frozenset({"price"})))
+
+    assert refs[0].name is None
+    assert refs[0].change_24h_pct is None
+    assert refs[0].price > 0
+
+
+def test_login_page_is_not_csv():
+    assert parse_csv(LOGIN_PAGE) is None
+
+
+def test_export_failure_falls_back_to_html():
+    adapter = FinvizAdapter(use_csv=True)
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.path == "/export.ashx":
+            return httpx.Response(200, text=LOGIN_PAGE)
+        return httpx.Response(200, text=corpus.load(HTML_PAGE))
+
+    async def scrape():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await adapter._scrape_finviz_page(client, "stocks")
+
+    validator_store.clear()
+    refs = quiet(lambda: asyncio.run(scrape()))
+
+    assert requested == ["/export.ashx", "/screener.ashx"]
+    assert len(refs) == 59
@@ -0,0 +1,59 @@
+"""
+Tokenizador numérico compartido (app/numeric.py)
+"""
+import pytest
+
+from app.numeric import cell_change, cell_price, parse_numeric
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("44,759.8759\xa0USD", 44759.8759),
+    ("$67,321.50", 67321.5),
+    ("−2.31%", -2.31),
+    ("+4.75%", 4.75),
+    ("(1.23%)", -1.23),
+    ("1.234,56", 1234.56),
+    ("1 234,56", 1234.56),
+    ("1.234.567", 1234567.0),
+    ("1,5", 1.5),
+    ("1,234", 1234.0),
+    ("586.19\xa0B\xa0USD", 586.19e9),
+    ("950K", 950e3),
+    ("2.5 M", 2.5e6),
+    (".5", 0.5),
+    ("N/A", None),
+    ("—", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_numeric(text, expected):
+    assert parse_numeric(text) == pytest.approx(expected) if expected is not None else parse_numeric(text) is None
+
+
+def test_strict_rejects_text_around_number():
+    assert parse_numeric("Layer 1", strict=True) is None
+    assert parse_numeric("1.00 USDT", strict=True) == 1.0
+    assert parse_numeric("Layer 1") == 1.0
+
+
+def test_suffixes_can_be_ignored():
+    assert parse_numeric("1.2B", suffixes=False) == 1.2
+    assert parse_numeric("1.2B") == 1.2e9
+
+
+def test_cell_price():
+    assert cell_price("$1,234.50") == 1234.5
+    assert cell_price("1.5%") == 1.5
+    # Ni texto con números, ni volúmenes con sufijo, ni negativos, ni fuera de rango
+    assert cell_price("S&P 500") == 0.0
+    assert cell_price("Name 1") == 0.0
+    assert cell_price("1.2M") == 0.0
+    assert cell_price("-3.2") == 0.0
+    assert cell_price("2,500,000") == 0.0
+    assert cell_price("") == 0.0
+
+
+def test_cell_change():
+    assert cell_change("−1.25%") == -1.25
+    assert cell_change("+0.5") == 0.5
+    assert cell_change("1.5") is None
@@ -0,0 +1,61 @@
+"""
+Parseo en el pool de procesos (app/parse_executor.py): mismo resultado que
+en el hilo, layouts aprendidos en el worker reflejados en el proceso padre
+"""
+import asyncio
+import functools
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.adapters.tradingview import TradingViewAdapter
+from app.layout_cache import layout_cache
+from app.parse_executor import ParseExecutor
+
+PAGE = (Path(__file__).parent / "fixtures" / "tradingview" / "crypto_page1.html").read_bytes()
+
+
+def make_response(content: bytes = PAGE) -> httpx.Response:
+    return httpx.Response(200, content=content, headers={"content-type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture(scope="module")
+def pool_executor():
+    executor = ParseExecutor(max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+def parse_with(executor: ParseExecutor, parse):
+    return asyncio.run(executor.parse(parse, make_response()))
+
+
+def test_without_workers_parses_inline():
+    executor = ParseExecutor(max_workers=0)
+    result = parse_with(executor, functools.partial(TradingViewAdapter()._parse_page, category="crypto", page=1))
+
+    assert result.items
+    assert executor.get_stats()["inline"] == 1
+    assert executor.get_stats()["pool_started"] is False
+
+
+def test_pool_matches_inline_and_shares_layout(pool_executor):
+    layout_cache.clear()
+    adapter = TradingViewAdapter()
+    result = parse_with(pool_executor, functools.partial(adapter._parse_page, category="crypto", page=1))
+
+    assert pool_executor.get_stats()["offloaded"] == 1
+    # El layout descubierto en el worker queda en la caché del proceso padre
+    assert layout_cache.get("tradingview", "crypto") is not None
+    expected = adapter._parse_page(PAGE.decode(), "crypto", page=1)
+    assert result.rows == expected.rows
+    assert result.items == expected.items
+
+
+def test_unpicklable_parse_falls_back_inline(pool_executor):
+    fallbacks = pool_executor.fallbacks
+    result = parse_with(pool_executor, lambda html: len(html))
+
+    assert result == len(PAGE.decode())
+    assert pool_executor.fallbacks == fallbacks + 1
@@ -0,0 +1,38 @@
+"""
+Proyección de columnas (`fields=`): validación y serialización
+"""
+from datetime import datetime
+
+import pytest
+
+from app.models import SNAPSHOT_FIELDS, InstrumentSnapshot
+from app.projection import parse_fields, parser_fields, projected_key
+
+
+def test_parse_fields():
+    assert parse_fields(None, SNAPSHOT_FIELDS) is None
+    assert parse_fields("all", SNAPSHOT_FIELDS) is None
+    assert parse_fields(" symbol, price ", SNAPSHOT_FIELDS) == {"symbol", "price"}
+    with pytest.raises(ValueError, match="volume"):
+        parse_fields("symbol,volume", SNAPSHOT_FIELDS)
+
+
+def test_parser_fields_adds_row_and_derived_fields():
+    assert parser_fields(None) is None
+    assert parser_fields(frozenset({"name"})) == {"name", "symbol", "price"}
+    assert "change_24h_pct" in parser_fields(frozenset({"price_24h"}))
+
+
+def test_projected_key_separates_partial_rows():
+    assert projected_key("finviz", None) == "finviz"
+    assert projected_key("finviz", frozenset({"symbol", "price"})) == "finviz[price,symbol]"
+
+
+def test_snapshot_to_dict_projection():
+    snapshot = InstrumentSnapshot(
+        provider="finviz", category="stocks", symbol="AAPL", price=190.5,
+        change_24h_pct=1.2, ts=datetime(2024, 1, 2, 3, 4, 5),
+    )
+    assert snapshot.to_dict(frozenset({"price", "symbol"})) == {"symbol": "AAPL", "price": 190.5}
+    assert snapshot.to_dict(frozenset({"ts"})) == {"ts": "2024-01-02T03:04:05"}
+    assert snapshot.to_dict() == {**snapshot.to_dict(frozenset(SNAPSHOT_FIELDS))}
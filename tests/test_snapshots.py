@@ -0,0 +1,119 @@
+"""
+Snapshots de categoría (app/snapshots.py): épocas, reemplazo y TTL, y
+paginación por cursor sin volver a scrapear (list_refs_for_category y
+TradingViewAdapter.list_refs)
+"""
+import asyncio
+
+from app.adapters.base import InstrumentRef
+from app.adapters.tradingview import adapter as tv_adapter, common
+from app.crawl_planner import crawl_planner
+from app.deadline import Deadline, deadline_scope
+from app.http_client import close_clients, validator_store
+from app.snapshots import SnapshotStore, snapshot_store
+from app.pagination import Cursor, cursor_codec
+from tests.conftest import quiet
+from tests.fixtures.tradingview_server import TradingViewStandIn
+
+KEY = ("tradingview", "crypto", None, None)
+
+
+def refs(count: int):
+    return [InstrumentRef(f"S{i}", f"S{i}", None, "USD", "crypto", float(i + 1)) for i in range(count)]
+
+
+def test_cursor_epoch_survives_until_replaced():
+    store = SnapshotStore()
+    first = store.publish(KEY, refs(3), 3, complete=True)
+
+    assert store.get(first.epoch, KEY) is first
+    assert store.current(KEY) is first
+
+    second = store.publish(KEY, refs(5), 5, complete=True)
+    assert second.epoch > first.epoch
+    assert store.get(first.epoch, KEY) is None
+    assert store.current(KEY) is second
+    # Una época no sirve a otra clave
+    assert store.get(second.epoch, ("tradingview", "forex", None, None)) is None
+
+
+def test_ttl_and_reuse_window():
+    store = SnapshotStore(ttl=0, reuse=0)
+    snapshot = store.publish(KEY, refs(3), 3, complete=True)
+
+    assert store.get(snapshot.epoch, KEY) is None
+    assert store.get_stats()["expired"] == 1
+
+    store = SnapshotStore(ttl=300, reuse=0)
+    snapshot = store.publish(KEY, refs(3), 3, complete=True)
+    # Los cursores siguen sirviéndose; una primera página nueva crawlea otra época
+    assert store.current(KEY) is None
+    assert store.get(snapshot.epoch, KEY) is snapshot
+
+
+def test_incomplete_snapshot_is_not_reused_for_first_pages():
+    store = SnapshotStore()
+    snapshot = store.publish(KEY, refs(3), 3, complete=False)
+
+    assert store.current(KEY) is None
+    assert store.get(snapshot.epoch, KEY) is snapshot
+
+
+def test_cursor_pages_slice_one_crawl(tv_pages):
+    async def page_through():
+        # Un pedido que cubre la categoría entera la crawlea en un snapshot
+        await snapshot_store.materialize(KEY, lambda: common.crawl_category("crypto"))
+        batch, cursor, _ = await common.list_refs_for_category("crypto", None, 50)
+        pages, crawl_requests = [batch], len(tv_pages.requested)
+        while cursor:
+            batch, cursor, _ = await common.list_refs_for_category("crypto", cursor, 50)
+            pages.append(batch)
+        return pages, crawl_requests
+
+    pages, crawl_requests = quiet(lambda: asyncio.run(page_through()))
+
+    assert [len(batch) for batch in pages] == [50, 50, 50, 50, 41]
+    assert len({ref.symbol for batch in pages for ref in batch}) == 241
+    # Las páginas 1..5 cortan el snapshot del crawl: ninguna descarga más
+    assert len(tv_pages.requested) == crawl_requests
+
+    _, cursor, _ = quiet(lambda: asyncio.run(common.list_refs_for_category("crypto", None, 50)))
+    assert len(tv_pages.requested) == crawl_requests  # Primera página nueva dentro de SNAPSHOT_REUSE
+    assert cursor_codec.decode(cursor).epoch == snapshot_store.current(("tradingview", "crypto", None, None)).epoch
+
+
+def test_adapter_incomplete_snapshot_resumes_at_the_failed_page(monkeypatch):
+    async def no_wait(seconds):
+        return None
+
+    # Los reintentos de la página caída no esperan
+    monkeypatch.setattr(tv_adapter, "sleep_within_deadline", no_wait)
+    crawl_planner.clear()
+    snapshot_store.clear()
+    validator_store.clear()
+    deadline = Deadline.after(60).child(("tradingview", "crypto"))
+    with TradingViewStandIn(categories=["crypto"], failing_pages={2}) as server:
+        adapter = server.adapter(use_scanner=False)
+
+        async def crawl_then_page():
+            try:
+                with deadline_scope(deadline):
+                    # Sin la página 2 no sigue con la 3: el snapshot queda en la página 1
+                    snapshot = await snapshot_store.materialize(KEY, lambda: adapter._crawl("crypto", 100))
+                    first = cursor_codec.encode(Cursor("tradingview", "crypto", 50, epoch=snapshot.epoch))
+                    tail, cursor = await adapter.list_refs("crypto", first, 50)
+                server.failing_pages.clear()
+                rest, _ = await adapter.list_refs("crypto", cursor, 50)
+                return snapshot, tail, cursor, rest
+            finally:
+                await close_clients()
+
+        snapshot, tail, cursor, rest = quiet(lambda: asyncio.run(crawl_then_page()))
+    crawl_planner.clear()
+    snapshot_store.clear()
+
+    assert (len(snapshot.refs), snapshot.complete, snapshot.page_starts) == (100, False, (0,))
+    # El final del snapshot incompleto deja un cursor y marca la respuesta parcial
+    assert len(tail) == 50 and cursor is not None
+    assert deadline.partial
+    assert [ref.symbol for ref in rest] == [item["d"][0] for item in server.scans["crypto"]["data"][100:150]]
@@ -0,0 +1,182 @@
+"""
+Mezcla k-way de proveedores (app/stream_merge.py) y cursor compuesto de
+scrape_data: páginas consistentes y solo las filas necesarias por stream
+"""
+import asyncio
+import heapq
+
+from app.adapters.base import InstrumentRef
+from app.circuit_breaker import circuit_breakers
+from app.main import get_provider_status, scrape_data
+from app.models import InstrumentSnapshot
+from app.pagination import cursor_codec
+from app.stream_merge import MergeStream, merge_page, parse_sort
+from tests.conftest import quiet
+
+
+def rows(prefix: str, count: int, category: str = "crypto"):
+    return [InstrumentRef(f"{prefix}{i:03d}", None, None, "USD", category, float(count - i)) for i in range(count)]
+
+
+class ListAdapter:
+    """Adaptador en memoria con cursor = offset"""
+
+    def __init__(self, name: str, by_category: dict):
+        self.name = name
+        self.by_category = by_category
+        self.requested = []
+
+    async def list_refs(self, category, cursor, page_size):
+        start = int(cursor or 0)
+        self.requested.append((category, start, page_size))
+        refs = self.by_category[category][start:start + page_size]
+        end = start + len(refs)
+        return refs, str(end) if end < len(self.by_category[category]) else None
+
+    async def fetch_snapshots(self, refs, hours_window):
+        return [InstrumentSnapshot(self.name, ref.category, ref.symbol, price=ref.price) for ref in refs]
+
+
+def test_pages_concatenate_to_the_full_merge():
+    streams = {"a": rows("A", 23), "b": rows("B", 5), "c": rows("C", 40)}
+    adapter = ListAdapter("x", streams)
+
+    async def list_refs(provider, category, cursor, count):
+        return await adapter.list_refs(category, cursor, count)
+
+    async def page_through():
+        pages, state = [], None
+        while True:
+            saved = {c: (start, skip, done, size) for _, c, start, skip, done, size in state or []}
+            merge = [MergeStream("x", c, *saved.get(c, (None, 0, False, 0))) for c in streams]
+            merged = await merge_page(merge, 7, "symbol", list_refs)
+            pages.append([ref.symbol for _, ref in merged])
+            state = [s.state() for s in merge]
+            if all(done for *_, done, _ in state):
+                return pages
+
+    pages = asyncio.run(page_through())
+
+    expected = [ref.symbol for ref in heapq.merge(*streams.values(), key=lambda ref: ref.symbol)]
+    assert [symbol for page in pages for symbol in page] == expected
+    assert all(len(page) == 7 for page in pages[:-1])
+    # Cada página pide a cada stream su parte (7/3 -> 3) más lo que falte, no la lista entera
+    assert max(count for _, _, count in adapter.requested) <= 7 + 7
+
+
+def test_scrape_data_cursor_round_trip_by_price():
+    crypto = ListAdapter("tradingview", {"crypto": rows("T", 12), "forex": rows("F", 9, "forex")})
+    stocks = ListAdapter("yahoo", {"crypto": rows("Y", 8), "forex": []})
+    adapters = {"tradingview": crypto, "yahoo": stocks}
+
+    def scrape(cursor):
+        return quiet(lambda: asyncio.run(scrape_data(
+            adapters, ["tradingview", "yahoo"], ["crypto", "forex"], 10, cursor,
+            hours_window=1, max_concurrency=4, respect_robots=True, sort=parse_sort("-price"),
+        )))
+
+    seen, cursor = [], None
+    while True:
+        snapshots, cursor = scrape(cursor)
+        seen.extend(snapshots)
+        if cursor is None:
+            break
+        assert cursor_codec.decode_merge(cursor)[0] == "-price"
+
+    prices = [snapshot.price for snapshot in seen]
+    assert prices == sorted(prices, reverse=True)
+    assert len(seen) == len({(s.provider, s.symbol) for s in seen}) == 12 + 9 + 8
+
+
+def test_unsorted_sources_are_sorted_within_each_page_and_resume_consistently():
+    # Orden de la fuente: el inverso de `symbol` (cada bloque siguiente va antes)
+    shuffled = rows("S", 30)[::-1]
+    adapter = ListAdapter("x", {"a": shuffled, "b": rows("B", 1)})
+
+    async def list_refs(provider, category, cursor, count):
+        return await adapter.list_refs(category, cursor, count)
+
+    async def page_through():
+        pages, state = [], None
+        while True:
+            saved = {c: (start, skip, done, size) for _, c, start, skip, done, size in state or []}
+            merge = [MergeStream("x", c, *saved.get(c, (None, 0, False, 0))) for c in ("a", "b")]
+            merged = await merge_page(merge, 5, "symbol", list_refs)
+            pages.append([ref.symbol for _, ref in merged])
+            state = [s.state() for s in merge]
+            if all(done for *_, done, _ in state):
+                return pages
+
+    pages = asyncio.run(page_through())
+
+    symbols = [symbol for page in pages for symbol in page]
+    # Sin repetidas ni perdidas: el bloque en curso se vuelve a pedir igual al reanudar
+    assert len(symbols) == len(set(symbols))
+    assert sorted(symbols) == sorted(ref.symbol for ref in shuffled + rows("B", 1))
+    # `sort` ordena cada página; entre páginas el orden es el de la fuente
+    assert all(page == sorted(page) for page in pages)
+    assert symbols != sorted(symbols)
+
+
+def test_empty_stream_ends_done():
+    adapters = {"yahoo": ListAdapter("yahoo", {"forex": [], "crypto": rows("Y", 3)})}
+    snapshots, cursor = quiet(lambda: asyncio.run(scrape_data(
+        adapters, ["yahoo"], ["crypto", "forex"], 10, None,
+        hours_window=1, max_concurrency=4, respect_robots=True,
+    )))
+
+    assert len(snapshots) == 3
+    assert cursor is None
+
+
+class FlakyAdapter(ListAdapter):
+    """Como ListAdapter, pero los pedidos con cursor en `failing` devuelven
+    [] como hacen los adaptadores cuando el proveedor falla"""
+
+    def __init__(self, name: str, by_category: dict):
+        super().__init__(name, by_category)
+        self.failing = set()
+
+    async def list_refs(self, category, cursor, page_size):
+        if cursor in self.failing:
+            self.requested.append((category, int(cursor), page_size))
+            return [], None
+        return await super().list_refs(category, cursor, page_size)
+
+
+def test_transient_empty_result_keeps_the_stream_and_the_cursor():
+    adapter = FlakyAdapter("yahoo", {"crypto": rows("Y", 6)})
+
+    def scrape(cursor):
+        return quiet(lambda: asyncio.run(scrape_data(
+            {"yahoo": adapter}, ["yahoo"], ["crypto"], 3, cursor,
+            hours_window=1, max_concurrency=4, respect_robots=True,
+        )))
+
+    first, cursor = scrape(None)
+    adapter.failing.add("3")
+    failed, retry_cursor = scrape(cursor)
+    adapter.failing.clear()
+    second, last_cursor = scrape(retry_cursor)
+
+    assert [s.symbol for s in first] == ["Y000", "Y001", "Y002"]
+    # Todos los streams fallaron: sin filas pero el cursor sigue donde estaba
+    assert failed == [] and retry_cursor is not None
+    assert cursor_codec.decode_merge(retry_cursor) == cursor_codec.decode_merge(cursor)
+    assert [s.symbol for s in second] == ["Y003", "Y004", "Y005"]
+    assert last_cursor is None
+
+
+def test_empty_category_does_not_count_as_a_breaker_failure():
+    # Como Alpha Vantage: sin símbolos para índices por diseño
+    adapters = {"alpha_vantage": ListAdapter("alpha_vantage", {"stocks": rows("A", 2, "stocks"), "indices": []})}
+
+    for _ in range(circuit_breakers.failure_threshold + 1):
+        snapshots, cursor = quiet(lambda: asyncio.run(scrape_data(
+            adapters, ["alpha_vantage"], ["stocks", "indices"], 10, None,
+            hours_window=1, max_concurrency=4, respect_robots=True,
+        )))
+        assert len(snapshots) == 2 and cursor is None
+
+    assert circuit_breakers.get("alpha_vantage", "indices").get_state()["failures"] == 0
+    assert get_provider_status(["alpha_vantage"], ["stocks", "indices"])["alpha_vantage"].status == "ok"
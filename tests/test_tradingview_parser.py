@@ -0,0 +1,163 @@
+"""
+Parser de TradingViewAdapter (selectolax) sobre las páginas sintéticas de
+tests/fixtures/tradingview: escritas a mano con el marcado de TradingView,
+no descargadas. *.expected.json es la salida del parser actual (columnas por
+header) y *.baseline.json la del parser BeautifulSoup previo al port, la
+referencia de paridad de filas y símbolos
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from app.adapters.base import InstrumentRef
+from app.adapters.tradingview import TradingViewAdapter
+from app.adapters.tradingview.common import StreamingPage, parse_page_html
+from app.layout_cache import layout_cache
+from app.projection import parser_fields
+from tests.conftest import EMPTY_PAGE
+
+FIXTURES = Path(__file__).parent / "fixtures" / "tradingview"
+
+PAGES = [
+    ("crypto_page1", "crypto"),
+    ("forex_edge_cases", "forex"),
+    ("indices_legacy_markup", "indices"),
+]
+
+
+def load_page(name: str) -> str:
+    return (FIXTURES / f"{name}.html").read_text(encoding="utf-8")
+
+
+def load_expected(name: str, kind: str = "expected") -> dict:
+    return json.loads((FIXTURES / f"{name}.{kind}.json").read_text(encoding="utf-8"))
+
+
+# Filas que el parser previo aceptaba leyendo la celda de al lado: el precio
+# de la columna "Price" está fuera de rango (2,500,000.00 y 0.00001)
+DROPPED_SINCE_BASELINE = {"forex_edge_cases": {"TOOBIG", "TINY"}}
+
+
+@pytest.mark.parametrize("name,category", PAGES)
+def test_adapter_parse_matches_expected_output(name, category):
+    expected = load_expected(name)
+    result = TradingViewAdapter()._parse_page(load_page(name), category, page=1)
+
+    assert result.rows == expected["rows"]
+    assert result.items == [InstrumentRef(**item) for item in expected["items"]]
+
+
+@pytest.mark.parametrize("name,category", PAGES)
+def test_adapter_parse_keeps_pre_port_rows_and_symbols(name, category):
+    baseline = load_expected(name, "baseline")
+    result = TradingViewAdapter()._parse_page(load_page(name), category, page=1)
+
+    dropped = DROPPED_SINCE_BASELINE.get(name, set())
+    assert result.rows == baseline["rows"]
+    assert [ref.symbol for ref in result.items] == [
+        item["symbol"] for item in baseline["items"] if item["symbol"] not in dropped
+    ]
+
+
+def test_adapter_prefers_selectors_in_order():
+    # La tabla de layout sin clase va antes en el documento, pero gana la de datos
+    result = TradingViewAdapter()._parse_page(load_page("indices_legacy_markup"), "indices", page=1)
+    assert [ref.symbol for ref in result.items] == ["SPX", "NDX", "DJI"]
+
+
+def test_adapter_page_without_table():
+    result = TradingViewAdapter()._parse_page("<html><body><p>captcha</p></body></html>", "crypto", page=3)
+    assert result.rows == 0 and result.items == []
+
+
+def test_adapter_reuses_cached_layout():
+    layout_cache.clear()
+    adapter = TradingViewAdapter()
+    html = load_page("crypto_page1")
+
+    first = adapter._parse_page(html, "crypto", page=1)
+    hits = layout_cache.hits
+    second = adapter._parse_page(html, "crypto", page=2)
+
+    assert layout_cache.hits == hits + 1
+    assert second.items == first.items
+
+
+def test_adapter_rediscovers_when_layout_changes():
+    layout_cache.clear()
+    adapter = TradingViewAdapter()
+    adapter._parse_page(load_page("crypto_page1"), "indices", page=1)
+    mismatches = layout_cache.mismatches
+
+    # Otra estructura para la misma categoría: se vuelve a buscar la tabla
+    result = adapter._parse_page(load_page("indices_legacy_markup"), "indices", page=1)
+    expected = load_expected("indices_legacy_markup")
+
+    assert layout_cache.mismatches == mismatches + 1
+    assert result.items == [InstrumentRef(**item) for item in expected["items"]]
+    assert layout_cache.get("tradingview", "indices").selector == 'table[class*="table"]'
+
+
+def stream_page(html: str, category: str, chunk: int = 512, fields=None) -> StreamingPage:
+    parser = StreamingPage(category, fields)
+    for i in range(0, len(html), chunk):
+        parser.feed(html[i:i + chunk])
+        if parser.done:
+            break
+    parser.close()
+    return parser
+
+
+def test_common_streaming_matches_tree_parse():
+    html = load_page("crypto_page1")
+    parser = stream_page(html, "crypto")
+
+    rows, refs = parse_page_html(html, "crypto")
+    assert parser.done
+    assert parser.rows == rows
+    assert parser.refs == refs
+
+
+def test_common_empty_page_has_no_rows():
+    # Pasada la última página: solo el thead, que no cuenta como fila
+    parser = stream_page(EMPTY_PAGE, "crypto")
+    assert parse_page_html(EMPTY_PAGE, "crypto") == (0, [])
+    assert (parser.rows, parser.refs) == (0, [])
+
+
+def test_common_streaming_stops_after_data_table():
+    # La tabla de layout previa no corta el stream; la del footer ya no se lee
+    parser = stream_page(load_page("forex_edge_cases"), "forex", chunk=64)
+    symbols = [ref.symbol for ref in parser.refs]
+    assert parser.done
+    assert "USDJPY" in symbols and "XAUUSD" in symbols
+    assert "FOOT" not in symbols
+
+
+PRICE_ONLY = parser_fields(frozenset({"symbol", "price"}))
+
+
+def without_change(refs):
+    return [ref._replace(change_24h_pct=None) for ref in refs]
+
+
+@pytest.mark.parametrize("name,category", PAGES)
+def test_adapter_projection_keeps_rows_and_skips_change(name, category):
+    adapter = TradingViewAdapter()
+    full = adapter._parse_page(load_page(name), category, page=1)
+    projected = adapter._parse_page(load_page(name), category, page=1, fields=PRICE_ONLY)
+
+    assert projected.rows == full.rows
+    assert projected.items == without_change(full.items)
+
+
+def test_common_projection_tree_and_streaming():
+    html = load_page("crypto_page1")
+    rows, full = parse_page_html(html, "crypto")
+    projected_rows, projected = parse_page_html(html, "crypto", PRICE_ONLY)
+    parser = stream_page(html, "crypto", fields=PRICE_ONLY)
+
+    assert projected_rows == rows and parser.rows == rows
+    assert projected == without_change(full)
+    assert parser.refs == projected
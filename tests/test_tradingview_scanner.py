@@ -0,0 +1,74 @@
+"""
+Screener JSON de TradingView (app/adapters/tradingview/scanner.py) contra el
+servidor local con las respuestas grabadas del corpus, y vuelta al HTML
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.adapters.tradingview.scanner import decode_scan, scan_columns
+from app.http_client import close_clients, get_client
+from app.projection import fields_scope
+from tests.conftest import quiet
+from tests.fixtures import corpus
+from tests.fixtures.tradingview_server import TradingViewStandIn
+
+
+@pytest.fixture
+def server():
+    with TradingViewStandIn(categories=["crypto", "indices"], failing={"global"}) as server:
+        yield server
+
+
+def scrape(server: TradingViewStandIn, category: str, fields=None):
+    adapter = server.adapter(use_scanner=True)
+
+    async def run():
+        try:
+            with fields_scope(fields):
+                return await adapter._scrape_tradingview_page(get_client(server.url), category, max_pages=100)
+        finally:
+            await close_clients()
+    return quiet(lambda: asyncio.run(run()))
+
+
+def test_decode_scan_skips_rows_without_price():
+    content = json.dumps({"totalCount": 3, "data": [
+        {"s": "BINANCE:BTCUSD", "d": ["BTCUSD", 64000.5, "Bitcoin", "USD", -1.25]},
+        {"s": "BINANCE:DEADUSD", "d": ["DEADUSD", None, "Dead coin", "USD", None]},
+        {"s": "BINANCE:ZEROUSD", "d": ["ZEROUSD", 0, "Zero coin", "USD", 0]},
+    ]}).encode()
+
+    total, refs = decode_scan(content, "crypto", scan_columns())
+
+    assert total == 3
+    assert [(ref.symbol, ref.name, ref.exchange, ref.price, ref.change_24h_pct) for ref in refs] == [
+        ("BTCUSD", "Bitcoin", "BINANCE", 64000.5, -1.25),
+    ]
+
+
+def test_scanner_fetches_every_row_in_ranges(server):
+    refs = scrape(server, "crypto")
+
+    recorded = corpus.load_scan("crypto")["data"]
+    assert [ref.symbol for ref in refs] == [item["d"][0] for item in recorded]
+    assert refs[0].price == recorded[0]["d"][1]
+    # 3541 filas en rangos de 1000: 4 POST y ninguna página HTML
+    assert server.requests == {"POST": 4, "GET": 0}
+
+
+def test_scanner_requests_only_projected_columns(server):
+    refs = scrape(server, "crypto", fields=frozenset({"price"}))
+
+    assert len(refs) == corpus.TV_SCAN_ROWS["crypto"]
+    assert refs[0].name == refs[0].symbol
+    assert refs[0].change_24h_pct is None
+
+
+def test_scanner_failure_falls_back_to_html(server):
+    refs = scrape(server, "indices")
+
+    assert server.requests["POST"] == 1
+    assert server.requests["GET"] >= 1
+    assert [ref.symbol for ref in refs] == [item["d"][0] for item in corpus.load_scan("indices")["data"]]